@@ -2,7 +2,7 @@
 
 """
 Usage:
-    FlowSortPrometheeISorting.py -i DIR -o DIR
+    FlowSortPrometheeISorting.py -i DIR -o DIR [--no-cache]
 
 Options:
     -i DIR     Specify input directory. It should contain the following files:
@@ -11,63 +11,290 @@ Options:
                    classes_profiles.xml
                    flows.xml
                    method_params.xml
+               and, when 'weights_samples' are set:
+                   criteria.xml
+                   performance_table.xml
+                   profiles_performance_table.xml
+                   weights.xml (optional, the weights' intervals)
+               and, optionally, the 'scenarios' subdirectory with
+               alternative sets of profiles - one directory per scenario,
+               with classes.xml, classes_profiles.xml and flows.xml (profiles' flows)
     -o DIR     Specify output directory. Files generated as output:
+                   assignments.xml
+                   margins.xml (if 'compute_margins' is set)
+                   assignments_distribution.xml (if 'noise_samples' are set)
+                   weights_acceptabilities.xml (if 'weights_samples' are set)
+                   scenarios_assignments.xml and scenarios_disagreements.xml
+                   (if there are any scenarios)
+
+    --no-cache  Don't use the results stored in the directory given by the
+                PROMETHEE_RESULT_CACHE environment variable (if it's set).
 
     --version  Show version.
     -h --help  Show this screen.
+
+With the PROMETHEE_PARSE_CACHE environment variable set to a directory, the
+values read from the input files are cached there, and only the files whose
+values aren't cached yet are parsed and validated - the ones which aren't
+needed at all aren't validated either.
 """
 
 import os
 import sys
 import traceback
 
+from bisect import bisect_left, bisect_right
 from docopt import docopt
+from functools import partial
 
-from common import comparisons_to_xmcda, create_messages_file, get_dirs, \
-get_error_message, get_input_data, write_xmcda, assignments_to_xmcda
+# robustness.py is imported only by the functions using it, see common.py
+from common import comparisons_to_xmcda, create_messages_file, get_dirs, get_error_message, \
+get_input_data, write_xmcda, assignments_to_xmcda, InputDataError, get_midpoints, \
+get_scenarios_dirs, run_memoized
 
 
 __version__ = '0.0.1'
 
 
 
-def sortWithBoundaryProfiles(alternatives, categories, profiles_categories, alternatives_flows, categories_flows):
+def assignWithBoundaryProfiles(flow, profiles_categories, categories_flows):
+
+  assignment = profiles_categories[1]["classes"]["lower"]
+  for i in range (1,len(profiles_categories)+1):
+    if flow >= categories_flows[profiles_categories[i]["id"]]:
+      assignment = profiles_categories[i]["classes"]["upper"]
+    else:
+      break
+  return assignment
+
+
+def assignWithCentralProfiles(flow, profiles_categories, categories_flows):
+
+  assignment = profiles_categories[1]["classes"]
+  for i in range (2,len(profiles_categories)+1):
+    if flow > (categories_flows[profiles_categories[i]["id"]] + categories_flows[profiles_categories[i-1]["id"]])/2:
+      assignment = profiles_categories[i]["classes"]
+    else:
+      break
+  return assignment
+
+
+def sortWithBoundaryProfiles(alternatives, categories, profiles_categories, alternatives_flows, categories_flows, with_margins=False):
   
+  if with_margins:
+    from robustness import MarginsIndex, get_margin
   assignments = {}
+  margins = {}
+  # margin == distance from the flow to the nearest profile
+  thresholds = sorted(categories_flows[profiles_categories[i]["id"]] for i in profiles_categories)
   for alternative in alternatives:
-    assignments[alternative] = profiles_categories[1]["classes"]["lower"]
-    for i in range (1,len(profiles_categories)+1):
-      if alternatives_flows[alternative] >= categories_flows[profiles_categories[i]["id"]]:
-        assignments[alternative] = profiles_categories[i]["classes"]["upper"]
-      else:
-        break  
+    assignments[alternative] = assignWithBoundaryProfiles(alternatives_flows[alternative], profiles_categories, categories_flows)
+    if with_margins:
+      margins[alternative] = get_margin(alternatives_flows[alternative], thresholds)
   print (assignments)
   print ('boundary')
+  if with_margins:
+    return assignments, MarginsIndex(margins)
   return assignments
 
 
-def sortWithCentralProfiles(alternatives, categories, profiles_categories, alternatives_flows, categories_flows):
+def sortWithCentralProfiles(alternatives, categories, profiles_categories, alternatives_flows, categories_flows, with_margins=False):
 
+  if with_margins:
+    from robustness import MarginsIndex, get_margin
   assignments = {}
+  margins = {}
+  # margin == distance from the flow to the nearest midpoint between profiles
+  thresholds = get_midpoints(profiles_categories, categories_flows)
 
   for alternative in alternatives:
-    assignments[alternative] = profiles_categories[1]["classes"]
-    for i in range (2,len(profiles_categories)+1):
-      if alternatives_flows[alternative] > (categories_flows[profiles_categories[i]["id"]] + categories_flows[profiles_categories[i-1]["id"]])/2:
-        assignments[alternative] = profiles_categories[i]["classes"]
-      else:
-        break
+    assignments[alternative] = assignWithCentralProfiles(alternatives_flows[alternative], profiles_categories, categories_flows)
+    if with_margins:
+      margins[alternative] = get_margin(alternatives_flows[alternative], thresholds)
   
   print (assignments)
   print ('central')
+  if with_margins:
+    return assignments, MarginsIndex(margins)
   return assignments
 
 
-def main():
+def fitBoundaryProfiles(alternatives_flows, profiles_categories, reference_assignments):
+  """Finds the boundary profiles' flows which reproduce as many of the
+  reference assignments as possible (see fit_thresholds). Returns a tuple
+  (categories_flows, errors).
+  """
+
+  from robustness import fit_thresholds
+  classes = [profiles_categories[1]["classes"]["lower"]] + [profiles_categories[i]["classes"]["upper"] for i in range (1,len(profiles_categories)+1)]
+  thresholds, errors = fit_thresholds(alternatives_flows, reference_assignments, classes)
+  categories_flows = dict((profiles_categories[i]["id"], thresholds[i-1]) for i in range (1,len(profiles_categories)+1))
+  return categories_flows, errors
+
+
+def predictWithBoundaryProfiles(alternatives_flows, profiles_categories, categories_flows, alternatives):
+
+  return dict((alternative, assignWithBoundaryProfiles(alternatives_flows[alternative], profiles_categories, categories_flows)) for alternative in alternatives)
+
+
+def crossValidateBoundaryProfiles(alternatives_flows, profiles_categories, reference_assignments, folds=5, processes=None, seed=None):
+  """Returns the number of errors in every fold of cross-validation of
+  fitBoundaryProfiles (the folds are evaluated in parallel).
+  """
+
+  from robustness import cross_validate
+  fit = partial(fitBoundaryProfiles, alternatives_flows, profiles_categories)
+  predict = partial(predictWithBoundaryProfiles, alternatives_flows, profiles_categories)
+  return cross_validate(fit, predict, reference_assignments, folds, processes, seed)
+
+
+def assignFlows(comparison_with, alternatives, profiles_categories, flows, positive_flows=None, negative_flows=None):
+  """Assigns 'alternatives' silently, with the flows of the alternatives and
+  the profiles in the same dict - the form expected by the robustness
+  analysis (see get_weights_acceptabilities), where it is wrapped with
+  functools.partial.
+  """
+
+  if comparison_with == 'boundary_profiles':
+    assign = assignWithBoundaryProfiles
+  elif comparison_with == 'central_profiles':
+    assign = assignWithCentralProfiles
+  else:
+    raise InputDataError("Wrong comparison type ('{}') specified."
+                         .format(comparison_with))
+  return dict((alternative, assign(flows[alternative], profiles_categories, flows)) for alternative in alternatives)
+
+
+def getCuts(comparison_with, profiles_categories, categories_flows):
+  """Returns the (thresholds, classes, inclusive) tuple which gives the same
+  assignments as assignWithBoundaryProfiles or assignWithCentralProfiles
+  (see get_noise_acceptabilities), or None when the profiles' flows don't
+  increase with the classes, so the class isn't a step function of the
+  flow.
+  """
+
+  flows = [categories_flows[profiles_categories[i]["id"]] for i in range (1,len(profiles_categories)+1)]
+  if comparison_with == 'boundary_profiles':
+    thresholds = flows
+    classes = [profiles_categories[1]["classes"]["lower"]] + [profiles_categories[i]["classes"]["upper"] for i in range (1,len(profiles_categories)+1)]
+    inclusive = True
+  else:
+    thresholds = [(flows[i] + flows[i-1])/2 for i in range (1,len(flows))]
+    classes = [profiles_categories[i]["classes"] for i in range (1,len(profiles_categories)+1)]
+    inclusive = False
+  if thresholds != sorted(thresholds):
+    return None
+  return thresholds, classes, inclusive
+
+
+def sortScenarios(comparison_with, alternatives, alternatives_flows, scenarios_dirs):
+  """Assigns the alternatives with every set of profiles from
+  'scenarios_dirs' (see get_scenarios_dirs). Only the profiles are read
+  for every scenario, the alternatives' flows are read once and shared.
+  Returns a list of (name, assignments) tuples.
+  """
+
+  if comparison_with == 'boundary_profiles':
+    assign = assignWithBoundaryProfiles
+  else:
+    assign = assignWithCentralProfiles
+  filenames = [
+    ('classes.xml', False),
+    ('classes_profiles.xml', False),
+    ('flows.xml', False),
+  ]
+  params = ['categories_flows', 'profiles_categories']
+  scenarios = []
+  for name, scenario_dir in scenarios_dirs:
+    s = get_input_data(scenario_dir, filenames, params, comparison_with=comparison_with)
+    scenarios.append((name, dict((alternative, assign(alternatives_flows[alternative], s.profiles_categories, s.categories_flows)) for alternative in alternatives)))
+  return scenarios
+
+
+def sortWithUncertainWeights(input_dir, comparison_with, alternatives, profiles_categories, samples, processes=None, seed=None):
+  """Estimates the class acceptability indices of the alternatives when the
+  weights of the criteria are uncertain (see sort_with_uncertain_weights).
+  """
+
+  from robustness import sort_with_uncertain_weights
+  profiles = [profiles_categories[i]["id"] for i in profiles_categories]
+  sort = partial(assignFlows, comparison_with, alternatives, profiles_categories)
+  return sort_with_uncertain_weights(input_dir, comparison_with, alternatives, profiles, sort, samples, processes, seed)
+
+
+class FlowSortIndex(object):
+  """Keeps the alternatives sorted by their net flows, together with their
+  current assignments, for trying out different profiles' flows.
+
+  Both sorting variants are threshold tests on the net flow, so moving a
+  profile can only change the assignments of the alternatives whose flows
+  lie between the old and the new threshold (the profile's flow for
+  boundary profiles, the midpoints with the neighbouring profiles for
+  central ones). These are found by bisection, so moveProfile costs
+  O(log n + number of candidates) instead of re-sorting everything.
+  """
+
+  def __init__(self, alternatives, profiles_categories, alternatives_flows, categories_flows, comparison_with='boundary_profiles'):
+    if comparison_with == 'boundary_profiles':
+      self.assign = assignWithBoundaryProfiles
+    elif comparison_with == 'central_profiles':
+      self.assign = assignWithCentralProfiles
+    else:
+      raise InputDataError("Wrong comparison type ('{}') specified."
+                           .format(comparison_with))
+    self.comparison_with = comparison_with
+    self.profiles_categories = profiles_categories
+    self.categories_flows = dict((profiles_categories[i]["id"], categories_flows[profiles_categories[i]["id"]]) for i in profiles_categories)
+    self.ranks = dict((profiles_categories[i]["id"], i) for i in profiles_categories)
+    pairs = sorted((alternatives_flows[alternative], alternative) for alternative in alternatives)
+    self.flows = [flow for flow, alternative in pairs]
+    self.alternatives = [alternative for flow, alternative in pairs]
+    self.assignments = {}
+    for flow, alternative in pairs:
+      self.assignments[alternative] = self.assign(flow, profiles_categories, self.categories_flows)
+
+  def _getThresholds(self, profile):
+    # thresholds which depend on the profile's flow
+    if self.comparison_with == 'boundary_profiles':
+      return [self.categories_flows[profile]]
+    rank = self.ranks[profile]
+    thresholds = []
+    for i in (rank, rank + 1):
+      if 1 < i <= len(self.profiles_categories):
+        thresholds.append((self.categories_flows[self.profiles_categories[i]["id"]] + self.categories_flows[self.profiles_categories[i-1]["id"]])/2)
+    return thresholds
+
+  def moveProfile(self, profile, flow):
+    """Sets the flow of 'profile' and updates the assignments. Returns a
+    dict with the new assignments of the re-assigned alternatives only.
+    """
+    if profile not in self.ranks:
+      raise InputDataError("Unknown profile '{}'.".format(profile))
+    old_thresholds = self._getThresholds(profile)
+    self.categories_flows[profile] = flow
+    new_thresholds = self._getThresholds(profile)
+    candidates = set()
+    for old, new in zip(old_thresholds, new_thresholds):
+      low, high = min(old, new), max(old, new)
+      if self.comparison_with == 'boundary_profiles':
+        # 'flow >= threshold' changes for the flows in [low, high)
+        first, last = bisect_left(self.flows, low), bisect_left(self.flows, high)
+      else:
+        # 'flow > threshold' changes for the flows in (low, high]
+        first, last = bisect_right(self.flows, low), bisect_right(self.flows, high)
+      candidates.update(range(first, last))
+    reassigned = {}
+    for position in candidates:
+      alternative = self.alternatives[position]
+      assignment = self.assign(self.flows[position], self.profiles_categories, self.categories_flows)
+      if assignment != self.assignments[alternative]:
+        self.assignments[alternative] = assignment
+        reassigned[alternative] = assignment
+    return reassigned
+
+
+def run(input_dir, output_dir):
   try:
-    args = docopt(__doc__, version=__version__)
-    output_dir = None
-    input_dir, output_dir = get_dirs(args)
     filenames = [
       # every tuple below == (filename, is_optional)
       ('alternatives.xml', False),
@@ -83,28 +310,76 @@ def main():
       'alternatives_flows',
       'categories_flows',
       'categories_rank',
+      'compute_margins',
+      'flows_noise',
+      'noise_samples',
+      'processes',
+      'seed',
+      'weights_samples',
       'profiles_categories'
     ]
     d = get_input_data(input_dir, filenames, params)
-  
+
+    if d.noise_samples and d.flows_noise is None:
+      raise InputDataError("'flows_noise' should be specified along with 'noise_samples'.")
+
     if d.comparison_with == 'boundary_profiles':
-      assignments = sortWithBoundaryProfiles(d.alternatives, d.categories, d.profiles_categories, d.alternatives_flows, d.categories_flows)
-      xmcda_assign = assignments_to_xmcda(assignments)
+      output = sortWithBoundaryProfiles(d.alternatives, d.categories, d.profiles_categories, d.alternatives_flows, d.categories_flows, d.compute_margins)
     elif d.comparison_with == 'central_profiles':
-      assignments = sortWithCentralProfiles(d.alternatives, d.categories, d.profiles_categories, d.alternatives_flows, d.categories_flows)
-      xmcda_assign = assignments_to_xmcda(assignments)
+      output = sortWithCentralProfiles(d.alternatives, d.categories, d.profiles_categories, d.alternatives_flows, d.categories_flows, d.compute_margins)
     else:
       raise InputDataError("Wrong comparison type ('{}') specified."
-                             .format(comparison_with))
+                             .format(d.comparison_with))
 
+    if d.compute_margins:
+      from robustness import margins_to_xmcda
+      assignments, margins = output
+      write_xmcda(margins_to_xmcda(margins), os.path.join(output_dir, 'margins.xml'))
+    else:
+      assignments = output
+    xmcda_assign = assignments_to_xmcda(assignments)
     write_xmcda(xmcda_assign, os.path.join(output_dir, 'assignments.xml'))
 
+    if d.noise_samples:
+      from robustness import acceptabilities_to_xmcda, get_noise_acceptabilities
+      flows = dict(d.alternatives_flows)
+      flows.update(d.categories_flows)
+      sort = partial(assignFlows, d.comparison_with, d.alternatives, d.profiles_categories)
+      cuts = getCuts(d.comparison_with, d.profiles_categories, d.categories_flows)
+      distribution = get_noise_acceptabilities(d.alternatives, sort, d.noise_samples, d.flows_noise, flows=flows, processes=d.processes, seed=d.seed, cuts=cuts)
+      write_xmcda(acceptabilities_to_xmcda(distribution, 'AssignmentsDistribution'), os.path.join(output_dir, 'assignments_distribution.xml'))
+
+    if d.weights_samples:
+      from robustness import acceptabilities_to_xmcda
+      acceptabilities = sortWithUncertainWeights(input_dir, d.comparison_with, d.alternatives, d.profiles_categories, d.weights_samples, d.processes, d.seed)
+      write_xmcda(acceptabilities_to_xmcda(acceptabilities), os.path.join(output_dir, 'weights_acceptabilities.xml'))
+
+    scenarios = sortScenarios(d.comparison_with, d.alternatives, d.alternatives_flows, get_scenarios_dirs(input_dir))
+    if scenarios:
+      from robustness import disagreements_to_xmcda, get_disagreements, scenarios_to_xmcda
+      write_xmcda(scenarios_to_xmcda(scenarios), os.path.join(output_dir, 'scenarios_assignments.xml'))
+      write_xmcda(disagreements_to_xmcda(get_disagreements(scenarios)), os.path.join(output_dir, 'scenarios_disagreements.xml'))
+
+  except Exception as err:
+    err_msg = get_error_message(err)
+    log_msg = traceback.format_exc()
+    print(log_msg.strip())
+    create_messages_file((err_msg, ), (log_msg, ), output_dir)
+    return 1
+
+
+def main():
+  try:
+    args = docopt(__doc__, version=__version__)
+    output_dir = None
+    input_dir, output_dir = get_dirs(args)
   except Exception as err:
     err_msg = get_error_message(err)
     log_msg = traceback.format_exc()
     print(log_msg.strip())
     create_messages_file((err_msg, ), (log_msg, ), output_dir)
     return 1
+  return run_memoized(partial(run, input_dir), __file__, input_dir, output_dir, args['--no-cache'])
 
 if __name__ == '__main__':
   sys.exit(main())
@@ -0,0 +1 @@
+../flows.py
\ No newline at end of file
@@ -0,0 +1 @@
+../outranking.py
\ No newline at end of file
@@ -2,7 +2,7 @@
 
 """
 Usage:
-    FlowSortPrometheeISorting.py -i DIR -o DIR
+    FlowSortPrometheeISorting.py -i DIR -o DIR [--no-cache]
 
 Options:
     -i DIR     Specify input directory. It should contain the following files:
@@ -12,10 +12,33 @@ Options:
                    positive_flows.xml
                    negative_flows.xml
                    method_params.xml
+               and, when 'weights_samples' are set:
+                   criteria.xml
+                   performance_table.xml
+                   profiles_performance_table.xml
+                   weights.xml (optional, the weights' intervals)
+               and, optionally, the 'scenarios' subdirectory with
+               alternative sets of profiles - one directory per scenario,
+               with classes.xml, classes_profiles.xml and positive_flows.xml,
+               negative_flows.xml (profiles' flows)
     -o DIR     Specify output directory. Files generated as output:
+                   assignments.xml
+                   margins.xml (if 'compute_margins' is set)
+                   assignments_distribution.xml (if 'noise_samples' are set)
+                   weights_acceptabilities.xml (if 'weights_samples' are set)
+                   scenarios_assignments.xml and scenarios_disagreements.xml
+                   (if there are any scenarios)
+
+    --no-cache  Don't use the results stored in the directory given by the
+                PROMETHEE_RESULT_CACHE environment variable (if it's set).
 
     --version  Show version.
     -h --help  Show this screen.
+
+With the PROMETHEE_PARSE_CACHE environment variable set to a directory, the
+values read from the input files are cached there, and only the files whose
+values aren't cached yet are parsed and validated - the ones which aren't
+needed at all aren't validated either.
 """
 
 import os
@@ -23,86 +46,154 @@ import sys
 import traceback
 
 from docopt import docopt
+from functools import partial
 
-from common import comparisons_to_xmcda, create_messages_file, get_dirs, \
-get_error_message, get_input_data, write_xmcda, assignments_as_intervals_to_xmcda
+# robustness.py is imported only by the functions using it, see common.py
+from common import comparisons_to_xmcda, create_messages_file, get_dirs, get_error_message, \
+get_input_data, write_xmcda, assignments_as_intervals_to_xmcda, get_midpoints, InputDataError, \
+get_scenarios_dirs, run_memoized
 
 
 __version__ = '0.0.1'
 
 
 
-def sortWithBoundaryProfiles(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, categories_positive_flows, categories_negative_flows):
+def assignWithBoundaryProfiles(positive_flow, negative_flow, profiles_categories, categories_positive_flows, categories_negative_flows):
+
+  low = profiles_categories[1]["classes"]["lower"]
+  top = profiles_categories[1]["classes"]["lower"] 
+  for i in range (1,len(profiles_categories)+1):
+    if positive_flow >= categories_positive_flows[profiles_categories[i]["id"]]:
+      top = profiles_categories[i]["classes"]["upper"]
+    else:
+      break
   
+  for j in range (1,len(profiles_categories)+1):
+    if negative_flow < categories_negative_flows[profiles_categories[j]["id"]]:
+      low = profiles_categories[j]["classes"]["upper"]
+    else:
+      break
+  return (low, top)
+
+
+def assignWithCentralProfiles(positive_flow, negative_flow, profiles_categories, categories_positive_flows, categories_negative_flows):
+
+  low = profiles_categories[1]["classes"]
+  top = profiles_categories[1]["classes"]
+  for i in range (2,len(profiles_categories)+1):
+    if positive_flow >= (categories_positive_flows[profiles_categories[i]["id"]] + categories_positive_flows[profiles_categories[i-1]["id"]])/2:
+      top =  profiles_categories[i]["classes"]
+    else:
+      break
+  
+  for j in range (2,len(profiles_categories)+1):
+    if negative_flow < (categories_negative_flows[profiles_categories[j]["id"]] + categories_negative_flows[profiles_categories[j-1]["id"]])/2:
+      low = profiles_categories[j]["classes"]
+    else:
+      break
+  return (low, top)
+
+
+def sortWithBoundaryProfiles(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, categories_positive_flows, categories_negative_flows, with_margins=False):
+  
+  if with_margins:
+    from robustness import MarginsIndex, get_margin
   assignments = {}
-  #alternatives_assigns = {}
+  margins = {}
+  # margin == distance from any of the flows to the nearest profile's flow
+  positive_thresholds = sorted(categories_positive_flows[profiles_categories[i]["id"]] for i in profiles_categories)
+  negative_thresholds = sorted(categories_negative_flows[profiles_categories[i]["id"]] for i in profiles_categories)
   for alternative in alternatives:
-    #assign = {}
-    #assign["low"] = profiles_categories[1]["classes"]["lower"]
-    #assign["top"] = profiles_categories[1]["classes"]["lower"]
-    low = profiles_categories[1]["classes"]["lower"]
-    top = profiles_categories[1]["classes"]["lower"] 
-    for i in range (1,len(profiles_categories)+1):
-      if alternatives_positive_flows[alternative] >= categories_positive_flows[profiles_categories[i]["id"]]:
-        #assign["top"] = profiles_categories[i]["classes"]["upper"]
-        top = profiles_categories[i]["classes"]["upper"]
-      else:
-        break
-    
-    for j in range (1,len(profiles_categories)+1):
-      if alternatives_negative_flows[alternative] < categories_negative_flows[profiles_categories[j]["id"]]:
-        #assign["low"] = profiles_categories[j]["classes"]["upper"]
-        low = profiles_categories[j]["classes"]["upper"]
-      else:
-        break
-    #alternatives_assigns[alternative] = assign
-    assignments[alternative] = (low, top)
+    assignments[alternative] = assignWithBoundaryProfiles(alternatives_positive_flows[alternative], alternatives_negative_flows[alternative], profiles_categories, categories_positive_flows, categories_negative_flows)
+    if with_margins:
+      margins[alternative] = min(get_margin(alternatives_positive_flows[alternative], positive_thresholds), get_margin(alternatives_negative_flows[alternative], negative_thresholds))
     
   print (assignments)
+  if with_margins:
+    return assignments, MarginsIndex(margins)
   return assignments
 
   #print ('boundary')
 
 
-def sortWithCentralProfiles(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, categories_positive_flows, categories_negative_flows):
+def sortWithCentralProfiles(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, categories_positive_flows, categories_negative_flows, with_margins=False):
 
-  #alternatives_assigns = {}
+  if with_margins:
+    from robustness import MarginsIndex, get_margin
   assignments = {}
+  margins = {}
+  # margin == distance from any of the flows to the nearest midpoint between profiles
+  positive_thresholds = get_midpoints(profiles_categories, categories_positive_flows)
+  negative_thresholds = get_midpoints(profiles_categories, categories_negative_flows)
 
   for alternative in alternatives:
-    #assign = {}
-    #assign["low"] = profiles_categories[1]["classes"]
-    #assign["top"] = profiles_categories[1]["classes"]
-    low = profiles_categories[1]["classes"]
-    top = profiles_categories[1]["classes"]
-
-    for i in range (2,len(profiles_categories)+1):
-      if alternatives_positive_flows[alternative] >= (categories_positive_flows[profiles_categories[i]["id"]] + categories_positive_flows[profiles_categories[i-1]["id"]])/2:
-        #assign["top"] = profiles_categories[i]["classes"]
-        top =  profiles_categories[i]["classes"]
-      else:
-        break
-    
-    for j in range (2,len(profiles_categories)+1):
-      if alternatives_negative_flows[alternative] < (categories_negative_flows[profiles_categories[j]["id"]] + categories_negative_flows[profiles_categories[j-1]["id"]])/2:
-        #assign["low"] = profiles_categories[j]["classes"]
-        low = profiles_categories[j]["classes"]
-      else:
-        break
-    #alternatives_assigns[alternative] = assign
-    assignments[alternative] = (low, top)
-
-  #print (alternatives_assigns)
+    assignments[alternative] = assignWithCentralProfiles(alternatives_positive_flows[alternative], alternatives_negative_flows[alternative], profiles_categories, categories_positive_flows, categories_negative_flows)
+    if with_margins:
+      # no margins with a single profile, like in FlowSortPrometheeIISorting
+      margins[alternative] = min(get_margin(alternatives_positive_flows[alternative], positive_thresholds), get_margin(alternatives_negative_flows[alternative], negative_thresholds)) if positive_thresholds else None
+
   print (assignments)
   print ('central')
+  if with_margins:
+    return assignments, MarginsIndex(margins)
   return assignments
 
 
-def main():
+def assignFlows(comparison_with, alternatives, profiles_categories, flows, positive_flows, negative_flows):
+  """Assigns 'alternatives' silently, with the flows of the alternatives and
+  the profiles in the same dicts - the form expected by the robustness
+  analysis (see get_weights_acceptabilities), where it is wrapped with
+  functools.partial.
+  """
+
+  if comparison_with == 'boundary_profiles':
+    assign = assignWithBoundaryProfiles
+  elif comparison_with == 'central_profiles':
+    assign = assignWithCentralProfiles
+  else:
+    raise InputDataError("Wrong comparison type ('{}') specified."
+                         .format(comparison_with))
+  return dict((alternative, assign(positive_flows[alternative], negative_flows[alternative], profiles_categories, positive_flows, negative_flows)) for alternative in alternatives)
+
+
+def sortWithUncertainWeights(input_dir, comparison_with, alternatives, profiles_categories, samples, processes=None, seed=None):
+  """Estimates the class acceptability indices of the alternatives when the
+  weights of the criteria are uncertain (see sort_with_uncertain_weights).
+  """
+
+  from robustness import sort_with_uncertain_weights
+  profiles = [profiles_categories[i]["id"] for i in profiles_categories]
+  sort = partial(assignFlows, comparison_with, alternatives, profiles_categories)
+  return sort_with_uncertain_weights(input_dir, comparison_with, alternatives, profiles, sort, samples, processes, seed)
+
+
+def sortScenarios(comparison_with, alternatives, alternatives_positive_flows, alternatives_negative_flows, scenarios_dirs):
+  """Assigns the alternatives with every set of profiles from
+  'scenarios_dirs' (see get_scenarios_dirs). Only the profiles are read
+  for every scenario, the alternatives' flows are read once and shared.
+  Returns a list of (name, assignments) tuples.
+  """
+
+  if comparison_with == 'boundary_profiles':
+    assign = assignWithBoundaryProfiles
+  else:
+    assign = assignWithCentralProfiles
+  filenames = [
+    ('classes.xml', False),
+    ('classes_profiles.xml', False),
+    ('positive_flows.xml', False),
+    ('negative_flows.xml', False),
+  ]
+  params = ['categories_positive_flows', 'categories_negative_flows', 'profiles_categories']
+  scenarios = []
+  for name, scenario_dir in scenarios_dirs:
+    s = get_input_data(scenario_dir, filenames, params, comparison_with=comparison_with)
+    scenarios.append((name, dict((alternative, assign(alternatives_positive_flows[alternative], alternatives_negative_flows[alternative], s.profiles_categories, s.categories_positive_flows, s.categories_negative_flows)) for alternative in alternatives)))
+  return scenarios
+
+
+def run(input_dir, output_dir):
   try:
-    args = docopt(__doc__, version=__version__)
-    output_dir = None
-    input_dir, output_dir = get_dirs(args)
     filenames = [
       # every tuple below == (filename, is_optional)
       ('alternatives.xml', False),
@@ -121,26 +212,76 @@ def main():
       'categories_positive_flows',
       'categories_negative_flows',
       'categories_rank',
+      'compute_margins',
+      'flows_noise',
+      'noise_samples',
+      'processes',
+      'seed',
+      'weights_samples',
       'profiles_categories'
     ]
     d = get_input_data(input_dir, filenames, params)
-  
+
+    if d.noise_samples and d.flows_noise is None:
+      raise InputDataError("'flows_noise' should be specified along with 'noise_samples'.")
+
     if d.comparison_with == 'boundary_profiles':
-      assignments = sortWithBoundaryProfiles(d.alternatives, d.categories, d.profiles_categories, d.alternatives_positive_flows, d.alternatives_negative_flows, d.categories_positive_flows, d.categories_negative_flows)
+      output = sortWithBoundaryProfiles(d.alternatives, d.categories, d.profiles_categories, d.alternatives_positive_flows, d.alternatives_negative_flows, d.categories_positive_flows, d.categories_negative_flows, d.compute_margins)
     elif d.comparison_with == 'central_profiles':
-      assignments = sortWithCentralProfiles(d.alternatives, d.categories, d.profiles_categories, d.alternatives_positive_flows, d.alternatives_negative_flows, d.categories_positive_flows, d.categories_negative_flows)
+      output = sortWithCentralProfiles(d.alternatives, d.categories, d.profiles_categories, d.alternatives_positive_flows, d.alternatives_negative_flows, d.categories_positive_flows, d.categories_negative_flows, d.compute_margins)
     else:
       raise InputDataError("Wrong comparison type ('{}') specified."
-                             .format(comparison_with))
+                             .format(d.comparison_with))
+    if d.compute_margins:
+      from robustness import margins_to_xmcda
+      assignments, margins = output
+      write_xmcda(margins_to_xmcda(margins), os.path.join(output_dir, 'margins.xml'))
+    else:
+      assignments = output
     xmcda_assign = assignments_as_intervals_to_xmcda(assignments)
     write_xmcda(xmcda_assign, os.path.join(output_dir, 'assignments.xml'))
 
+    if d.noise_samples:
+      from robustness import acceptabilities_to_xmcda, get_noise_acceptabilities
+      positive_flows = dict(d.alternatives_positive_flows)
+      positive_flows.update(d.categories_positive_flows)
+      negative_flows = dict(d.alternatives_negative_flows)
+      negative_flows.update(d.categories_negative_flows)
+      sort = partial(assignFlows, d.comparison_with, d.alternatives, d.profiles_categories)
+      distribution = get_noise_acceptabilities(d.alternatives, sort, d.noise_samples, d.flows_noise, positive_flows=positive_flows, negative_flows=negative_flows, processes=d.processes, seed=d.seed)
+      write_xmcda(acceptabilities_to_xmcda(distribution, 'AssignmentsDistribution'), os.path.join(output_dir, 'assignments_distribution.xml'))
+
+    if d.weights_samples:
+      from robustness import acceptabilities_to_xmcda
+      acceptabilities = sortWithUncertainWeights(input_dir, d.comparison_with, d.alternatives, d.profiles_categories, d.weights_samples, d.processes, d.seed)
+      write_xmcda(acceptabilities_to_xmcda(acceptabilities), os.path.join(output_dir, 'weights_acceptabilities.xml'))
+
+    scenarios = sortScenarios(d.comparison_with, d.alternatives, d.alternatives_positive_flows, d.alternatives_negative_flows, get_scenarios_dirs(input_dir))
+    if scenarios:
+      from robustness import disagreements_to_xmcda, get_disagreements, scenarios_to_xmcda
+      write_xmcda(scenarios_to_xmcda(scenarios, as_intervals=True), os.path.join(output_dir, 'scenarios_assignments.xml'))
+      write_xmcda(disagreements_to_xmcda(get_disagreements(scenarios)), os.path.join(output_dir, 'scenarios_disagreements.xml'))
+
+  except Exception as err:
+    err_msg = get_error_message(err)
+    log_msg = traceback.format_exc()
+    print(log_msg.strip())
+    create_messages_file((err_msg, ), (log_msg, ), output_dir)
+    return 1
+
+
+def main():
+  try:
+    args = docopt(__doc__, version=__version__)
+    output_dir = None
+    input_dir, output_dir = get_dirs(args)
   except Exception as err:
     err_msg = get_error_message(err)
     log_msg = traceback.format_exc()
     print(log_msg.strip())
     create_messages_file((err_msg, ), (log_msg, ), output_dir)
     return 1
+  return run_memoized(partial(run, input_dir), __file__, input_dir, output_dir, args['--no-cache'])
 
 if __name__ == '__main__':
   sys.exit(main())
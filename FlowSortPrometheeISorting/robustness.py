@@ -0,0 +1 @@
+../robustness.py
\ No newline at end of file
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+"""
+Usage:
+    PrometheeIIRanking.py -i DIR -o DIR [--no-cache]
+    PrometheeIIRanking.py --flows FILE -o DIR [--first N] [--last N]
+
+Options:
+    -i DIR        Specify input directory. It should contain the following files:
+                      alternatives.xml
+                      flows.xml
+                      method_parameters.xml (optional, 'first_rank' and 'last_rank')
+    -o DIR        Specify output directory. Files generated as output:
+                      ranking.xml (ranking.txt when --flows is used)
+    --flows FILE  Read the net flows from a flat file ('alternative flow' per
+                  line) instead; the file is not loaded into memory as a whole.
+    --first N     First rank to output [default: 1].
+    --last N      Last rank to output (all by default).
+    --no-cache    Don't use the results stored in the directory given by the
+                  PROMETHEE_RESULT_CACHE environment variable (if it's set).
+
+    --version     Show version.
+    -h --help     Show this screen.
+
+With the PROMETHEE_PARSE_CACHE environment variable set to a directory, the
+values read from the input files are cached there, and only the files whose
+values aren't cached yet are parsed and validated - the ones which aren't
+needed at all aren't validated either.
+"""
+
+import os
+import sys
+import traceback
+
+from docopt import docopt
+from functools import partial
+
+from common import create_messages_file, get_dirs, get_error_message, \
+get_input_data, write_xmcda, InputDataError, run_memoized
+from flows import get_ranking, iter_flat_flows, ranking_to_xmcda, write_flat_ranking
+
+
+__version__ = '0.0.1'
+
+
+def rankPrometheeII(alternatives_flows, first_rank=1, last_rank=None):
+
+  return get_ranking(alternatives_flows, first_rank, last_rank)
+
+
+def run(input_dir, output_dir):
+  try:
+    filenames = [
+      # every tuple below == (filename, is_optional)
+      ('alternatives.xml', False),
+      ('flows.xml', False),
+      ('method_parameters.xml', True),
+    ]
+    params = [
+      'alternatives',
+      'alternatives_flows',
+      'first_rank',
+      'last_rank',
+    ]
+    d = get_input_data(input_dir, filenames, params)
+
+    alternatives_flows = ((alternative, d.alternatives_flows[alternative]) for alternative in d.alternatives)
+    ranking = rankPrometheeII(alternatives_flows, d.first_rank, d.last_rank)
+    xmcda_ranking = ranking_to_xmcda(ranking)
+
+    write_xmcda(xmcda_ranking, os.path.join(output_dir, 'ranking.xml'))
+
+  except Exception as err:
+    err_msg = get_error_message(err)
+    log_msg = traceback.format_exc()
+    print(log_msg.strip())
+    create_messages_file((err_msg, ), (log_msg, ), output_dir)
+    return 1
+
+
+def main():
+  try:
+    args = docopt(__doc__, version=__version__)
+    output_dir = None
+    if args['--flows']:
+      output_dir = args['-o']
+      if not os.path.isdir(output_dir):
+        raise InputDataError("Directory '{}' doesn't exist. Aborting."
+                             .format(output_dir))
+      try:
+        first_rank = int(args['--first'])
+        last_rank = int(args['--last']) if args['--last'] else None
+      except ValueError:
+        raise InputDataError("Ranks should be integers.")
+      ranking = rankPrometheeII(iter_flat_flows(args['--flows']), first_rank, last_rank)
+      write_flat_ranking(ranking, os.path.join(output_dir, 'ranking.txt'))
+      return
+
+    input_dir, output_dir = get_dirs(args)
+  except Exception as err:
+    err_msg = get_error_message(err)
+    log_msg = traceback.format_exc()
+    print(log_msg.strip())
+    create_messages_file((err_msg, ), (log_msg, ), output_dir)
+    return 1
+  # the flat files are streamed, so only the XMCDA inputs are memoized
+  return run_memoized(partial(run, input_dir), __file__, input_dir, output_dir, args['--no-cache'])
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1 @@
+../PyXMCDA.py
\ No newline at end of file
@@ -0,0 +1 @@
+../caches.py
\ No newline at end of file
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+"""
+Usage:
+    PrometheeMultiSorting.py -i DIR -o DIR [--methods LIST] [--parallel MODE] [--no-cache]
+
+Runs several sorting methods on the same input, every one of them just like
+its own module would run it (see their usage), but in the same process,
+so the input files are parsed only once. The outputs of every method go to
+the subdirectory of the output directory named after the method.
+
+Options:
+    -i DIR           Specify input directory. It should contain the files
+                     needed by all the selected methods:
+                         alternatives.xml
+                         classes.xml
+                         classes_profiles.xml
+                         method_parameters.xml
+                         flows.xml (FlowSortPrometheeIISorting,
+                         PrometheeTriSorting)
+                         positive_flows.xml, negative_flows.xml
+                         (FlowSortPrometheISorting, Promsort)
+                     and, optionally, the 'scenarios' subdirectory.
+    -o DIR           Specify output directory. Files generated as output:
+                         METHOD/... (the outputs of every method)
+                         agreement.tsv (the share of the alternatives
+                         assigned alike by every pair of the methods - see
+                         agreements.get_agreements)
+    --methods LIST   Comma-separated list of the methods to run
+                     [default: FlowSortPrometheeIISorting,FlowSortPrometheISorting,PrometheeTriSorting,Promsort].
+    --parallel MODE  Run the methods one after another ('none'), in threads
+                     ('threads') or in processes ('processes' - then each
+                     method runs in a single process, e.g. its robustness
+                     analysis doesn't start processes of its own)
+                     [default: none].
+
+    --no-cache       Don't use the results stored in the directory given by
+                     the PROMETHEE_RESULT_CACHE environment variable (if
+                     it's set).
+
+    --version        Show version.
+    -h --help        Show this screen.
+"""
+
+import os
+import sys
+import traceback
+
+from docopt import docopt
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+
+from agreements import get_agreements, get_categories_ranks, read_assignments, write_agreements
+from common import create_messages_file, get_dirs, get_error_message, \
+get_input_data, InputDataError, keep_trees, load_trees
+from PrometheeWorker import getMethodModule, runJob
+from robustness import limit_processes
+
+
+__version__ = '0.0.1'
+
+SORTING_METHODS = [
+  'FlowSortPrometheeIISorting',
+  'FlowSortPrometheISorting',
+  'PrometheeTriSorting',
+  'Promsort',
+]
+
+
+def getMethods(methods_list):
+  methods = []
+  for method in methods_list.split(','):
+    method = method.strip()
+    if method not in SORTING_METHODS:
+      raise InputDataError("Unknown sorting method '{}'.".format(method))
+    if method not in methods:
+      methods.append(method)
+  return methods
+
+
+def runMethods(methods, input_dir, output_dir, parallel='none', no_cache=False):
+  """Runs 'methods' on the input from 'input_dir', parsed beforehand, and
+  returns their results (see PrometheeWorker.runJob).
+  """
+
+  jobs = []
+  for method in methods:
+    method_dir = os.path.join(output_dir, method)
+    if not os.path.isdir(method_dir):
+      os.mkdir(method_dir)
+    jobs.append({'id': method, 'method': method, 'input_dir': input_dir, 'output_dir': method_dir, 'options': {'no_cache': no_cache}})
+    # imported here rather than by the threads
+    getMethodModule(method)
+  # the processes get the parsed files when they're forked
+  keep_trees()
+  load_trees(input_dir)
+  if parallel == 'none' or len(jobs) == 1:
+    return [runJob(job) for job in jobs]
+  if parallel == 'threads':
+    pool = ThreadPool(len(jobs))
+  else:
+    # the workers are daemonic, so they can't start pools of their own
+    pool = Pool(len(jobs), initializer=limit_processes, initargs=(1,))
+  try:
+    return pool.map(runJob, jobs)
+  finally:
+    pool.close()
+    pool.join()
+
+
+def getCategoriesRanks(input_dir):
+  """Ranks the categories according to the profiles from
+  classes_profiles.xml, whether they're central or boundary ones.
+  """
+
+  filenames = [
+    ('classes.xml', False),
+    ('classes_profiles.xml', False),
+  ]
+  for comparison_with in ('central_profiles', 'boundary_profiles'):
+    try:
+      d = get_input_data(input_dir, filenames, ['profiles_categories'], comparison_with=comparison_with)
+    except InputDataError:
+      continue
+    return get_categories_ranks(d.profiles_categories)
+  raise InputDataError("Can't rank the categories using 'classes_profiles.xml'.")
+
+
+def getMethodsAgreements(results, input_dir, output_dir):
+  """Compares the assignments of the methods which have finished
+  successfully.
+  """
+
+  assignments = {}
+  for result in results:
+    file_name = os.path.join(output_dir, result['method'], 'assignments.xml')
+    # there are no assignments e.g. if Promsort is given 'cut_points' only
+    if result['status'] == 'ok' and os.path.isfile(file_name):
+      assignments[result['method']] = read_assignments(file_name)
+  return get_agreements(assignments, getCategoriesRanks(input_dir))
+
+
+def main():
+  try:
+    args = docopt(__doc__, version=__version__)
+    output_dir = None
+    input_dir, output_dir = get_dirs(args)
+    methods = getMethods(args['--methods'])
+    if args['--parallel'] not in ('none', 'threads', 'processes'):
+      raise InputDataError("Wrong parallel mode ('{}') specified.".format(args['--parallel']))
+
+    results = runMethods(methods, input_dir, output_dir, args['--parallel'], args['--no-cache'])
+    for result in results:
+      print('{}: {} ({:.3f} s)'.format(result['method'], result['status'], result['timings']['total']))
+    agreements = getMethodsAgreements(results, input_dir, output_dir)
+    write_agreements(agreements, os.path.join(output_dir, 'agreement.tsv'))
+
+    failed = [result['method'] for result in results if result['status'] != 'ok']
+    if failed:
+      raise InputDataError("Method(s) failed: {} (see their messages.xml).".format(', '.join(failed)))
+  except Exception as err:
+    err_msg = get_error_message(err)
+    log_msg = traceback.format_exc()
+    print(log_msg.strip())
+    create_messages_file((err_msg, ), (log_msg, ), output_dir)
+    return 1
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+
+"""
+Usage:
+    PrometheeService.py [--host HOST] [--port PORT] [--workers N] [--queue-size N] [--keep-finished N]
+    PrometheeService.py --socket PATH [--workers N] [--queue-size N] [--keep-finished N]
+
+A local HTTP service running the jobs of the sorting modules (the same ones
+as PrometheeWorker.py) in a pool of processes. It's built on asyncio, so it
+requires python 3. Endpoints (all of them take and return JSON):
+
+    POST   /jobs      Submits a job: {"method": ..., "input_dir": ...,
+                      "output_dir": ..., "options": {...}} or, with the
+                      XMCDA documents sent along instead of the directories,
+                      {"method": ..., "files": {"alternatives.xml": "...",
+                      ...}}. Returns 202 with the job's "id", or 503 when
+                      the queue is full (try again later).
+    GET    /jobs/ID   Returns the job's "status" (queued, running, done,
+                      error or cancelled) and, once it's finished, its
+                      "result" (with the output files for the jobs sent
+                      with "files").
+    DELETE /jobs/ID   Cancels the job. A running job can't be interrupted,
+                      so it's abandoned, i.e. its result is discarded, but
+                      it keeps its worker busy until it ends.
+    GET    /stats     Returns the number of queued and running jobs.
+
+Options:
+    --host HOST        Host to listen on [default: 127.0.0.1].
+    --port PORT        Port to listen on [default: 8080].
+    --socket PATH      Listen on a Unix socket instead.
+    --workers N        Number of jobs run at the same time, i.e. of worker
+                       processes (the number of CPUs by default).
+    --queue-size N     Max. number of queued jobs [default: 100].
+    --keep-finished N  Number of finished jobs whose results are kept
+                       [default: 1000].
+
+    --version          Show version.
+    -h --help          Show this screen.
+"""
+
+import asyncio
+import collections
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+from docopt import docopt
+
+from robustness import limit_processes
+from PrometheeWorker import METHODS, runJob
+
+
+__version__ = '0.0.1'
+
+MAX_BODY_SIZE = 64 * 2 ** 20
+
+REASONS = {
+  200: 'OK',
+  202: 'Accepted',
+  400: 'Bad Request',
+  404: 'Not Found',
+  405: 'Method Not Allowed',
+  409: 'Conflict',
+  413: 'Payload Too Large',
+  503: 'Service Unavailable',
+}
+
+
+class RequestError(Exception):
+
+  def __init__(self, status, message):
+    Exception.__init__(self, message)
+    self.status = status
+
+
+def runServiceJob(job):
+  """Runs 'job' in a worker process. The jobs sent with "files" get
+  temporary input and output directories, and the output files are
+  returned with the result.
+  """
+
+  stdout = sys.stdout
+  # the modules print their results
+  sys.stdout = sys.stderr
+  try:
+    if 'files' not in job:
+      return runJob(job)
+    temp_dir = tempfile.mkdtemp()
+    try:
+      input_dir = os.path.join(temp_dir, 'in')
+      output_dir = os.path.join(temp_dir, 'out')
+      os.mkdir(input_dir)
+      os.mkdir(output_dir)
+      for name, content in job['files'].items():
+        with open(os.path.join(input_dir, name), 'w') as f:
+          f.write(content)
+      result = runJob(dict(job, input_dir=input_dir, output_dir=output_dir))
+      result['files'] = {}
+      for name in os.listdir(output_dir):
+        with open(os.path.join(output_dir, name)) as f:
+          result['files'][name] = f.read()
+      return result
+    finally:
+      shutil.rmtree(temp_dir, ignore_errors=True)
+  finally:
+    sys.stdout = stdout
+
+
+def checkJob(job):
+  """Raises RequestError if 'job' isn't a valid job."""
+
+  if not isinstance(job, dict):
+    raise RequestError(400, "A job should be a JSON object.")
+  if job.get('method') not in METHODS:
+    raise RequestError(400, "Unknown method '{}'.".format(job.get('method')))
+  if 'files' in job:
+    files = job['files']
+    if not isinstance(files, dict) or not all(isinstance(content, str) for content in files.values()):
+      raise RequestError(400, "'files' should map the file names to their contents.")
+    for name in files:
+      if not name or os.path.basename(name) != name or name.startswith('.'):
+        raise RequestError(400, "Wrong file name: '{}'.".format(name))
+  elif not (isinstance(job.get('input_dir'), str) and isinstance(job.get('output_dir'), str)):
+    raise RequestError(400, "Either 'files' or 'input_dir' and 'output_dir' should be given.")
+
+
+class SortingService(object):
+  """Keeps the queue of the jobs and their statuses. The jobs are taken off
+  the queue by 'workers' tasks, each of them running one job at a time in
+  the pool of processes, so the queue fills up (and the new jobs are
+  rejected) when the jobs come faster than they're done.
+  """
+
+  def __init__(self, workers=None, queue_size=100, keep_finished=1000):
+    self.workers = workers or multiprocessing.cpu_count()
+    self.queue_size = queue_size
+    self.keep_finished = keep_finished
+    self.jobs = {}
+    self.finished = collections.deque()
+    self.running = 0
+    self.ids = itertools.count(1)
+    self.executor = None
+    self.queue = None
+    self.tasks = []
+
+  async def start(self):
+    # the worker processes don't start pools of their own
+    self.executor = ProcessPoolExecutor(self.workers, initializer=limit_processes, initargs=(1,))
+    # starts the processes now, before we listen: forked on the first job
+    # they would inherit the open connections, which then wouldn't close
+    await asyncio.get_event_loop().run_in_executor(self.executor, os.getpid)
+    self.queue = asyncio.Queue(self.queue_size)
+    self.tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+  async def stop(self):
+    for task in self.tasks:
+      task.cancel()
+    await asyncio.gather(*self.tasks, return_exceptions=True)
+    self.executor.shutdown(wait=False)
+
+  def submit(self, job):
+    checkJob(job)
+    job_id = str(next(self.ids))
+    try:
+      self.queue.put_nowait(job_id)
+    except asyncio.QueueFull:
+      raise RequestError(503, "The queue is full, try again later.")
+    self.jobs[job_id] = {'id': job_id, 'status': 'queued', 'job': job}
+    return job_id
+
+  def getStatus(self, job_id):
+    entry = self._getEntry(job_id)
+    status = {'id': job_id, 'status': entry['status']}
+    if 'result' in entry:
+      status['result'] = entry['result']
+    return status
+
+  def cancel(self, job_id):
+    entry = self._getEntry(job_id)
+    if entry['status'] not in ('queued', 'running'):
+      raise RequestError(409, "The job is {} already.".format(entry['status']))
+    # a running job goes on in its process, and its worker waits for it
+    # (see _work), so it isn't counted as free
+    self._finish(entry, 'cancelled')
+    return {'id': job_id, 'status': 'cancelled'}
+
+  def getStats(self):
+    return {
+      'queued': self.queue.qsize(),
+      'running': self.running,
+      'workers': self.workers,
+      'queue_size': self.queue_size,
+    }
+
+  def _getEntry(self, job_id):
+    if job_id not in self.jobs:
+      raise RequestError(404, "Unknown job '{}'.".format(job_id))
+    return self.jobs[job_id]
+
+  def _finish(self, entry, status, result=None):
+    entry['status'] = status
+    if result is not None:
+      entry['result'] = result
+    self.finished.append(entry['id'])
+    while len(self.finished) > self.keep_finished:
+      self.jobs.pop(self.finished.popleft(), None)
+
+  async def _work(self):
+    loop = asyncio.get_event_loop()
+    while True:
+      job_id = await self.queue.get()
+      entry = self.jobs.get(job_id)
+      if entry is None or entry['status'] != 'queued':
+        # cancelled while queued
+        continue
+      entry['status'] = 'running'
+      self.running += 1
+      try:
+        # the job is awaited even when it's cancelled: only the service
+        # being stopped cancels this task
+        result = await loop.run_in_executor(self.executor, runServiceJob, entry['job'])
+      except asyncio.CancelledError:
+        raise
+      except Exception as err:
+        result = {'status': 'error', 'error': '{}: {}'.format(type(err).__name__, err)}
+      finally:
+        self.running -= 1
+      if entry['status'] == 'cancelled':
+        continue
+      self._finish(entry, 'done' if result['status'] == 'ok' else 'error', result)
+
+  def dispatch(self, method, path, body):
+    """Handles a request, returns a tuple (status, response)."""
+
+    parts = path.split('?')[0].strip('/').split('/')
+    if parts == ['jobs']:
+      if method != 'POST':
+        raise RequestError(405, "Use POST to submit a job.")
+      try:
+        job = json.loads(body.decode('utf-8'))
+      except ValueError:
+        raise RequestError(400, "The job isn't valid JSON.")
+      return 202, {'id': self.submit(job), 'status': 'queued'}
+    if len(parts) == 2 and parts[0] == 'jobs':
+      if method == 'GET':
+        return 200, self.getStatus(parts[1])
+      if method == 'DELETE':
+        return 200, self.cancel(parts[1])
+      raise RequestError(405, "Use GET or DELETE.")
+    if parts == ['stats'] and method == 'GET':
+      return 200, self.getStats()
+    raise RequestError(404, "Unknown path '{}'.".format(path))
+
+  async def handle(self, reader, writer):
+    """Handles a single HTTP request per connection."""
+
+    try:
+      request_line = await reader.readline()
+      try:
+        method, path, _ = request_line.decode('latin-1').split(' ', 2)
+        headers = {}
+        while True:
+          line = await reader.readline()
+          if line in (b'\r\n', b'\n', b''):
+            break
+          name, _, value = line.decode('latin-1').partition(':')
+          headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0))
+        if length > MAX_BODY_SIZE:
+          raise RequestError(413, "The request is too large.")
+        body = await reader.readexactly(length) if length else b''
+        status, response = self.dispatch(method, path, body)
+      except RequestError as err:
+        status, response = err.status, {'error': str(err)}
+      except (ValueError, asyncio.IncompleteReadError):
+        status, response = 400, {'error': "Malformed request."}
+      data = json.dumps(response, sort_keys=True).encode('utf-8')
+      head = ('HTTP/1.1 {} {}\r\n'
+              'Content-Type: application/json\r\n'
+              'Content-Length: {}\r\n'
+              'Connection: close\r\n\r\n').format(status, REASONS[status], len(data))
+      writer.write(head.encode('latin-1') + data)
+      await writer.drain()
+    except ConnectionError:
+      pass
+    finally:
+      writer.close()
+
+
+async def serve(service, host=None, port=None, socket_path=None):
+  await service.start()
+  try:
+    if socket_path:
+      server = await asyncio.start_unix_server(service.handle, path=socket_path)
+    else:
+      server = await asyncio.start_server(service.handle, host, port)
+    async with server:
+      await server.serve_forever()
+  finally:
+    await service.stop()
+
+
+def main():
+  args = docopt(__doc__, version=__version__)
+  service = SortingService(
+    int(args['--workers']) if args['--workers'] else None,
+    int(args['--queue-size']),
+    int(args['--keep-finished']),
+  )
+  try:
+    asyncio.run(serve(service, args['--host'], int(args['--port']), args['--socket']))
+  except KeyboardInterrupt:
+    pass
+
+if __name__ == '__main__':
+  sys.exit(main())
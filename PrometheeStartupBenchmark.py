@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+"""
+Usage:
+    PrometheeStartupBenchmark.py [--runs N] [--save FILE] [--baseline FILE] [--tolerance T]
+
+Measures the startup time of the modules (and of PrometheeWorker.py): for
+every one of them, a fresh interpreter imports its dependencies one by one
+(lxml.etree, docopt, PyXMCDA, common, and then the module itself, so every
+import is timed without the ones before it), and the no-op run ('--version')
+of the script is timed as a whole. The best of N runs is reported, in ms,
+together with the slow-to-import modules which got imported although none
+of the entry points should need them on startup. Note that with
+PYTHONDONTWRITEBYTECODE set, the compilation of the imported modules is
+measured too, since it happens on every run.
+
+With --baseline, the times are compared to the ones saved before (with
+--save), and the exit code is 1 if any of them got slower by more than the
+tolerance (a fraction of the baseline, but at least 5 ms, since the startup
+times are noisy). PrometheeStartupBaseline.json holds the times of the
+sorting modules from before the robustness analyses, the caches and the
+outranking relations were added (Python 2.7, 15 runs), so that these can be
+checked not to slow down the startup:
+
+    PrometheeStartupBenchmark.py --runs 15 --baseline PrometheeStartupBaseline.json
+
+Options:
+    --runs N         Number of runs [default: 5].
+    --save FILE      Save the times (JSON) to FILE.
+    --baseline FILE  Compare the times to the ones from FILE.
+    --tolerance T    Allowed slowdown [default: 0.5].
+
+    --version        Show version.
+    -h --help        Show this screen.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+from docopt import docopt
+
+
+__version__ = '0.0.1'
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DEPENDENCIES = ['lxml.etree', 'docopt', 'PyXMCDA', 'common']
+
+# the modules which shouldn't be imported on startup
+HEAVY_MODULES = ['networkx', 'multiprocessing', 'decimal', 'numpy', 'scipy']
+
+MIN_SLOWDOWN = 0.005
+
+IMPORTS_CODE = '''
+import json, sys, time
+times = {}
+for name in %r:
+  start = time.time()
+  __import__(name)
+  times[name] = time.time() - start
+print(json.dumps({'imports': times, 'heavy': [name for name in %r if name in sys.modules]}))
+'''
+
+
+def getEntryPoints():
+  """Returns a list of tuples (name, directory, script)."""
+
+  # imported here, so that our own startup doesn't count
+  from PrometheeWorker import METHODS
+  entry_points = [(method, os.path.join(ROOT, directory), method + '.py')
+                  for method, directory in sorted(METHODS.items())]
+  entry_points.append(('PrometheeWorker', ROOT, 'PrometheeWorker.py'))
+  return entry_points
+
+
+def measureImports(directory, module):
+  code = IMPORTS_CODE % (DEPENDENCIES + [module], HEAVY_MODULES)
+  output = subprocess.check_output([sys.executable, '-c', code], cwd=directory)
+  return json.loads(output.decode('utf-8'))
+
+
+def measureRun(directory, script):
+  with open(os.devnull, 'w') as devnull:
+    start = time.time()
+    subprocess.check_call([sys.executable, script, '--version'], cwd=directory, stdout=devnull)
+    return time.time() - start
+
+
+def measure(runs):
+  """Returns a tuple (times, heavy), where 'times' maps every entry point to
+  the (best) times of its imports and of its no-op run, and 'heavy' maps it
+  to the heavy modules it imported.
+  """
+
+  times, heavy = {}, {}
+  for name, directory, script in getEntryPoints():
+    module = os.path.splitext(script)[0]
+    best = {}
+    for _ in range(runs):
+      result = measureImports(directory, module)
+      result['imports']['run'] = measureRun(directory, script)
+      for key, value in result['imports'].items():
+        best[key] = min(best.get(key, value), value)
+    times[name] = dict((key if key != module else 'module', value) for key, value in best.items())
+    heavy[name] = result['heavy']
+  return times, heavy
+
+
+def getSlowdowns(times, baseline, tolerance):
+  """Returns a list of tuples (entry point, step, baseline time, time) for
+  the steps slower than in 'baseline'.
+  """
+
+  slowdowns = []
+  for name in sorted(times):
+    for step in sorted(times[name]):
+      old = baseline.get(name, {}).get(step)
+      new = times[name][step]
+      if old is not None and new > old * (1 + tolerance) and new - old > MIN_SLOWDOWN:
+        slowdowns.append((name, step, old, new))
+  return slowdowns
+
+
+def printTimes(times, heavy):
+  steps = DEPENDENCIES + ['module', 'run']
+  print('{:<28}'.format('entry point') + ''.join('{:>12}'.format(step) for step in steps))
+  for name in sorted(times):
+    row = '{:<28}'.format(name) + ''.join('{:>12.1f}'.format(times[name][step] * 1000) for step in steps)
+    if heavy[name]:
+      row += '  imports: ' + ', '.join(heavy[name])
+    print(row)
+
+
+def main():
+  args = docopt(__doc__, version=__version__)
+  times, heavy = measure(int(args['--runs']))
+  printTimes(times, heavy)
+  if args['--save']:
+    with open(args['--save'], 'w') as f:
+      json.dump(times, f, indent=2, sort_keys=True)
+  if args['--baseline']:
+    with open(args['--baseline']) as f:
+      baseline = json.load(f)
+    slowdowns = getSlowdowns(times, baseline, float(args['--tolerance']))
+    for name, step, old, new in slowdowns:
+      print('{}: {} got slower ({:.1f} ms -> {:.1f} ms)'.format(name, step, old * 1000, new * 1000))
+    if slowdowns:
+      return 1
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -2,7 +2,7 @@
 
 """
 Usage:
-    FlowSortPrometheeISorting.py -i DIR -o DIR
+    FlowSortPrometheeISorting.py -i DIR -o DIR [--no-cache]
 
 Options:
     -i DIR     Specify input directory. It should contain the following files:
@@ -10,10 +10,33 @@ Options:
                    classes.xml
                    classes_profiles.xml
                    flows.xml
+                   method_parameters.xml (optional)
+               and, when 'weights_samples' are set:
+                   criteria.xml
+                   performance_table.xml
+                   profiles_performance_table.xml
+                   weights.xml (optional, the weights' intervals)
+               and, optionally, the 'scenarios' subdirectory with
+               alternative sets of profiles - one directory per scenario,
+               with classes.xml, classes_profiles.xml and flows.xml (profiles' flows)
     -o DIR     Specify output directory. Files generated as output:
+                   assignments.xml
+                   margins.xml (if 'compute_margins' is set)
+                   assignments_distribution.xml (if 'noise_samples' are set)
+                   weights_acceptabilities.xml (if 'weights_samples' are set)
+                   scenarios_assignments.xml and scenarios_disagreements.xml
+                   (if there are any scenarios)
+
+    --no-cache  Don't use the results stored in the directory given by the
+                PROMETHEE_RESULT_CACHE environment variable (if it's set).
 
     --version  Show version.
     -h --help  Show this screen.
+
+With the PROMETHEE_PARSE_CACHE environment variable set to a directory, the
+values read from the input files are cached there, and only the files whose
+values aren't cached yet are parsed and validated - the ones which aren't
+needed at all aren't validated either.
 """
 
 import os
@@ -21,42 +44,227 @@ import sys
 import traceback
 
 from docopt import docopt
+from functools import partial
 
-from common import comparisons_to_xmcda, create_messages_file, get_dirs, \
-get_error_message, get_input_data, write_xmcda, assignments_to_xmcda
+# robustness.py is imported only by the functions using it, see common.py
+from common import comparisons_to_xmcda, create_messages_file, get_dirs, get_error_message, \
+get_input_data, write_xmcda, assignments_to_xmcda, get_midpoints, InputDataError, \
+get_scenarios_dirs, run_memoized
 
 
 __version__ = '0.0.1'
 
+# the flows equally distant from two profiles (up to the rounding errors,
+# e.g. 0.7 from 0.6 and 0.8) go to the higher one; the tolerance is relative
+# to the range of the flows compared
+TIE_TOLERANCE = 1e-9
+
+INFINITY = float('inf')
+
 
-def sortPrometheeTri(alternatives, categories, profiles_categories, alternatives_flows, categories_flows):
+def assignPrometheeTri(flow, profiles_categories, categories_flows):
+  """Assigns the flow to the category of the nearest central profile."""
 
+  profiles_flows = [categories_flows[profiles_categories[i]["id"]] for i in range (1,len(profiles_categories)+1)]
+  tolerance = TIE_TOLERANCE * (max(profiles_flows + [flow]) - min(profiles_flows + [flow]))
+  assignment = profiles_categories[1]["classes"]
+  best_diff = abs(profiles_flows[0] - flow)
+  for i in range (2,len(profiles_categories)+1):
+    temp_diff = abs(profiles_flows[i-1] - flow)
+    if temp_diff <= best_diff + tolerance:
+      assignment = profiles_categories[i]["classes"]
+      best_diff = temp_diff
+  return assignment
+
+
+def sortPrometheeTri(alternatives, categories, profiles_categories, alternatives_flows, categories_flows, with_margins=False):
+
+  if with_margins:
+    from robustness import MarginsIndex, get_margin
   assignments = {}
+  margins = {}
+  # margin == distance from the flow to the nearest midpoint between profiles
+  thresholds = get_midpoints(profiles_categories, categories_flows)
 
   for alternative in alternatives:
-    assignments[alternative] = profiles_categories[1]["classes"]
-    best_diff = abs(categories_flows[profiles_categories[1]["id"]] - alternatives_flows[alternative])
-    for i in range (2,len(profiles_categories)+1):
-      temp_diff = abs(categories_flows[profiles_categories[i]["id"]] - alternatives_flows[alternative])
-      if temp_diff <= best_diff:
-        assignments[alternative] = profiles_categories[i]["classes"]
+    assignments[alternative] = assignPrometheeTri(alternatives_flows[alternative], profiles_categories, categories_flows)
+    if with_margins:
+      margins[alternative] = get_margin(alternatives_flows[alternative], thresholds)
   
   print (assignments)
   print ('PrometheeTri')
+  if with_margins:
+    return assignments, MarginsIndex(margins)
   return assignments
 
 
-def main():
+def pickFlow(low, high, preferred, step):
+  """Returns 'preferred' if it's between 'low' and 'high' (either of them
+  may be infinite) and not at (or within rounding errors of) either bound,
+  otherwise some flow between them.
+  """
+
+  margin = 1e-6 * step
+  if preferred is not None and low + margin < preferred < high - margin:
+    return preferred
+  if low > -INFINITY and high < INFINITY:
+    return (low + high) / 2.0
+  if low > -INFINITY:
+    return low + step
+  if high < INFINITY:
+    return high - step
+  return 0.0
+
+
+def fitPrometheeTriProfiles(alternatives_flows, profiles_categories, reference_assignments):
+  """Finds the central profiles' flows which reproduce as many of the
+  reference assignments as possible. The classes are separated by the
+  midpoints between the consecutive profiles, m_i = (b_i + b_(i+1))/2, so
+  the thresholds between the classes are fitted first (see fit_thresholds).
+  Any midpoint between the reference flows around its threshold (a gap)
+  gives the same assignments, so the profiles are searched for with their
+  midpoints within the gaps - as near to the mean flows of their classes as
+  possible. When there are no such profiles, every profile is just put
+  between its thresholds.
+  Returns a tuple (categories_flows, errors), where 'errors' is the number
+  of the reference assignments the fitted profiles don't reproduce.
+  """
+
+  from robustness import fit_thresholds
+  classes = [profiles_categories[i]["classes"] for i in range (1,len(profiles_categories)+1)]
+  thresholds, _ = fit_thresholds(alternatives_flows, reference_assignments, classes)
+  values = sorted(alternatives_flows[alternative] for alternative in reference_assignments)
+  step = (values[-1] - values[0]) / float(len(classes)) or 1.0
+  margin = 1e-6 * step
+  means = []
+  for category in classes:
+    members = [alternatives_flows[alternative] for alternative, assigned in reference_assignments.items() if assigned == category]
+    means.append(sum(members) / float(len(members)) if members else None)
+  # m_i has to be in (gap_low, gap_high]
+  gaps = []
+  for threshold in thresholds:
+    below = [value for value in values if value < threshold]
+    above = [value for value in values if value >= threshold]
+    gaps.append((below[-1] if below else -INFINITY, above[0] if above else INFINITY))
+
+  # forward: the range of b_(i+1) for which b_1 < m_1 < b_2 < ... < b_(i+1)
+  # with every midpoint within its gap; b_i < m_i <= gap_high bounds b_i
+  # from above, and b_(i+1) = 2 * m_i - b_i can be anywhere from just above
+  # m_i (and b_i) up to 2 * gap_high - b_i
+  ranges = [(-INFINITY, INFINITY)]
+  for gap_low, gap_high in gaps:
+    low, high = ranges[-1][0], min(ranges[-1][1], gap_high)
+    ranges[-1] = (low, high)
+    ranges.append((max(low, gap_low, 2 * gap_low - high), 2 * gap_high - low))
+  feasible = all(low < high for low, high in ranges)
+
+  if feasible:
+    # backward: every profile within its range, below the next one and with
+    # their midpoint within the gap
+    flows = [pickFlow(ranges[-1][0], ranges[-1][1], means[-1], step)]
+    for i in range (len(classes)-2,-1,-1):
+      upper = flows[0]
+      gap_low, gap_high = gaps[i]
+      low = max(ranges[i][0], 2 * gap_low - upper)
+      high = min(ranges[i][1], upper, 2 * gap_high - upper)
+      flow = pickFlow(low, high, means[i], step)
+      if not gap_low + margin < (flow + upper) / 2.0 < gap_high - margin:
+        # the mean is at the bound of the range, where the rounding errors
+        # (and the tie tolerance) may move the flows to the other class
+        flow = pickFlow(low, high, None, step)
+      flows.insert(0, flow)
+  else:
+    bounds = [-INFINITY] + thresholds + [INFINITY]
+    flows = [pickFlow(bounds[i], bounds[i+1], means[i], step) for i in range (len(classes))]
+
+  categories_flows = dict((profiles_categories[i]["id"], flows[i-1]) for i in range (1,len(profiles_categories)+1))
+  assignments = predictPrometheeTri(alternatives_flows, profiles_categories, categories_flows, reference_assignments)
+  errors = sum(1 for alternative in reference_assignments if assignments[alternative] != reference_assignments[alternative])
+  return categories_flows, errors
+
+
+def predictPrometheeTri(alternatives_flows, profiles_categories, categories_flows, alternatives):
+
+  return dict((alternative, assignPrometheeTri(alternatives_flows[alternative], profiles_categories, categories_flows)) for alternative in alternatives)
+
+
+def assignFlows(alternatives, profiles_categories, flows, positive_flows=None, negative_flows=None):
+  """Assigns 'alternatives' silently, with the flows of the alternatives and
+  the profiles in the same dict (see get_weights_acceptabilities).
+  """
+
+  return predictPrometheeTri(flows, profiles_categories, flows, alternatives)
+
+
+def getCuts(profiles_categories, categories_flows):
+  """Returns the (thresholds, classes, inclusive) tuple which gives the same
+  assignments as assignPrometheeTri (see get_noise_acceptabilities): the
+  midpoints between the consecutive profiles, lowered by half of the tie
+  tolerance, below which a flow is still equally distant from both profiles.
+  Returns None when the profiles' flows don't strictly increase with the
+  classes.
+  """
+
+  flows = [categories_flows[profiles_categories[i]["id"]] for i in range (1,len(profiles_categories)+1)]
+  if any(flows[i-1] >= flows[i] for i in range (1,len(flows))):
+    return None
+  tolerance = TIE_TOLERANCE * (flows[-1] - flows[0])
+  thresholds = [(flows[i] + flows[i-1]) / 2.0 - tolerance / 2.0 for i in range (1,len(flows))]
+  classes = [profiles_categories[i]["classes"] for i in range (1,len(profiles_categories)+1)]
+  return thresholds, classes, True
+
+
+def sortWithUncertainWeights(input_dir, alternatives, profiles_categories, samples, processes=None, seed=None):
+  """Estimates the class acceptability indices of the alternatives when the
+  weights of the criteria are uncertain (see sort_with_uncertain_weights).
+  """
+
+  from robustness import sort_with_uncertain_weights
+  profiles = [profiles_categories[i]["id"] for i in profiles_categories]
+  sort = partial(assignFlows, alternatives, profiles_categories)
+  return sort_with_uncertain_weights(input_dir, 'central_profiles', alternatives, profiles, sort, samples, processes, seed)
+
+
+def sortScenarios(alternatives, alternatives_flows, scenarios_dirs):
+  """Assigns the alternatives with every set of profiles from
+  'scenarios_dirs' (see get_scenarios_dirs). Only the profiles are read
+  for every scenario, the alternatives' flows are read once and shared.
+  Returns a list of (name, assignments) tuples.
+  """
+
+  filenames = [
+    ('classes.xml', False),
+    ('classes_profiles.xml', False),
+    ('flows.xml', False),
+  ]
+  params = ['categories_flows', 'profiles_categories']
+  scenarios = []
+  for name, scenario_dir in scenarios_dirs:
+    s = get_input_data(scenario_dir, filenames, params, comparison_with='central_profiles')
+    scenarios.append((name, predictPrometheeTri(alternatives_flows, s.profiles_categories, s.categories_flows, alternatives)))
+  return scenarios
+
+
+def crossValidatePrometheeTriProfiles(alternatives_flows, profiles_categories, reference_assignments, folds=5, processes=None, seed=None):
+  """Returns the number of errors in every fold of cross-validation of
+  fitPrometheeTriProfiles (the folds are evaluated in parallel).
+  """
+
+  from robustness import cross_validate
+  fit = partial(fitPrometheeTriProfiles, alternatives_flows, profiles_categories)
+  predict = partial(predictPrometheeTri, alternatives_flows, profiles_categories)
+  return cross_validate(fit, predict, reference_assignments, folds, processes, seed)
+
+
+def run(input_dir, output_dir):
   try:
-    args = docopt(__doc__, version=__version__)
-    output_dir = None
-    input_dir, output_dir = get_dirs(args)
     filenames = [
       # every tuple below == (filename, is_optional)
       ('alternatives.xml', False),
       ('classes.xml', False),
       ('classes_profiles.xml', False),
       ('flows.xml', False),
+      ('method_parameters.xml', True),
     ]
     params = [
       'alternatives',
@@ -64,20 +272,69 @@ def main():
       'alternatives_flows',
       'categories_flows',
       'categories_rank',
+      'compute_margins',
+      'flows_noise',
+      'noise_samples',
+      'processes',
+      'seed',
+      'weights_samples',
       'profiles_categories'
     ]
     d = get_input_data(input_dir, filenames, params, comparison_with='central_profiles')
-  
-    assignments = sortPrometheeTri(d.alternatives, d.categories, d.profiles_categories, d.alternatives_flows, d.categories_flows)
+
+    if d.noise_samples and d.flows_noise is None:
+      raise InputDataError("'flows_noise' should be specified along with 'noise_samples'.")
+
+    output = sortPrometheeTri(d.alternatives, d.categories, d.profiles_categories, d.alternatives_flows, d.categories_flows, d.compute_margins)
+    if d.compute_margins:
+      from robustness import margins_to_xmcda
+      assignments, margins = output
+      write_xmcda(margins_to_xmcda(margins), os.path.join(output_dir, 'margins.xml'))
+    else:
+      assignments = output
     xmcda_assign = assignments_to_xmcda(assignments)
     write_xmcda(xmcda_assign, os.path.join(output_dir, 'assignments.xml'))
 
+    if d.noise_samples:
+      from robustness import acceptabilities_to_xmcda, get_noise_acceptabilities
+      flows = dict(d.alternatives_flows)
+      flows.update(d.categories_flows)
+      sort = partial(assignFlows, d.alternatives, d.profiles_categories)
+      cuts = getCuts(d.profiles_categories, d.categories_flows)
+      distribution = get_noise_acceptabilities(d.alternatives, sort, d.noise_samples, d.flows_noise, flows=flows, processes=d.processes, seed=d.seed, cuts=cuts)
+      write_xmcda(acceptabilities_to_xmcda(distribution, 'AssignmentsDistribution'), os.path.join(output_dir, 'assignments_distribution.xml'))
+
+    if d.weights_samples:
+      from robustness import acceptabilities_to_xmcda
+      acceptabilities = sortWithUncertainWeights(input_dir, d.alternatives, d.profiles_categories, d.weights_samples, d.processes, d.seed)
+      write_xmcda(acceptabilities_to_xmcda(acceptabilities), os.path.join(output_dir, 'weights_acceptabilities.xml'))
+
+    scenarios = sortScenarios(d.alternatives, d.alternatives_flows, get_scenarios_dirs(input_dir))
+    if scenarios:
+      from robustness import disagreements_to_xmcda, get_disagreements, scenarios_to_xmcda
+      write_xmcda(scenarios_to_xmcda(scenarios), os.path.join(output_dir, 'scenarios_assignments.xml'))
+      write_xmcda(disagreements_to_xmcda(get_disagreements(scenarios)), os.path.join(output_dir, 'scenarios_disagreements.xml'))
+
+  except Exception as err:
+    err_msg = get_error_message(err)
+    log_msg = traceback.format_exc()
+    print(log_msg.strip())
+    create_messages_file((err_msg, ), (log_msg, ), output_dir)
+    return 1
+
+
+def main():
+  try:
+    args = docopt(__doc__, version=__version__)
+    output_dir = None
+    input_dir, output_dir = get_dirs(args)
   except Exception as err:
     err_msg = get_error_message(err)
     log_msg = traceback.format_exc()
     print(log_msg.strip())
     create_messages_file((err_msg, ), (log_msg, ), output_dir)
     return 1
+  return run_memoized(partial(run, input_dir), __file__, input_dir, output_dir, args['--no-cache'])
 
 if __name__ == '__main__':
   sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+"""
+Usage:
+    PrometheeWorker.py [--keep-trees N]
+
+Reads jobs from the standard input, one JSON object per line, e.g.:
+
+    {"id": 1, "method": "Promsort", "input_dir": "in", "output_dir": "out",
+     "options": {"no_cache": false}}
+
+where "method" is one of: FlowSortPrometheeIISorting,
+FlowSortPrometheISorting, PrometheeTriSorting, Promsort, PrometheeIIRanking
+("id" and "options" are optional). Every job is run just like the module
+itself would run it (see its '-i DIR -o DIR [--no-cache]' usage), but in
+the same, long-running process, so the imports, the compiled XMCDA schemas
+and the parsed input files are reused by the subsequent jobs. The jobs run
+in the worker's process only, even if their 'processes' method parameter
+allows more - start more workers instead. For every job
+one JSON line with its result is written to the standard output, e.g.:
+
+    {"id": 1, "method": "Promsort", "status": "ok", "exit_code": 0,
+     "timings": {"total": 0.012}}
+
+Everything that the modules print goes to the standard error instead.
+
+Options:
+    --keep-trees N  Max. number of parsed input files kept in memory
+                    [default: 256].
+
+    --version       Show version.
+    -h --help       Show this screen.
+"""
+
+import json
+import os
+import sys
+import time
+import traceback
+
+from docopt import docopt
+from functools import partial
+
+try:
+  from importlib.util import module_from_spec, spec_from_file_location
+except ImportError:
+  # python 2
+  import imp
+  spec_from_file_location = None
+
+from common import get_error_message, keep_trees, run_memoized
+from robustness import limit_processes
+
+
+__version__ = '0.0.1'
+
+# method -> the directory of its module
+METHODS = {
+  'FlowSortPrometheeIISorting': 'FlowSortPrometheeIISorting',
+  'FlowSortPrometheISorting': 'FlowSortPrometheeISorting',
+  'PrometheeTriSorting': 'PrometheeTriSorting',
+  'Promsort': 'Promsort',
+  'PrometheeIIRanking': 'PrometheeIIRanking',
+}
+
+
+def getMethodModule(method):
+  """Imports the module of 'method' (only once) from its file, leaving
+  sys.path as it is, so the module's own directory isn't searched and all
+  the modules share the copy of common.py and PyXMCDA.py from the root
+  directory (which has to be importable already).
+  """
+
+  if method not in METHODS:
+    raise ValueError("Unknown method '{}'.".format(method))
+  if method not in sys.modules:
+    root = os.path.dirname(os.path.abspath(__file__))
+    path = os.path.join(root, METHODS[method], method + '.py')
+    if spec_from_file_location is None:
+      imp.load_source(method, path)
+    else:
+      spec = spec_from_file_location(method, path)
+      module = module_from_spec(spec)
+      sys.modules[method] = module
+      try:
+        spec.loader.exec_module(module)
+      except BaseException:
+        del sys.modules[method]
+        raise
+  return sys.modules[method]
+
+
+def runJob(job):
+  """Runs a single job (a dict, see the usage) and returns its result."""
+
+  result = {'id': job.get('id'), 'method': job.get('method')}
+  start = time.time()
+  try:
+    module = getMethodModule(job.get('method'))
+    input_dir, output_dir = job['input_dir'], job['output_dir']
+    for d in (input_dir, output_dir):
+      if not os.path.isdir(d):
+        raise ValueError("Directory '{}' doesn't exist.".format(d))
+    options = job.get('options') or {}
+    run = partial(module.run, input_dir)
+    exit_code = run_memoized(run, module.__file__, input_dir, output_dir, options.get('no_cache', False)) or 0
+    result['status'] = 'ok' if exit_code == 0 else 'error'
+    result['exit_code'] = exit_code
+  except Exception as err:
+    traceback.print_exc(file=sys.stderr)
+    result['status'] = 'error'
+    result['exit_code'] = 1
+    result['error'] = get_error_message(err)
+  result['timings'] = {'total': time.time() - start}
+  return result
+
+
+def serve(jobs, output):
+  """Runs the jobs from 'jobs' (an iterable of JSON lines) and writes the
+  results to 'output'.
+  """
+
+  stdout = sys.stdout
+  for line in jobs:
+    if not line.strip():
+      continue
+    try:
+      job = json.loads(line)
+      if not isinstance(job, dict):
+        raise ValueError("A job should be a JSON object.")
+    except ValueError as err:
+      result = {'id': None, 'status': 'error', 'exit_code': 1, 'error': get_error_message(err)}
+    else:
+      # the modules print their results, which would mix with ours
+      sys.stdout = sys.stderr
+      try:
+        result = runJob(job)
+      finally:
+        sys.stdout = stdout
+    output.write(json.dumps(result, sort_keys=True) + '\n')
+    output.flush()
+
+
+def main():
+  args = docopt(__doc__, version=__version__)
+  keep_trees(int(args['--keep-trees']))
+  # the jobs are parallelized by running more workers, not by pools of
+  # processes started by every one of them
+  limit_processes(1)
+  # readline() instead of iterating over the file, which reads ahead in
+  # python 2, i.e. jobs would wait for the following ones
+  serve(iter(sys.stdin.readline, ''), sys.stdout)
+
+if __name__ == '__main__':
+  sys.exit(main())
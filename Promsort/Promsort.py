@@ -2,7 +2,7 @@
 
 """
 Usage:
-    FlowSortPrometheeISorting.py -i DIR -o DIR
+    FlowSortPrometheeISorting.py -i DIR -o DIR [--no-cache]
 
 Options:
     -i DIR     Specify input directory. It should contain the following files:
@@ -12,20 +12,47 @@ Options:
                    positive_flows.xml
                    negative_flows.xml
                    method_params.xml
+               and, when 'weights_samples' are set:
+                   criteria.xml
+                   performance_table.xml
+                   profiles_performance_table.xml
+                   weights.xml (optional, the weights' intervals)
+               and, optionally, the 'scenarios' subdirectory with
+               alternative sets of profiles - one directory per scenario,
+               with classes.xml, classes_profiles.xml and positive_flows.xml,
+               negative_flows.xml (profiles' flows)
     -o DIR     Specify output directory. Files generated as output:
+                   assignments.xml
+                   first_step_assignments.xml
+                   cut_point_sweep.xml (if 'cut_points' are set)
+                   margins.xml (if 'compute_margins' is set)
+                   assignments_distribution.xml (if 'noise_samples' are set)
+                   weights_acceptabilities.xml (if 'weights_samples' are set)
+                   scenarios_assignments.xml and scenarios_disagreements.xml
+                   (if there are any scenarios)
+
+    --no-cache  Don't use the results stored in the directory given by the
+                PROMETHEE_RESULT_CACHE environment variable (if it's set).
 
     --version  Show version.
     -h --help  Show this screen.
+
+With the PROMETHEE_PARSE_CACHE environment variable set to a directory, the
+values read from the input files are cached there, and only the files whose
+values aren't cached yet are parsed and validated - the ones which aren't
+needed at all aren't validated either.
 """
 
 import os
 import sys
 import traceback
 
-from decimal import *
 from docopt import docopt
-from common import comparisons_to_xmcda, create_messages_file, get_dirs, \
-get_error_message, get_input_data, write_xmcda, assignments_to_xmcda, assignments_as_intervals_to_xmcda
+from functools import partial
+# robustness.py is imported only by the functions using it, see common.py
+from common import comparisons_to_xmcda, create_messages_file, get_dirs, get_error_message, \
+get_input_data, write_xmcda, assignments_to_xmcda, assignments_as_intervals_to_xmcda, \
+InputDataError, get_scenarios_dirs, run_memoized
 
 
 __version__ = '0.0.1'
@@ -50,14 +77,20 @@ def isIncomparable(action1_positive_flow, action1_negative_flow, action2_positiv
   return False
     
 
-def sortPromsort(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, 
-categories_positive_flows, categories_negative_flows, cut_point):
+def getPromsortDistances(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, 
+categories_positive_flows, categories_negative_flows):
+  """Performs the first step of Promsort and computes the distances (dk)
+  of the alternatives left for the second step, which do not depend on
+  the cut point. Returns a tuple (assignments, first_step_assignments,
+  distances), where 'distances' is a list of (alternative, dk) tuples.
+  """
 
   first_step_assignments = {}
   assignments = {}
   assigned_list = {}
   classes_flows = {}
   unassigned = []
+  distances = []
 
   #prepare class lists
   assigned_list[profiles_categories[1]["classes"]["lower"]] = []
@@ -91,58 +124,232 @@ categories_positive_flows, categories_negative_flows, cut_point):
       assignments[alternative] = profiles_categories[1]["classes"]["lower"]
       first_step_assignments[alternative] = (profiles_categories[1]["classes"]["lower"], profiles_categories[1]["classes"]["lower"])
 
+  #distances for the second step
+  #for key, value in classes_flows.items():
+    #if len(assigned_list[key]) != 0.0:
+      #classes_flows[key] = value / len(assigned_list[key])
+
+  for alternative_to_assign in unassigned:
+    class_t = first_step_assignments[alternative_to_assign][0]
+    class_t1 =  first_step_assignments[alternative_to_assign][1]
+    
+    len_t = len(assigned_list[class_t]) 
+    len_t1 = len(assigned_list[class_t1]) 
+
+    dk_positive = len_t * (alternatives_positive_flows[alternative_to_assign] - alternatives_negative_flows[alternative_to_assign]) - classes_flows[class_t]
+    dk_negative = classes_flows[class_t1] - len_t1 * (alternatives_positive_flows[alternative_to_assign] - alternatives_negative_flows[alternative_to_assign])
+    
+    if (len_t > 0.0):
+      dk1 = dk_positive/len_t
+    else:
+      dk1 = 0.0
+    if (len_t1 > 0.0):
+      dk2 = dk_negative/len_t1
+    else:
+      dk2 = 0.0
+
+    dk = dk1 - dk2  
+    distances.append((alternative_to_assign, dk))
+
+  return assignments, first_step_assignments, distances
+
+
+def sortPromsort(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, 
+categories_positive_flows, categories_negative_flows, cut_point, with_margins=False):
+
+  if with_margins:
+    from robustness import MarginsIndex, get_margin
+  assignments, first_step_assignments, distances = getPromsortDistances(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, categories_positive_flows, categories_negative_flows)
+  margins = {}
+  if with_margins:
+    # margin == distance from dk to the cut point for the alternatives
+    # assigned in the second step, distance from any of the flows to the
+    # nearest profile's flow for the other ones
+    positive_thresholds = sorted(categories_positive_flows[profiles_categories[i]["id"]] for i in profiles_categories)
+    negative_thresholds = sorted(categories_negative_flows[profiles_categories[i]["id"]] for i in profiles_categories)
+    for alternative in assignments:
+      margins[alternative] = min(get_margin(alternatives_positive_flows[alternative], positive_thresholds), get_margin(alternatives_negative_flows[alternative], negative_thresholds))
+
   #second step
   if ( len(first_step_assignments) != len(assignments) ):
-    #for key, value in classes_flows.items():
-      #if len(assigned_list[key]) != 0.0:
-        #classes_flows[key] = value / len(assigned_list[key])
-
     print ('We need second step for:')
-    print (unassigned)
-    #print (classes_flows)
+    print ([alternative for alternative, dk in distances])
 
-    for alternative_to_assign in unassigned:
+    for alternative_to_assign, dk in distances:
       class_t = first_step_assignments[alternative_to_assign][0]
       class_t1 =  first_step_assignments[alternative_to_assign][1]
-      
-      len_t = len(assigned_list[class_t]) 
-      len_t1 = len(assigned_list[class_t1]) 
-
-      dk_positive = len_t * (alternatives_positive_flows[alternative_to_assign] - alternatives_negative_flows[alternative_to_assign]) - classes_flows[class_t]
-      dk_negative = classes_flows[class_t1] - len_t1 * (alternatives_positive_flows[alternative_to_assign] - alternatives_negative_flows[alternative_to_assign])
-      
-      if (len_t > 0.0):
-        dk1 = dk_positive/len_t
-      else:
-        dk1 = 0.0
-      if (len_t1 > 0.0):
-        dk2 = dk_negative/len_t1
-      else:
-        dk2 = 0.0
-
-      dk = dk1 - dk2  
+      if with_margins:
+        margins[alternative_to_assign] = abs(dk - cut_point)
 
       if dk >= cut_point:
         assignments[alternative_to_assign] = class_t1
       else:
         assignments[alternative_to_assign] = class_t
 
-      #temp_diff = abs(categories_flows[profiles_categories[i]["id"]] - alternatives_flows[alternative])
-      #if temp_diff <= best_diff:
-      #  assignments[alternative] = profiles_categories[i]["classes"]
   #print (assigned_list)
   print (assignments)
   print (first_step_assignments)
   print ('PROMSORT')
   #print (assignments, first_step_assignments)
+  if with_margins:
+    return (assignments, first_step_assignments, MarginsIndex(margins))
   return (assignments, first_step_assignments)
 
 
-def main():
+def sweepPromsort(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, 
+categories_positive_flows, categories_negative_flows, cut_points):
+  """Same as sortPromsort, but for many cut points at once: the distances
+  are computed only once and sorted, then the cut points are visited in
+  ascending order, each one moving the alternatives with dk below it to
+  their lower classes. Returns a list of (cut_point, assignments) tuples
+  in the order of 'cut_points'.
+  """
+
+  assignments, first_step_assignments, distances = getPromsortDistances(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, categories_positive_flows, categories_negative_flows)
+  distances.sort(key=lambda pair: pair[1])
+  for alternative, dk in distances:
+    assignments[alternative] = first_step_assignments[alternative][1]
+  results = {}
+  position = 0
+  for cut_point in sorted(set(cut_points)):
+    while position < len(distances) and distances[position][1] < cut_point:
+      alternative = distances[position][0]
+      assignments[alternative] = first_step_assignments[alternative][0]
+      position += 1
+    results[cut_point] = dict(assignments)
+  return [(cut_point, results[cut_point]) for cut_point in cut_points]
+
+
+def getPromsortCutPointFunction(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, 
+categories_positive_flows, categories_negative_flows):
+  """Describes the assignments as a piecewise-constant function of the cut
+  point. Returns a tuple (assignments, steps), where 'assignments' are
+  valid for any cut point not greater than the lowest dk, and 'steps' is a
+  list of (dk, changes) tuples in ascending order of dk - once the cut
+  point exceeds 'dk', the alternatives from 'changes' (a dict) move to
+  their lower classes.
+  """
+
+  assignments, first_step_assignments, distances = getPromsortDistances(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, categories_positive_flows, categories_negative_flows)
+  distances.sort(key=lambda pair: pair[1])
+  steps = []
+  for alternative, dk in distances:
+    assignments[alternative] = first_step_assignments[alternative][1]
+    if not steps or steps[-1][0] != dk:
+      steps.append((dk, {}))
+    steps[-1][1][alternative] = first_step_assignments[alternative][0]
+  return assignments, steps
+
+
+def fitPromsortCutPoint(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, 
+categories_positive_flows, categories_negative_flows, reference_assignments):
+  """Finds the cut point which reproduces as many of the reference
+  assignments as possible. The distances (dk) are computed once and
+  sorted, then every candidate cut point (between two consecutive
+  distances) is evaluated in O(1) using prefix counts of the references
+  assigned to the lower and to the upper class. Returns a tuple
+  (cut_point, errors), where 'errors' include the misassignments made in
+  the first step, which do not depend on the cut point.
+  """
+
+  assignments, first_step_assignments, distances = getPromsortDistances(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, categories_positive_flows, categories_negative_flows)
+  errors = sum(1 for alternative in reference_assignments if alternative in assignments and assignments[alternative] != reference_assignments[alternative])
+  distances = sorted((dk, alternative) for alternative, dk in distances if alternative in reference_assignments)
+  # lower[p], upper[p]: references among the first p distances which should
+  # go to the lower (upper) class
+  lower, upper = [0], [0]
+  for dk, alternative in distances:
+    lower.append(lower[-1] + (reference_assignments[alternative] == first_step_assignments[alternative][0]))
+    upper.append(upper[-1] + (reference_assignments[alternative] == first_step_assignments[alternative][1]))
+  # with the cut point just above the p-th distance, the first p
+  # alternatives go to their lower classes and the rest to the upper ones
+  best_errors, best_p = None, 0
+  for p in range (0,len(distances)+1):
+    if 0 < p < len(distances) and distances[p-1][0] == distances[p][0]:
+      continue
+    p_errors = (p - lower[p]) + (len(distances) - p) - (upper[-1] - upper[p])
+    if best_errors is None or p_errors < best_errors:
+      best_errors, best_p = p_errors, p
+  if not distances:
+    cut_point = 0.0
+  elif best_p == 0:
+    cut_point = distances[0][0]
+  elif best_p == len(distances):
+    cut_point = distances[-1][0] + 1.0
+  else:
+    cut_point = (distances[best_p-1][0] + distances[best_p][0]) / 2.0
+    if cut_point <= distances[best_p-1][0]:  # rounding
+      cut_point = distances[best_p][0]
+  return cut_point, errors + best_errors
+
+
+def predictPromsort(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, 
+categories_positive_flows, categories_negative_flows, cut_point, to_predict):
+
+  assignments, first_step_assignments, distances = getPromsortDistances(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, categories_positive_flows, categories_negative_flows)
+  for alternative, dk in distances:
+    if dk >= cut_point:
+      assignments[alternative] = first_step_assignments[alternative][1]
+    else:
+      assignments[alternative] = first_step_assignments[alternative][0]
+  return dict((alternative, assignments[alternative]) for alternative in to_predict)
+
+
+def assignFlows(alternatives, profiles_categories, cut_point, flows, positive_flows, negative_flows):
+  """Assigns 'alternatives' silently, with the flows of the alternatives and
+  the profiles in the same dicts (see get_weights_acceptabilities).
+  """
+
+  return predictPromsort(alternatives, None, profiles_categories, positive_flows, negative_flows, positive_flows, negative_flows, cut_point, alternatives)
+
+
+def sortWithUncertainWeights(input_dir, alternatives, profiles_categories, cut_point, samples, processes=None, seed=None):
+  """Estimates the class acceptability indices of the alternatives when the
+  weights of the criteria are uncertain (see sort_with_uncertain_weights).
+  """
+
+  from robustness import sort_with_uncertain_weights
+  profiles = [profiles_categories[i]["id"] for i in profiles_categories]
+  sort = partial(assignFlows, alternatives, profiles_categories, cut_point)
+  return sort_with_uncertain_weights(input_dir, 'boundary_profiles', alternatives, profiles, sort, samples, processes, seed)
+
+
+def sortScenarios(alternatives, alternatives_positive_flows, alternatives_negative_flows, cut_point, scenarios_dirs):
+  """Assigns the alternatives with every set of profiles from
+  'scenarios_dirs' (see get_scenarios_dirs). Only the profiles are read
+  for every scenario, the alternatives' flows are read once and shared.
+  Returns a list of (name, assignments) tuples.
+  """
+
+  filenames = [
+    ('classes.xml', False),
+    ('classes_profiles.xml', False),
+    ('positive_flows.xml', False),
+    ('negative_flows.xml', False),
+  ]
+  params = ['categories_positive_flows', 'categories_negative_flows', 'profiles_categories']
+  scenarios = []
+  for name, scenario_dir in scenarios_dirs:
+    s = get_input_data(scenario_dir, filenames, params, comparison_with='boundary_profiles')
+    scenarios.append((name, predictPromsort(alternatives, None, s.profiles_categories, alternatives_positive_flows, alternatives_negative_flows, s.categories_positive_flows, s.categories_negative_flows, cut_point, alternatives)))
+  return scenarios
+
+
+def crossValidatePromsortCutPoint(alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, 
+categories_positive_flows, categories_negative_flows, reference_assignments, folds=5, processes=None, seed=None):
+  """Returns the number of errors in every fold of cross-validation of
+  fitPromsortCutPoint (the folds are evaluated in parallel).
+  """
+
+  from robustness import cross_validate
+  data = (alternatives, categories, profiles_categories, alternatives_positive_flows, alternatives_negative_flows, categories_positive_flows, categories_negative_flows)
+  fit = partial(fitPromsortCutPoint, *data)
+  predict = partial(predictPromsort, *data)
+  return cross_validate(fit, predict, reference_assignments, folds, processes, seed)
+
+
+def run(input_dir, output_dir):
   try:
-    args = docopt(__doc__, version=__version__)
-    output_dir = None
-    input_dir, output_dir = get_dirs(args)
     filenames = [
       # every tuple below == (filename, is_optional)
       ('alternatives.xml', False),
@@ -161,11 +368,36 @@ def main():
       'categories_negative_flows',
       'categories_rank',
       'profiles_categories',
-      'cut_point'
+      'compute_margins',
+      'flows_noise',
+      'noise_samples',
+      'processes',
+      'seed',
+      'weights_samples',
+      'cut_point',
+      'cut_points'
     ]
     d = get_input_data(input_dir, filenames, params, comparison_with='boundary_profiles')
-  
-    output = sortPromsort(d.alternatives, d.categories, d.profiles_categories, d.alternatives_positive_flows, d.alternatives_negative_flows, d.categories_positive_flows, d.categories_negative_flows, d.cut_point)
+
+    if d.noise_samples and (d.flows_noise is None or d.cut_point is None):
+      raise InputDataError("'flows_noise' and 'cut_point' should be specified along with 'noise_samples'.")
+    if d.weights_samples and d.cut_point is None:
+      raise InputDataError("'cut_point' should be specified along with 'weights_samples'.")
+
+    if d.cut_points:
+      sweep = sweepPromsort(d.alternatives, d.categories, d.profiles_categories, d.alternatives_positive_flows, d.alternatives_negative_flows, d.categories_positive_flows, d.categories_negative_flows, d.cut_points)
+      xmcda_sweep = []
+      for cut_point, assignments in sweep:
+        xmcda_assign = assignments_to_xmcda(assignments)
+        xmcda_assign.set('mcdaConcept', 'cut_point: {}'.format(cut_point))
+        xmcda_sweep.append(xmcda_assign)
+      write_xmcda(xmcda_sweep, os.path.join(output_dir, 'cut_point_sweep.xml'))
+      if d.cut_point is None:
+        return
+    elif d.cut_point is None:
+      raise InputDataError("Either 'cut_point' or 'cut_points' should be specified.")
+
+    output = sortPromsort(d.alternatives, d.categories, d.profiles_categories, d.alternatives_positive_flows, d.alternatives_negative_flows, d.categories_positive_flows, d.categories_negative_flows, d.cut_point, d.compute_margins)
     #print (output)
     #print (output[0])
     assignments = output[0]
@@ -174,13 +406,51 @@ def main():
     xmcda_first_step_assign = assignments_as_intervals_to_xmcda(first_step_assignments)
     write_xmcda(xmcda_assign, os.path.join(output_dir, 'assignments.xml'))
     write_xmcda(xmcda_first_step_assign, os.path.join(output_dir, 'first_step_assignments.xml'))
+    if d.compute_margins:
+      from robustness import margins_to_xmcda
+      write_xmcda(margins_to_xmcda(output[2]), os.path.join(output_dir, 'margins.xml'))
 
+    if d.noise_samples:
+      from robustness import acceptabilities_to_xmcda, get_noise_acceptabilities
+      positive_flows = dict(d.alternatives_positive_flows)
+      positive_flows.update(d.categories_positive_flows)
+      negative_flows = dict(d.alternatives_negative_flows)
+      negative_flows.update(d.categories_negative_flows)
+      sort = partial(assignFlows, d.alternatives, d.profiles_categories, d.cut_point)
+      distribution = get_noise_acceptabilities(d.alternatives, sort, d.noise_samples, d.flows_noise, positive_flows=positive_flows, negative_flows=negative_flows, processes=d.processes, seed=d.seed)
+      write_xmcda(acceptabilities_to_xmcda(distribution, 'AssignmentsDistribution'), os.path.join(output_dir, 'assignments_distribution.xml'))
+
+    if d.weights_samples:
+      from robustness import acceptabilities_to_xmcda
+      acceptabilities = sortWithUncertainWeights(input_dir, d.alternatives, d.profiles_categories, d.cut_point, d.weights_samples, d.processes, d.seed)
+      write_xmcda(acceptabilities_to_xmcda(acceptabilities), os.path.join(output_dir, 'weights_acceptabilities.xml'))
+
+    scenarios = sortScenarios(d.alternatives, d.alternatives_positive_flows, d.alternatives_negative_flows, d.cut_point, get_scenarios_dirs(input_dir))
+    if scenarios:
+      from robustness import disagreements_to_xmcda, get_disagreements, scenarios_to_xmcda
+      write_xmcda(scenarios_to_xmcda(scenarios), os.path.join(output_dir, 'scenarios_assignments.xml'))
+      write_xmcda(disagreements_to_xmcda(get_disagreements(scenarios)), os.path.join(output_dir, 'scenarios_disagreements.xml'))
+
+  except Exception as err:
+    err_msg = get_error_message(err)
+    log_msg = traceback.format_exc()
+    print(log_msg.strip())
+    create_messages_file((err_msg, ), (log_msg, ), output_dir)
+    return 1
+
+
+def main():
+  try:
+    args = docopt(__doc__, version=__version__)
+    output_dir = None
+    input_dir, output_dir = get_dirs(args)
   except Exception as err:
     err_msg = get_error_message(err)
     log_msg = traceback.format_exc()
     print(log_msg.strip())
     create_messages_file((err_msg, ), (log_msg, ), output_dir)
     return 1
+  return run_memoized(partial(run, input_dir), __file__, input_dir, output_dir, args['--no-cache'])
 
 if __name__ == '__main__':
   sys.exit(main())
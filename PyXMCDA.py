@@ -43,6 +43,9 @@ XMCDA_2_1 = "http://www.decision-deck.org/xmcda/_downloads/XMCDA-2.1.0.xsd"
 XMCDA_2_2 = "http://www.decision-deck.org/xmcda/_downloads/XMCDA-2.2.1.xsd"
 
 from lxml import etree
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
 import sys, traceback
 
 __version__="20111208-001"
@@ -89,13 +92,23 @@ def validateXMCDA (xmltree):
 	return ret
 
 
+# compiled schemas, by URL - downloading and compiling them takes much longer
+# than the validation itself
+_xmlschemas = {}
+
+def getXMLSchema (xsdURL):
+	"Returns the compiled xml schema, which is loaded only once per process"
+	if xsdURL not in _xmlschemas :
+		# TODO (sbigaret) explain that!
+		xmlschema_doc = etree.parse(xsdURL,
+		                            etree.XMLParser(no_network=False))
+		_xmlschemas[xsdURL] = etree.XMLSchema(xmlschema_doc)
+	return _xmlschemas[xsdURL]
+
+
 def validate (xmltree, xsdURL):
 	"Checks if xmltree is valid wrt the supplied xml schema"
-	# TODO (sbigaret) explain that!
-	xmlschema_doc = etree.parse(xsdURL,
-	                            etree.XMLParser(no_network=False))
-	xmlschema = etree.XMLSchema(xmlschema_doc)
-	return xmlschema.validate(xmltree)
+	return getXMLSchema(xsdURL).validate(xmltree)
 
 
 ##########################################################################
@@ -1171,3 +1184,118 @@ def getVetos (altId, critId, perfTable, thresholds) :
 	return tabVeto
 
 	
+
+##########
+
+def getRubisElementaryOutrankingCuts (altId, critId, perfTable, thresholds) :
+	# Same values as getRubisElementaryOutranking, but in a compact form computed in O(m.n.log(n)).
+	# For every criterion, 'orders[crit]' lists the indexes (in altId) of the alternatives sorted
+	# by their performances, and 'cuts[crit][i]' is a pair (cut1, cut05) for the alternative altId[i]:
+	# the first cut1 alternatives of 'orders[crit]' get 1.0, the ones up to cut05 get 0.5 and the
+	# rest gets 0.0.
+	
+	orders = {}
+	cuts = {}
+	for crit in critId :
+		order = sorted(range(len(altId)), key=lambda i: perfTable[altId[i]][crit])
+		values = [perfTable[altId[i]][crit] for i in order]
+		critThresholds = thresholds[crit]
+		hasInd = 'indifference' in critThresholds
+		hasPref = 'preference' in critThresholds
+		if hasInd :
+			upper = critThresholds['indifference']
+		elif hasPref :
+			upper = critThresholds['preference']
+		else :
+			upper = 0.0
+		# perf1 >= perf2 always gives 1.0, whatever the thresholds
+		upper = max(upper, 0.0)
+		critCuts = []
+		for alt1 in altId :
+			perf = perfTable[alt1][crit]
+			cut1 = bisect_right(values, perf + upper)
+			if hasInd and hasPref :
+				cut05 = max(cut1, bisect_left(values, perf + critThresholds['preference']))
+			else :
+				cut05 = cut1
+			critCuts.append((cut1, cut05))
+		orders[crit] = order
+		cuts[crit] = critCuts
+	return orders, cuts
+	
+##########
+
+def iterRubisElementaryOutrankingBlocks (altId, critId, perfTable, thresholds, blockSize=256) :
+	# Expands the cuts from getRubisElementaryOutrankingCuts into dense rows, 'blockSize' rows at a
+	# time, so the memory used at once stays bounded. Yields (start, rows) tuples, where rows[r][k]
+	# is an array('d') holding the values for (altId[start+r], altId[j], critId[k]) for every j.
+	
+	n = len(altId)
+	orders, cuts = getRubisElementaryOutrankingCuts(altId, critId, perfTable, thresholds)
+	pickers = []
+	for crit in critId :
+		positions = [0] * n
+		for pos, i in enumerate(orders[crit]) :
+			positions[i] = pos
+		if n > 1 :
+			pickers.append(itemgetter(*positions))
+		else :
+			pickers.append(lambda row: tuple(row))
+	for start in range(0, n, blockSize) :
+		rows = []
+		for i in range(start, min(start + blockSize, n)) :
+			row = []
+			for k, crit in enumerate(critId) :
+				cut1, cut05 = cuts[crit][i]
+				sortedRow = [1.0] * cut1 + [0.5] * (cut05 - cut1) + [0.0] * (n - cut05)
+				row.append(array('d', pickers[k](sortedRow)))
+			rows.append(row)
+		yield start, rows
+	
+##########
+
+def getRubisElementaryOutrankingArray (altId, critId, perfTable, thresholds, blockSize=256) :
+	# Dense counterpart of getRubisElementaryOutranking: ElemOut[i][k][j] is the value for
+	# (altId[i], altId[j], critId[k]).
+	
+	ElemOut = []
+	for start, rows in iterRubisElementaryOutrankingBlocks(altId, critId, perfTable, thresholds, blockSize) :
+		ElemOut.extend(rows)
+	return ElemOut
+	
+##########
+
+def getVetosCoordinates (altId, critId, perfTable, thresholds) :
+	# Sparse counterpart of getVetos: returns a list of (i, j, k, value) tuples, meaning that
+	# critId[k] raises a strong (value 1) or a weak (value 0.5) veto for (altId[i], altId[j]).
+	# Only the vetoed pairs are visited, so the cost is O(m.n.log(n)) plus the size of the output.
+	
+	coordinates = []
+	for k, crit in enumerate(critId) :
+		critThresholds = thresholds[crit]
+		if 'veto' not in critThresholds :
+			continue
+		order = sorted(range(len(altId)), key=lambda i: perfTable[altId[i]][crit])
+		values = [perfTable[altId[i]][crit] for i in order]
+		veto = critThresholds['veto']
+		weakVeto = critThresholds.get('weakVeto')
+		for i, alt1 in enumerate(altId) :
+			perf = perfTable[alt1][crit]
+			strongCut = bisect_right(values, perf + veto)
+			for j in order[strongCut:] :
+				coordinates.append((i, j, k, 1))
+			if weakVeto is not None :
+				weakCut = bisect_right(values, perf + weakVeto)
+				for j in order[weakCut:max(weakCut, strongCut)] :
+					coordinates.append((i, j, k, 0.5))
+	return coordinates
+	
+##########
+
+def getVetosFast (altId, critId, perfTable, thresholds) :
+	# Same result as getVetos, built from getVetosCoordinates.
+	
+	tabVeto = {}
+	for i, j, k, value in getVetosCoordinates(altId, critId, perfTable, thresholds) :
+		tabVeto.setdefault(altId[i], {}).setdefault(altId[j], {})[critId[k]] = value
+	return tabVeto
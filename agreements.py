@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#The MIT License (MIT)
+#
+#Copyright (c) 2014 Tomasz Mieszkowski
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#############################################################################
+
+"""Comparing the assignments of the sorting methods (see
+PrometheeMultiSorting.py).
+"""
+
+from lxml import etree
+
+
+###############################################################################
+# Comparing the methods.                                                      #
+###############################################################################
+
+def get_categories_ranks(profiles_categories):
+    """Returns a dict: category -> its rank (1 for the lowest one), derived
+    from the ordering of the profiles (boundary or central ones).
+    """
+    categories = []
+    for rank in sorted(profiles_categories):
+        classes = profiles_categories[rank]['classes']
+        if isinstance(classes, dict):
+            classes = [classes['lower'], classes['upper']]
+        else:
+            classes = [classes]
+        categories.extend(c for c in classes if c not in categories)
+    return dict((category, rank)
+                for rank, category in enumerate(categories, 1))
+
+
+def _get_assigned_ranks(assignment, categories_rank):
+    """Returns the lowest and the highest rank of the categories of an
+    assignment - a single category or a (lower, upper) interval.
+    """
+    if isinstance(assignment, tuple):
+        ranks = [categories_rank[category] for category in assignment]
+    else:
+        ranks = [categories_rank[assignment]]
+    return min(ranks), max(ranks)
+
+
+def get_agreements(assignments, categories_rank):
+    """'assignments' is a dict: method -> its assignments (single categories
+    or intervals of categories, as tuples). Returns a dict of dicts: method
+    -> method -> the share of the alternatives which both of them assign
+    alike, i.e. to at least one common category (so an interval agrees with
+    every category it contains). Only the alternatives assigned by both
+    methods are taken into account. 'categories_rank' is a dict: category
+    -> its rank (see get_categories_ranks).
+    """
+    ranks = {}
+    for method, method_assignments in assignments.items():
+        ranks[method] = dict(
+            (alt, _get_assigned_ranks(assignment, categories_rank))
+            for alt, assignment in method_assignments.items())
+    agreements = {}
+    for x in ranks:
+        agreements[x] = {}
+        for y in ranks:
+            alts = [alt for alt in ranks[x] if alt in ranks[y]]
+            agreeing = sum(1 for alt in alts
+                           if ranks[x][alt][0] <= ranks[y][alt][1] and
+                           ranks[y][alt][0] <= ranks[x][alt][1])
+            agreements[x][y] = (agreeing / float(len(alts))) if alts else 0.0
+    return agreements
+
+
+def read_assignments(file_name):
+    """Reads the assignments from the file written by us (i.e. with the
+    output of assignments_to_xmcda or assignments_as_intervals_to_xmcda),
+    so it isn't validated. Returns a dict: alternative -> category, or
+    alternative -> (lower category, upper category).
+    """
+    assignments = {}
+    for node in etree.parse(file_name).iter('alternativeAffectation'):
+        alt = node.findtext('alternativeID')
+        interval = node.find('categoriesInterval')
+        if interval is None:
+            assignments[alt] = node.findtext('categoryID')
+        else:
+            assignments[alt] = (interval.findtext('lowerBound/categoryID'),
+                                interval.findtext('upperBound/categoryID'))
+    return assignments
+
+
+def write_agreements(agreements, filename):
+    """Writes the output of get_agreements as a tab-separated matrix, with
+    the names of the methods in the first row and column.
+    """
+    methods = sorted(agreements)
+    try:
+        with open(filename, 'w') as f:
+            f.write('\t'.join([''] + methods) + '\n')
+            for x in methods:
+                f.write('\t'.join([x] + ['{:.4f}'.format(agreements[x][y])
+                                          for y in methods]) + '\n')
+    except IOError as e:
+        raise IOError("{}: '{}'".format(e.strerror, e.filename))
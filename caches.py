@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#The MIT License (MIT)
+#
+#Copyright (c) 2014 Tomasz Mieszkowski
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#############################################################################
+
+"""The cache of the parsed input data (PROMETHEE_PARSE_CACHE) and the
+memoization of the results (PROMETHEE_RESULT_CACHE). common.py imports it
+only when the respective environment variable is set.
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import shutil
+import tempfile
+from functools import partial
+
+try:
+    import fcntl
+except ImportError:  # e.g. on Windows, where the stats aren't locked
+    fcntl = None
+
+from common import (PARSE_CACHE_ENV, PARSE_CACHE_SIZE, PARSE_CACHE_SIZE_ENV,
+                    RESULT_CACHE_ENV)
+
+
+###############################################################################
+# Cache of the parsed input data.                                             #
+###############################################################################
+
+_SCALAR_TYPES = set([int, float, bool, type(None)])
+try:
+    _SCALAR_TYPES.add(long)
+    _STRING_TYPES = (str, unicode)
+except NameError:  # python 3
+    _STRING_TYPES = (str, )
+
+
+def _to_plain(value):
+    """Returns a copy of 'value' made of the built-in types only, so that it
+    comes back the same after marshalling - the subclasses of strings (e.g.
+    the 'smart strings' returned by xpath) become plain strings. Raises
+    TypeError for anything else (e.g. a Vividict, which would lose its
+    class).
+    """
+    if type(value) in _SCALAR_TYPES:
+        return value
+    if type(value) is dict:
+        return dict((_to_plain(k), _to_plain(v)) for k, v in value.items())
+    if type(value) is list:
+        return [_to_plain(v) for v in value]
+    if type(value) is tuple:
+        return tuple(_to_plain(v) for v in value)
+    for string_type in _STRING_TYPES:
+        if isinstance(value, string_type):
+            return string_type(value)
+    raise TypeError("Can't cache the value of type '{}'."
+                    .format(type(value).__name__))
+
+
+class ParseCache(object):
+    """On-disk cache of the values extracted from the input files, one
+    marshalled file per entry. The entries are content-addressed (see:
+    get_cached_value), so they never go stale - the oldest ones (by the
+    time of the last use) are just evicted once the total size exceeds
+    'max_size' bytes.
+
+    The total size is tracked in memory (the directory is listed once, on
+    the first put), so the directory is listed again only when the size
+    limit is exceeded. The eviction then goes down to 'low_water' of the
+    limit, so that it isn't repeated on every put - and it also accounts
+    for the entries written by other processes in the meantime.
+    """
+
+    low_water = 0.9
+
+    def __init__(self, directory, max_size=PARSE_CACHE_SIZE):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.max_size = max_size
+        self.total_size = None
+
+    def _get_path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + '.bin')
+
+    def get(self, key):
+        """Returns a tuple (hit, value)."""
+        path = self._get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = marshal.load(f)
+            os.utime(path, None)
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            # missing, evicted in the meantime or written by another version
+            # of python
+            return False, None
+        return True, value
+
+    def put(self, key, value):
+        path = self._get_path(key)
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            with open(temp_path, 'wb') as f:
+                marshal.dump(value, f)
+            size = os.path.getsize(temp_path)
+            try:
+                size -= os.path.getsize(path)  # replaced
+            except OSError:
+                pass
+            os.rename(temp_path, path)
+        except (IOError, OSError):
+            return
+        if self.total_size is None:
+            self._evict(self.max_size)
+        else:
+            self.total_size += size
+            if self.total_size > self.max_size:
+                self._evict(int(self.max_size * self.low_water))
+
+    def _evict(self, max_size):
+        """Lists the entries and evicts the oldest ones until their total
+        size is at most 'max_size'.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.bin'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self.total_size = total
+
+
+_parse_caches = {}
+
+
+def get_parse_cache():
+    """Returns the ParseCache in the directory given by the
+    PROMETHEE_PARSE_CACHE environment variable (with the size limit from
+    PROMETHEE_PARSE_CACHE_SIZE, if given), or None when it's not set.
+    """
+    directory = os.environ.get(PARSE_CACHE_ENV)
+    if not directory:
+        return None
+    max_size = int(os.environ.get(PARSE_CACHE_SIZE_ENV, PARSE_CACHE_SIZE))
+    key = (directory, max_size)
+    if key not in _parse_caches:
+        _parse_caches[key] = ParseCache(directory, max_size)
+    return _parse_caches[key]
+
+
+class LazyTrees(object):
+    """Stands in for the dict returned by common._get_trees, but parses (and
+    validates) every file only when it's needed for the first time and
+    keeps track of the trees which are asked for. 'parse' is the function
+    parsing a file (common._parse_tree).
+    """
+
+    def __init__(self, paths, parse):
+        self.paths = paths  # tree name -> file path
+        self.parse = parse
+        self.trees = {}
+        self.digests = {}
+        self.accessed = set()
+
+    def get(self, name, default=None):
+        self.accessed.add(name)
+        if name not in self.paths:
+            return default
+        if name not in self.trees:
+            self.trees[name] = self.parse(self.paths[name])
+        return self.trees[name]
+
+    def __getitem__(self, name):
+        if name not in self.paths:
+            self.accessed.add(name)
+            raise KeyError(name)
+        return self.get(name)
+
+    def __contains__(self, name):
+        return name in self.paths
+
+    def get_digest(self, name):
+        """Returns the digest of the file's contents (None if it's
+        missing).
+        """
+        if name not in self.paths:
+            return None
+        if name not in self.digests:
+            with open(self.paths[name], 'rb') as f:
+                self.digests[name] = hashlib.sha1(f.read()).hexdigest()
+        return self.digests[name]
+
+
+def get_cached_value(cache, trees, param, getter, args, kwargs):
+    """Returns the value of 'param' from the cache if the files which it
+    was extracted from the last time haven't changed since, calls 'getter'
+    and caches its result otherwise.
+    """
+    name = repr((param, sorted(kwargs.items())))
+    hit, names = cache.get('trees: ' + name)
+    if hit:
+        key = repr((name, [(n, trees.get_digest(n)) for n in names]))
+        hit, value = cache.get(key)
+        if hit:
+            return value
+    trees.accessed = set()
+    value = getter(*args, **kwargs)
+    try:
+        value = _to_plain(value)
+    except TypeError:
+        return value
+    names = sorted(trees.accessed)
+    cache.put('trees: ' + name, names)
+    key = repr((name, [(n, trees.get_digest(n)) for n in names]))
+    cache.put(key, value)
+    return value
+
+
+###############################################################################
+# Memoization of the results.                                                 #
+###############################################################################
+
+# the code which the results depend on, apart from the module itself
+_CODE_FILES = [os.path.join(os.path.dirname(os.path.abspath(__file__)), f)
+               for f in ('common.py', 'PyXMCDA.py', 'flows.py',
+                         'outranking.py', 'robustness.py')]
+
+
+def _update_digest(digest, path):
+    with open(path, 'rb') as f:
+        for chunk in iter(partial(f.read, 2 ** 16), b''):
+            digest.update(chunk)
+
+
+class ResultStore(object):
+    """Keeps the output files of the runs, keyed by the digest of all their
+    inputs (see: get_digest), together with the number of hits and misses
+    per method.
+    """
+
+    def __init__(self, directory):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+
+    def get_digest(self, script, input_dir):
+        """Returns the SHA-1 digest of all the files in 'input_dir' (with
+        their relative paths, so the scenarios and the method parameters
+        are included) and of the method's code, i.e. 'script' and the
+        modules it may use (see: _CODE_FILES).
+        """
+        digest = hashlib.sha1()
+        script = os.path.splitext(os.path.abspath(script))[0] + '.py'
+        for path in [script] + _CODE_FILES:
+            digest.update(os.path.basename(path).encode('utf-8'))
+            _update_digest(digest, path)
+        for root, dirs, files in os.walk(input_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, input_dir)
+                digest.update(relative.replace(os.sep, '/').encode('utf-8'))
+                digest.update(b'\0')
+                _update_digest(digest, path)
+        return digest.hexdigest()
+
+    def restore(self, digest, output_dir):
+        """Copies the stored output files to 'output_dir'. Returns a tuple
+        (hit, exit_code).
+        """
+        result_dir = os.path.join(self.directory, digest)
+        try:
+            with open(os.path.join(result_dir, 'exit_code')) as f:
+                exit_code = json.load(f)
+            names = os.listdir(os.path.join(result_dir, 'files'))
+            for name in names:
+                shutil.copyfile(os.path.join(result_dir, 'files', name),
+                                os.path.join(output_dir, name))
+        except (IOError, OSError, ValueError):
+            return False, None
+        return True, exit_code
+
+    def save(self, digest, files_dir, exit_code):
+        """Stores all the files in 'files_dir' with the exit code."""
+        result_dir = os.path.join(self.directory, digest)
+        if os.path.isdir(result_dir):
+            return
+        temp_dir = tempfile.mkdtemp(dir=self.directory)
+        try:
+            shutil.copytree(files_dir, os.path.join(temp_dir, 'files'))
+            with open(os.path.join(temp_dir, 'exit_code'), 'w') as f:
+                json.dump(exit_code, f)
+            os.rename(temp_dir, result_dir)
+        except (IOError, OSError, shutil.Error):
+            # e.g. saved by a concurrent run in the meantime
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def get_stats(self):
+        """Returns a dict: method -> {'hits': int, 'misses': int}."""
+        try:
+            with open(os.path.join(self.directory, 'stats.json')) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def count(self, method, hit):
+        """Updates the stats under an exclusive lock (on 'stats.lock'), so
+        the counts of the concurrent runs don't overwrite each other, and
+        replaces stats.json with a rename, so it's never read half-written.
+        """
+        path = os.path.join(self.directory, 'stats.json')
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            with open(os.path.join(self.directory, 'stats.lock'), 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                stats = self.get_stats()
+                method_stats = stats.setdefault(method,
+                                                {'hits': 0, 'misses': 0})
+                method_stats['hits' if hit else 'misses'] += 1
+                with open(temp_path, 'w') as f:
+                    json.dump(stats, f, indent=2, sort_keys=True)
+                os.rename(temp_path, path)
+        except (IOError, OSError):
+            pass
+
+    def memoize(self, run, script, input_dir, output_dir):
+        """Calls 'run' (which writes the results to the directory given as
+        its only argument and returns the exit code), unless the results of
+        a run with the same inputs and code are stored already - then they
+        are just copied to 'output_dir'. Otherwise 'run' writes to a
+        temporary directory first, so all the files it writes are known,
+        and they're stored (messages.xml included) only when the run
+        succeeds, i.e. its exit code is 0 or None - the failures may be
+        transient (e.g. the XSD schema couldn't be downloaded). 'script' is
+        the path of the module (see: common.run_memoized).
+        """
+        method = os.path.splitext(os.path.basename(script))[0]
+        digest = self.get_digest(script, input_dir)
+        hit, exit_code = self.restore(digest, output_dir)
+        self.count(method, hit)
+        if hit:
+            return exit_code
+        temp_dir = tempfile.mkdtemp(dir=self.directory)
+        try:
+            try:
+                exit_code = run(temp_dir)
+            finally:
+                # the files written before an exception are kept, as usual
+                for name in os.listdir(temp_dir):
+                    shutil.copyfile(os.path.join(temp_dir, name),
+                                    os.path.join(output_dir, name))
+            if exit_code in (0, None):
+                self.save(digest, temp_dir, exit_code)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return exit_code
+
+
+def get_result_store():
+    """Returns the ResultStore in the directory given by the
+    PROMETHEE_RESULT_CACHE environment variable, or None when it's not set.
+    """
+    directory = os.environ.get(RESULT_CACHE_ENV)
+    if not directory:
+        return None
+    return ResultStore(directory)
+
@@ -24,9 +24,14 @@
 #############################################################################
 
 import os
-import re
 from functools import partial
 
+# every run of every module imports (and, without the bytecode, compiles)
+# this file, so the code needed only by some of the runs lives in separate
+# files, imported only by the functions using it: outranking.py, flows.py,
+# robustness.py, agreements.py and caches.py - and so do the modules from
+# the standard library which aren't needed by most of the runs (e.g.
+# hashlib, threading) and networkx
 import PyXMCDA as px
 from lxml import etree
 
@@ -48,6 +53,12 @@ THRESHOLDS = ['indifference', 'preference', 'veto', 'reinforced_preference',
 
 THRESHOLDS_OLD_TO_NEW = {'ind': 'indifference', 'pref': 'preference'}
 
+# the directories of the caches (see caches.py), when they are used
+PARSE_CACHE_ENV = 'PROMETHEE_PARSE_CACHE'
+PARSE_CACHE_SIZE_ENV = 'PROMETHEE_PARSE_CACHE_SIZE'
+PARSE_CACHE_SIZE = 64 * 2 ** 20  # bytes
+RESULT_CACHE_ENV = 'PROMETHEE_RESULT_CACHE'
+
 
 class InputDataError(Exception):
     pass
@@ -94,6 +105,16 @@ def get_relation_type(x, y, outranking):
     return relation
 
 
+def get_midpoints(profiles_categories, categories_flows):
+    """Returns the sorted midpoints between the flows of the consecutive
+    central profiles.
+    """
+    flows = [categories_flows[profiles_categories[i]["id"]]
+             for i in range(1, len(profiles_categories) + 1)]
+    return sorted((flows[i] + flows[i - 1]) / 2.0
+                  for i in range(1, len(flows)))
+
+
 def get_linear(pref_directions, criterion, x, y, threshold):
     """Check if the given threshold is defined as linear and if yes, then
     calculate its value - otherwise (i.e. when the threshold is a constant)
@@ -138,8 +159,88 @@ def get_dirs(args):
     return input_dir, output_dir
 
 
-def _get_trees(input_dir, filenames):
-    trees = {}
+def get_scenarios_dirs(input_dir):
+    """Returns a sorted list of (name, path) tuples with the subdirectories of
+    'input_dir/scenarios' - each of them holds an alternative set of
+    profiles (categories, profiles and their flows) to be evaluated against
+    the same alternatives. The list is empty when there are no scenarios.
+    """
+    scenarios_dir = os.path.join(input_dir, 'scenarios')
+    if not os.path.isdir(scenarios_dir):
+        return []
+    return [(name, os.path.join(scenarios_dir, name))
+            for name in sorted(os.listdir(scenarios_dir))
+            if os.path.isdir(os.path.join(scenarios_dir, name))]
+
+
+# recently parsed trees, by the digest of the file's contents (see:
+# keep_trees)
+_kept_trees = None
+_kept_trees_size = 0
+_kept_trees_lock = None
+
+
+def keep_trees(size=256):
+    """Makes the parsed (and validated) files stay in memory - up to 'size'
+    of the most recently used ones, keyed by the digest of their contents -
+    so a long-running process (e.g. PrometheeWorker.py) parses the files
+    shared by many jobs only once. 'size' = 0 turns it off.
+    """
+    global _kept_trees, _kept_trees_lock, _kept_trees_size
+    if _kept_trees is None:
+        import threading
+        from collections import OrderedDict
+        _kept_trees = OrderedDict()
+        _kept_trees_lock = threading.Lock()
+    _kept_trees_size = size
+    with _kept_trees_lock:
+        while len(_kept_trees) > size:
+            _kept_trees.popitem(last=False)
+
+
+def _parse_tree(file_name):
+    if _kept_trees_size:
+        import hashlib
+        with open(file_name, 'rb') as f:
+            key = hashlib.sha1(f.read()).hexdigest()
+        # the methods may be run in threads (see PrometheeMultiSorting.py)
+        with _kept_trees_lock:
+            tree = _kept_trees.pop(key, None)
+            if tree is not None:
+                _kept_trees[key] = tree
+                return tree
+    tree = px.parseValidate(file_name)
+    if tree is None:
+        raise InputDataError("Validation error with the file: '{}'."
+                             .format(os.path.basename(file_name)))
+    if _kept_trees_size:
+        with _kept_trees_lock:
+            _kept_trees[key] = tree
+            if len(_kept_trees) > _kept_trees_size:
+                _kept_trees.popitem(last=False)
+    return tree
+
+
+def load_trees(input_dir):
+    """Parses all the XML files from input_dir, so they're kept in memory
+    (keep_trees has to be turned on first), e.g. before forking the
+    processes which are going to use them. The invalid files are skipped -
+    it's up to the users of these files to report them.
+    """
+    for name in sorted(os.listdir(input_dir)):
+        file_name = os.path.join(input_dir, name)
+        if name.endswith('.xml') and os.path.isfile(file_name):
+            try:
+                _parse_tree(file_name)
+            except InputDataError:
+                pass
+
+
+def _get_trees(input_dir, filenames, lazy=False):
+    """With 'lazy', the files are parsed only when they are used (see:
+    caches.LazyTrees).
+    """
+    paths = []
     for f, is_optional in filenames:
         file_name = os.path.join(input_dir, f)
         if not os.path.isfile(file_name):
@@ -148,18 +249,19 @@ def _get_trees(input_dir, filenames):
             else:
                 raise InputDataError("Problem with the input file: '{}'."
                                      .format(f))
-        tree = None
-        tree = px.parseValidate(file_name)
-        if tree is None:
-            raise InputDataError("Validation error with the file: '{}'."
-                                 .format(f))
         tree_name = os.path.splitext(f)[0]
         # although we use 'classes' and 'classes_profiles' in the names of
         # the input files and in the documentation, we want to use them as
         # 'categories' (and 'categories_profiles') internally
         if 'classes' in tree_name:
             tree_name = tree_name.replace('classes', 'categories')
-        trees.update({tree_name: tree})
+        paths.append((tree_name, file_name))
+    if lazy:
+        from caches import LazyTrees
+        return LazyTrees(dict(paths), _parse_tree)
+    trees = {}
+    for tree_name, file_name in paths:
+        trees.update({tree_name: _parse_tree(file_name)})
     return trees
 
 
@@ -222,6 +324,35 @@ def _get_thresholds(xmltree):
     return thresholds
 
 
+def _get_weights_intervals(xmltree, criteria):
+    """Returns a dict: criterion -> (lower, upper) with the weights given as
+    intervals in 'weights.xml' - the plain values become degenerate
+    intervals.
+    """
+    intervals = {}
+    for criterion_value in xmltree.findall('.//criterionValue'):
+        c = criterion_value.find('criterionID').text
+        if c not in criteria:
+            continue
+        interval = criterion_value.find('value/interval')
+        if interval is None:
+            value = px.getValue(criterion_value)
+            if not isinstance(value, (int, float)):
+                raise InputDataError("Missing weight for criterion '{}'."
+                                     .format(c))
+            intervals[c] = (float(value), float(value))
+            continue
+        bounds = []
+        for bound in ('lowerBound', 'upperBound'):
+            node = interval.find(bound)
+            if node is None:
+                raise InputDataError("Missing {} of the weight for "
+                                     "criterion '{}'.".format(bound, c))
+            bounds.append(float(node.find('./*').text))
+        intervals[c] = tuple(bounds)
+    return intervals
+
+
 def _get_intersection_distillation(xmltree, altId):
     """Allows for using 'intersection_distillation.xml' file  instead of
     'outranking.xml'.
@@ -235,11 +366,12 @@ def _get_intersection_distillation(xmltree, altId):
     else:
         comparisons = comparisons[0]
         datas = {}
+        alternatives = set(altId)
         for pair in comparisons.findall("pairs/pair"):
             init = pair.find("initial/alternativeID").text
             term = pair.find("terminal/alternativeID").text
-            if altId.count(init) > 0:
-                if altId.count(term) > 0:
+            if init in alternatives:
+                if term in alternatives:
                     if init not in datas:
                         datas[init] = {}
                     datas[init][term] = 1.0
@@ -266,6 +398,27 @@ def _get_outranking_crisp(xmltree, mcda_concept=None):
         return ret
 
 
+def _get_outranking_bitset(xmltree, alternatives=(), mcda_concept=None):
+    """Same as _get_outranking_crisp, but returns OutrankingBitset (indexed
+    by 'alternatives' first).
+    """
+    if xmltree is None:
+        return None
+    if mcda_concept is None:
+        str_search = ".//alternativesComparisons"
+    else:
+        str_search = (".//alternativesComparisons"
+                      "[@mcdaConcept=\'" + mcda_concept + "\']")
+    comparisons = xmltree.xpath(str_search)[0]
+    from outranking import OutrankingBitset
+    ret = OutrankingBitset(alternatives)
+    for pair in comparisons.findall("pairs/pair"):
+        initial = pair.find("initial/alternativeID").text
+        terminal = pair.find("terminal/alternativeID").text
+        ret.add(initial, terminal)
+    return ret
+
+
 def _get_alternatives_comparisons(xmltree, alternatives,
                                   categories_profiles=None, use_partials=False,
                                   mcda_concept=None):
@@ -616,6 +769,15 @@ def get_input_data(input_dir, filenames, params, **kwargs):
         criteria = px.getCriteriaID(trees['criteria'])
         return criteria  # list
 
+    def get_cut_points(*args, **kwargs):
+        cut_points = px.getParametersByName(
+            trees['method_parameters'],
+            'cut_points',
+        )
+        if not cut_points:
+            return None
+        return [float(cut_point) for cut_point in cut_points]  # list, NoneType
+
     def get_cut_threshold(*args, **kwargs):
         cut_threshold = px.getParameterByName(
             trees['method_parameters'],
@@ -628,6 +790,21 @@ def get_input_data(input_dir, filenames, params, **kwargs):
             )
         return cut_threshold  # float
 
+    def get_cut_thresholds(*args, **kwargs):
+        cut_thresholds = px.getParametersByName(
+            trees['method_parameters'],
+            'cut_thresholds',
+        )
+        if not cut_thresholds:
+            cut_thresholds = [get_cut_threshold()]
+        for cut_threshold in cut_thresholds:
+            if cut_threshold is None or not (0 <= float(cut_threshold) <= 1):
+                raise InputDataError(
+                    "Every value of 'cut_thresholds' should be in range "
+                    "[0, 1]."
+                )
+        return cut_thresholds  # list
+
     def get_cv_crossed(*args, **kwargs):
         # 'cv_crossed' stands for 'counter-veto crossed'
         alternatives = px.getAlternativesID(trees['alternatives'])
@@ -680,6 +857,17 @@ def get_input_data(input_dir, filenames, params, **kwargs):
         )
         return discordance  # Vividict
 
+    def get_first_rank(*args, **kwargs):
+        first_rank = px.getParameterByName(
+            trees.get('method_parameters'),
+            'first_rank',
+        )
+        if first_rank is None:
+            return 1
+        if int(first_rank) < 1:
+            raise InputDataError("'first_rank' should be greater than 0.")
+        return int(first_rank)  # int
+
     def get_interactions(*args, **kwargs):
         criteria = px.getCriteriaID(trees['criteria'])
         interactions = _get_criteria_interactions(
@@ -688,9 +876,21 @@ def get_input_data(input_dir, filenames, params, **kwargs):
         )
         return interactions  # dict
 
+    def get_last_rank(*args, **kwargs):
+        last_rank = px.getParameterByName(
+            trees.get('method_parameters'),
+            'last_rank',
+        )
+        if last_rank is None:
+            return None
+        if int(last_rank) < 1:
+            raise InputDataError("'last_rank' should be greater than 0.")
+        return int(last_rank)  # int, NoneType
+
     def get_outranking(*args, **kwargs):
-        outranking = _get_outranking_crisp(trees['outranking'])
-        return outranking  # Vividict
+        alternatives = px.getAlternativesID(trees['alternatives'])
+        outranking = _get_outranking_bitset(trees['outranking'], alternatives)
+        return outranking  # OutrankingBitset
 
     def get_performances(*args, **kwargs):
         performances = px.getPerformanceTable(trees['performance_table'], None, None)
@@ -705,10 +905,12 @@ def get_input_data(input_dir, filenames, params, **kwargs):
         return pref_directions  # dict
 
     def get_profiles_performance_table(*args, **kwargs):
-        comparison_with = px.getParameterByName(
-            trees['method_parameters'],
-            'comparison_with',
-        )
+        comparison_with = kwargs.get('comparison_with')
+        if comparison_with is None:
+            comparison_with = px.getParameterByName(
+                trees['method_parameters'],
+                'comparison_with',
+            )
         if comparison_with in ('boundary_profiles', 'central_profiles'):
             tree = trees.get('profiles_performance_table')
             if tree is None:
@@ -737,11 +939,18 @@ def get_input_data(input_dir, filenames, params, **kwargs):
                 msg = (
                     "Reinforcement factor for criterion '{}' should be "
                     "higher than 1.0 (ideally between 1.2 and 1.5)."
+                    .format(c)
                 )
                 raise InputDataError(msg)
             factors.update(rf)
         return factors  # dict
 
+    def get_reference_assignments(*args, **kwargs):
+        assignments = px.getAlternativesAffectations(
+            trees['reference_assignments'],
+        )
+        return assignments  # dict
+
     # TODO merge _get_thresholds with this function
     def get_thresholds(*args, **kwargs):
         thresholds = _get_thresholds(trees['criteria'])
@@ -758,9 +967,14 @@ def get_input_data(input_dir, filenames, params, **kwargs):
         weights = px.getCriterionValue(trees['weights'], criteria)
         return weights  # dict
 
+    def get_weights_intervals(*args, **kwargs):
+        criteria = px.getCriteriaID(trees['criteria'])
+        intervals = _get_weights_intervals(trees['weights'], criteria)
+        return intervals  # dict
+
     def get_param_boolean(param_name, *args, **kwargs):
         parameter = px.getParameterByName(
-            trees['method_parameters'],
+            trees.get('method_parameters'),
             param_name,
         )
         return True if parameter == 'true' else False
@@ -770,8 +984,21 @@ def get_input_data(input_dir, filenames, params, **kwargs):
         return param
 
     def get_param_real(param_name, *args, **kwargs):
-        param = px.getParameterByName(trees['method_parameters'], param_name)
-        return float(param)
+        param = px.getParameterByName(trees.get('method_parameters'),
+                                      param_name)
+        return float(param) if param is not None else None
+
+    def get_param_integer(param_name, *args, **kwargs):
+        param = px.getParameterByName(trees.get('method_parameters'),
+                                      param_name)
+        return int(param) if param is not None else None
+
+    def get_param_positive_integer(param_name, *args, **kwargs):
+        param = get_param_integer(param_name)
+        if param is not None and param < 1:
+            raise InputDataError("'{}' should be greater than 0."
+                                 .format(param_name))
+        return param  # int, NoneType
 
     _functions_dict = {
         'alternatives': get_alternatives,
@@ -787,32 +1014,50 @@ def get_input_data(input_dir, filenames, params, **kwargs):
         #'concordance': get_concordance,
         'comparison_with': partial(get_param_string, 'comparison_with'),
         'cut_point': partial(get_param_real, 'cut_point'),
+        'cut_points': get_cut_points,
         'profiles_categories': get_profiles_categories,
-        #'credibility': get_credibility,
-        #'criteria': get_criteria,
-        #'cut_threshold': get_cut_threshold,
+        'credibility': get_credibility,
+        'compute_margins': partial(get_param_boolean, 'compute_margins'),
+        'criteria': get_criteria,
+        'cut_threshold': get_cut_threshold,
+        'cut_thresholds': get_cut_thresholds,
         #'cv_crossed': get_cv_crossed,
         #'discordance': get_discordance,
-        #'eliminate_cycles_method': partial(get_param_string, 'eliminate_cycles_method'),
+        'eliminate_cycles_method': partial(get_param_string, 'eliminate_cycles_method'),
+        'first_rank': get_first_rank,
         #'flows': get_flows,
-        #'interactions': get_interactions,
-        #'only_max_discordance': partial(get_param_boolean, 'only_max_discordance'),
-        #'outranking': get_outranking,
-        #'performances': get_performances,
-        #'pref_directions': get_pref_directions,
-        #'profiles_performance_table': get_profiles_performance_table,
-        #'reinforcement_factors': get_reinforcement_factors,
-        #'thresholds': get_thresholds,
-        #'weights': get_weights,
-        #'with_denominator': partial(get_param_boolean, 'with_denominator'),
-        #'use_partials': partial(get_param_boolean, 'use_partials'),
-        #'use_pre_veto': partial(get_param_boolean, 'use_pre_veto'),
-        #'z_function': partial(get_param_string, 'z_function'),
+        'flows_noise': partial(get_param_real, 'flows_noise'),
+        'interactions': get_interactions,
+        'last_rank': get_last_rank,
+        'noise_samples': partial(get_param_positive_integer, 'noise_samples'),
+        'only_max_discordance': partial(get_param_boolean, 'only_max_discordance'),
+        'outranking': get_outranking,
+        'processes': partial(get_param_positive_integer, 'processes'),
+        'performances': get_performances,
+        'pref_directions': get_pref_directions,
+        'profiles_performance_table': get_profiles_performance_table,
+        'reference_assignments': get_reference_assignments,
+        'reinforcement_factors': get_reinforcement_factors,
+        'seed': partial(get_param_integer, 'seed'),
+        'thresholds': get_thresholds,
+        'weights': get_weights,
+        'weights_intervals': get_weights_intervals,
+        'weights_samples': partial(get_param_positive_integer, 'weights_samples'),
+        'with_denominator': partial(get_param_boolean, 'with_denominator'),
+        'use_partials': partial(get_param_boolean, 'use_partials'),
+        'use_pre_veto': partial(get_param_boolean, 'use_pre_veto'),
+        'z_function': partial(get_param_string, 'z_function'),
 
     }
 
     args = (input_dir, filenames, params)
-    trees = _get_trees(input_dir, filenames)
+    # with the parse cache, the files are parsed only when some of the values
+    # extracted from them aren't cached yet
+    cache = None
+    if os.environ.get(PARSE_CACHE_ENV):
+        from caches import get_cached_value, get_parse_cache
+        cache = get_parse_cache()
+    trees = _get_trees(input_dir, filenames, lazy=cache is not None)
     d = _create_data_object(params)
     for p in params:
         try:
@@ -820,7 +1065,10 @@ def get_input_data(input_dir, filenames, params, **kwargs):
         except AttributeError:
             raise InputDataError("Unknown parameter '{}' specified.".format(p))
         try:
-            v = f(*args, **kwargs)
+            if cache is not None:
+                v = get_cached_value(cache, trees, p, f, args, kwargs)
+            else:
+                v = f(*args, **kwargs)
             setattr(d, p, v)
         except Exception as e:
             if type(e) is InputDataError:
@@ -934,10 +1182,16 @@ def outranking_to_xmcda(outranking, mcda_concept=None):
         xmcda = etree.Element('alternativesComparisons',
                               mcdaConcept=mcda_concept)
     pairs_node = etree.SubElement(xmcda, 'pairs')
-    pairs = []
-    _extract(outranking, pairs)
-    # tuples are sorted lexographically, so there's no need for lambda as a key
-    pairs.sort()
+    if isinstance(outranking, list):  # (x, y) pairs
+        pairs = sorted(outranking)
+    elif isinstance(outranking, dict):
+        pairs = []
+        _extract(outranking, pairs)
+        # tuples are sorted lexographically, so there's no need for lambda
+        # as a key
+        pairs.sort()
+    else:  # outranking.OutrankingBitset
+        pairs = outranking.iter_pairs()
     for pair in pairs:
         pair_node = etree.SubElement(pairs_node, 'pair')
         initial_node = etree.SubElement(pair_node, 'initial')
@@ -988,12 +1242,17 @@ def assignments_as_intervals_to_xmcda(assignments):
 ###############################################################################
 
 def write_xmcda(xmcda, filename):
-    et = etree.ElementTree(xmcda)
+    """'xmcda' is an etree.Element or a list of them."""
+    if not isinstance(xmcda, list):
+        xmcda = [xmcda]
     try:
-        with open(filename, 'w') as f:
-            f.write(HEADER)
-            et.write(f, pretty_print=True, encoding='UTF-8')
-            f.write(FOOTER)
+        # binary mode, since lxml writes the encoded bytes
+        with open(filename, 'wb') as f:
+            f.write(HEADER.encode('utf-8'))
+            for element in xmcda:
+                et = etree.ElementTree(element)
+                et.write(f, pretty_print=True, encoding='UTF-8')
+            f.write(FOOTER.encode('utf-8'))
     except IOError as e:
         raise IOError("{}: '{}'".format(e.strerror, e.filename))
 
@@ -1004,8 +1263,7 @@ def print_xmcda(xmcda):
 
 
 def get_error_message(err):
-    exception = re.findall("\.([a-zA-Z]+)'", str(type(err)))[0]
-    err_msg = ': '.join((exception, str(err)))
+    err_msg = ': '.join((type(err).__name__, str(err)))
     return err_msg
 
 
@@ -1024,3 +1282,19 @@ def create_messages_file(error_messages, log_messages, out_dir):
             log_msg_node_text = etree.SubElement(log_msg_node, 'text')
             log_msg_node_text.text = etree.CDATA(log_msg.strip())
     write_xmcda(xmcda, os.path.join(out_dir, 'messages.xml'))
+
+
+def run_memoized(run, script, input_dir, output_dir, bypass=False):
+    """Calls 'run' (which writes the results to the directory given as its
+    only argument and returns the exit code), unless the results of a run
+    with the same inputs and code are stored already in the directory given
+    by the PROMETHEE_RESULT_CACHE environment variable - then they are just
+    copied to 'output_dir' (see: caches.ResultStore.memoize). 'script' is
+    the path of the module. With 'bypass' or without
+    PROMETHEE_RESULT_CACHE, 'run' is always called directly with
+    'output_dir' and nothing is stored.
+    """
+    if bypass or not os.environ.get(RESULT_CACHE_ENV):
+        return run(output_dir)
+    from caches import get_result_store
+    return get_result_store().memoize(run, script, input_dir, output_dir)
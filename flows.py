@@ -0,0 +1,639 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#The MIT License (MIT)
+#
+#Copyright (c) 2014 Tomasz Mieszkowski
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#############################################################################
+
+"""Preference degrees and flows: the approximate (sampled) and incremental
+flows, the PROMETHEE I partial order and the PROMETHEE II ranking.
+"""
+
+import heapq
+import random
+import re
+
+from common import InputDataError, get_linear, omega
+from lxml import etree
+
+
+###############################################################################
+# Preference functions.                                                       #
+###############################################################################
+
+def get_partial_preference(pref_directions, thresholds, criterion, x, y):
+    """Calculates the unicriterion preference degree P_j(x, y) using the
+    'V-shape with indifference' function, i.e. the one described by the
+    'indifference' and 'preference' thresholds (both of them may be linear).
+    A missing 'preference' threshold makes it a 'usual' (step) function.
+    """
+    diff = omega(pref_directions, criterion, x, y)
+    if diff <= 0:
+        return 0.0
+    crit_thresholds = thresholds.get(criterion, {})
+    q = get_linear(pref_directions, criterion, x, y,
+                   crit_thresholds.get('indifference', 0.0))
+    p = get_linear(pref_directions, criterion, x, y,
+                   crit_thresholds.get('preference', q))
+    if diff <= q:
+        return 0.0
+    elif diff >= p:
+        return 1.0
+    else:
+        return (diff - q) / float(p - q)
+
+
+def get_aggregated_preference(criteria, weights, pref_directions, thresholds,
+                              perf_x, perf_y):
+    """Calculates the aggregated preference index pi(x, y) for two
+    performances (dicts keyed by criteria), normalized by the sum of weights.
+    """
+    pi = _get_preference_function(criteria, weights, pref_directions,
+                                  thresholds)
+    return pi(perf_x, perf_y)
+
+
+def _get_preference_function(criteria, weights, pref_directions, thresholds):
+    """Returns pi(perf_x, perf_y) with the sum of weights computed only once,
+    which matters when it is called for many pairs.
+    """
+    total = float(sum(weights[c] for c in criteria))
+    partials = [(c, weights[c] / total) for c in criteria]
+
+    def pi(perf_x, perf_y):
+        value = 0.0
+        for c, w in partials:
+            value += w * get_partial_preference(pref_directions, thresholds,
+                                                c, perf_x[c], perf_y[c])
+        return value
+    return pi
+
+
+###############################################################################
+# Approximate (sampled) flows.                                                #
+###############################################################################
+
+def _get_strata(ids, performances, criteria, weights, pref_directions,
+                strata):
+    """Splits 'ids' into 'strata' groups of (almost) equal size along a cheap
+    proxy score - the weighted sum of range-normalized performances.
+    """
+    ranges = {}
+    for c in criteria:
+        values = [performances[i][c] for i in ids]
+        low, high = min(values), max(values)
+        ranges[c] = (low, float(high - low) or 1.0)
+
+    def _proxy(i):
+        score = 0.0
+        for c in criteria:
+            low, span = ranges[c]
+            value = (performances[i][c] - low) / span
+            if pref_directions[c] == 'min':
+                value = 1.0 - value
+            score += weights[c] * value
+        return score
+
+    ordered = sorted(ids, key=_proxy)
+    size = len(ordered) / float(strata)
+    return [ordered[int(round(h * size)):int(round((h + 1) * size))]
+            for h in range(strata)]
+
+
+def _get_stratified_estimate(strata):
+    """'strata' is a list of (population size, sampled values) tuples.
+    Returns the stratified mean and its standard error (including the finite
+    population correction).
+    """
+    population = float(sum(size for size, _ in strata))
+    mean = variance = 0.0
+    for size, values in strata:
+        n_h = len(values)
+        if n_h == 0:
+            continue
+        share = size / population
+        m = sum(values) / n_h
+        mean += share * m
+        if 1 < n_h < size:
+            s2 = sum((v - m) ** 2 for v in values) / (n_h - 1)
+            variance += share ** 2 * s2 / n_h * (1.0 - n_h / float(size))
+    return mean, variance ** 0.5
+
+
+def get_approximate_flows(alternatives, performances, criteria, weights,
+                          pref_directions, thresholds, sample_size,
+                          profiles=None, strata=1, seed=None):
+    """Estimates PROMETHEE flows of 'alternatives' (and, optionally, of
+    'profiles') against a random reference sample of 'sample_size'
+    alternatives instead of all of them, which lowers the cost from
+    O(n^2 * m) to O(n * s * m).
+
+    With 'strata' > 1 the sample is stratified (with proportional allocation)
+    along a weighted-sum proxy score, which usually lowers the variance.
+    'performances' should contain the profiles as well, when they are given.
+
+    Returns a tuple (flows, positive_flows, negative_flows, errors), where
+    the first three are dicts keyed by alternatives and profiles IDs, so they
+    can be passed directly to the sort functions (as 'alternatives_flows'
+    and 'categories_flows' alike), and 'errors' holds the standard errors of
+    the estimates for the alternatives, e.g. {'a1': {'positive': 0.01,
+    'negative': 0.02, 'net': 0.02}}. The profiles, which are few, are
+    compared with all the alternatives (O(n * p * m)), so their flows are
+    exact and they get no errors: they're the fixed boundaries of the
+    categories (see get_flows_bounds and get_straddles). When 'sample_size'
+    covers all the alternatives, the flows of the alternatives are exact
+    too and their errors are 0.0.
+    """
+    if sample_size < 2:
+        raise InputDataError("'sample_size' should be at least 2.")
+    if strata < 1:
+        raise InputDataError("'strata' should be a positive integer.")
+    profiles = profiles or []
+    rng = random.Random(seed)
+    if strata == 1:
+        groups = [list(alternatives)]
+    else:
+        groups = _get_strata(alternatives, performances, criteria, weights,
+                             pref_directions, strata)
+    population = float(len(alternatives))
+    sample = []  # list of (stratum, sampled ids) tuples
+    for group in groups:
+        if not group:
+            continue
+        n_h = int(round(len(group) / population * sample_size))
+        n_h = min(len(group), max(2, n_h))
+        sample.append((set(group), rng.sample(group, n_h)))
+    pi = _get_preference_function(criteria, weights, pref_directions,
+                                  thresholds)
+
+    flows, positive_flows, negative_flows, errors = {}, {}, {}, {}
+    profiles_set = set(profiles)
+    population_sample = [(set(alternatives), list(alternatives))]
+    for x in list(alternatives) + list(profiles):
+        pos_strata, neg_strata, net_strata = [], [], []
+        for group, ids in (population_sample if x in profiles_set
+                           else sample):
+            # 'x' itself doesn't belong to the population it's compared with
+            size = len(group) - (1 if x in group else 0)
+            pos, neg, net = [], [], []
+            for y in ids:
+                if y == x:
+                    continue
+                p_xy = pi(performances[x], performances[y])
+                p_yx = pi(performances[y], performances[x])
+                pos.append(p_xy)
+                neg.append(p_yx)
+                net.append(p_xy - p_yx)
+            pos_strata.append((size, pos))
+            neg_strata.append((size, neg))
+            net_strata.append((size, net))
+        positive_flows[x], se_pos = _get_stratified_estimate(pos_strata)
+        negative_flows[x], se_neg = _get_stratified_estimate(neg_strata)
+        flows[x], se_net = _get_stratified_estimate(net_strata)
+        if x not in profiles_set:
+            errors[x] = {'positive': se_pos, 'negative': se_neg,
+                         'net': se_net}
+    return flows, positive_flows, negative_flows, errors
+
+
+def get_flows_bounds(flows, errors, kind='net', z=1.96):
+    """Returns (lower, upper) dicts of confidence interval bounds for the
+    approximate flows, where 'kind' is one of: 'positive', 'negative', 'net'.
+    The profiles (which get no errors from get_approximate_flows) are
+    returned unchanged, so the bounds of an alternative can be compared with
+    fixed boundaries of the categories.
+    """
+    lower, upper = {}, {}
+    for k, v in flows.items():
+        margin = z * errors[k][kind] if k in errors else 0.0
+        lower[k] = v - margin
+        upper[k] = v + margin
+    return lower, upper
+
+
+def get_straddles(lower_assignments, upper_assignments):
+    """Marks the alternatives whose confidence interval straddles a profile
+    boundary, i.e. which get different assignments when sorted using the
+    lower and upper bounds of their flows (see: get_flows_bounds). For the
+    methods using both flows, the pessimistic bound is the one with lower
+    positive and upper negative flows.
+    """
+    return dict((alt, lower_assignments[alt] != upper_assignments[alt])
+                for alt in lower_assignments)
+
+
+###############################################################################
+# Incremental flows.                                                          #
+###############################################################################
+
+class FlowStore(object):
+    """Keeps per-alternative sums of aggregated preferences, so the flows can
+    be refreshed in O(n * m) when a single alternative is added or removed,
+    instead of recomputing all of them in O(n^2 * m).
+
+    The convention is the same for the alternatives and the profiles (given
+    by their performances): the flow of each of them is its mean preference
+    over (and under) the alternatives in the store other than itself - so the
+    sum is divided by n - 1 for an alternative and by n for a profile. The
+    profiles aren't compared with each other, nor are they a part of the
+    reference set of the alternatives. Note that this isn't FlowSort's own
+    definition, where every alternative gets its flows (and its own flows of
+    the profiles) from the comparisons with the profiles only - those can't
+    be given as one set of the profiles' flows, which the sort functions
+    expect.
+    """
+
+    def __init__(self, criteria, weights, pref_directions, thresholds,
+                 profiles_performances=None, tolerance=1e-9):
+        self._pi = _get_preference_function(criteria, weights,
+                                            pref_directions, thresholds)
+        self.tolerance = tolerance
+        self.performances = {}
+        self.profiles_performances = dict(profiles_performances or {})
+        self._positive_sums = {}
+        self._negative_sums = {}
+        self._profiles_positive_sums = dict(
+            (b, 0.0) for b in self.profiles_performances)
+        self._profiles_negative_sums = dict(
+            (b, 0.0) for b in self.profiles_performances)
+        self._published = {}  # flows handed out by 'get_changed_flows'
+
+    def __len__(self):
+        return len(self.performances)
+
+    def __contains__(self, alternative):
+        return alternative in self.performances
+
+    def _update(self, alternative, performance, sign):
+        pi = self._pi
+        positive = negative = 0.0
+        for other, other_performance in self.performances.items():
+            if other == alternative:
+                continue
+            p_xy = pi(performance, other_performance)
+            p_yx = pi(other_performance, performance)
+            positive += p_xy
+            negative += p_yx
+            self._positive_sums[other] += sign * p_yx
+            self._negative_sums[other] += sign * p_xy
+        for profile, profile_performance in self.profiles_performances.items():
+            self._profiles_positive_sums[profile] += (
+                sign * pi(profile_performance, performance))
+            self._profiles_negative_sums[profile] += (
+                sign * pi(performance, profile_performance))
+        return positive, negative
+
+    def add(self, alternative, performance):
+        """Adds an alternative with its performances (a dict keyed by
+        criteria) and updates the preference sums of all the others.
+        """
+        if alternative in self.performances:
+            raise InputDataError("Alternative '{}' is already in the store."
+                                 .format(alternative))
+        positive, negative = self._update(alternative, performance, 1)
+        self.performances[alternative] = performance
+        self._positive_sums[alternative] = positive
+        self._negative_sums[alternative] = negative
+
+    def remove(self, alternative):
+        """Removes an alternative and subtracts its contribution from the
+        preference sums of all the others.
+        """
+        try:
+            performance = self.performances.pop(alternative)
+        except KeyError:
+            raise InputDataError("Alternative '{}' is not in the store."
+                                 .format(alternative))
+        del self._positive_sums[alternative]
+        del self._negative_sums[alternative]
+        self._update(alternative, performance, -1)
+
+    def get_flows(self):
+        """Returns a tuple (flows, positive_flows, negative_flows) of dicts
+        keyed by alternatives and profiles IDs (the same shape as the parsed
+        flows, so they can be passed directly to the sort functions).
+        """
+        flows, positive_flows, negative_flows = {}, {}, {}
+        n = len(self.performances)
+        divisor = float(max(n - 1, 1))
+        for alt in self.performances:
+            positive_flows[alt] = self._positive_sums[alt] / divisor
+            negative_flows[alt] = self._negative_sums[alt] / divisor
+            flows[alt] = positive_flows[alt] - negative_flows[alt]
+        divisor = float(max(n, 1))
+        for profile in self.profiles_performances:
+            positive_flows[profile] = (self._profiles_positive_sums[profile] /
+                                       divisor)
+            negative_flows[profile] = (self._profiles_negative_sums[profile] /
+                                       divisor)
+            flows[profile] = positive_flows[profile] - negative_flows[profile]
+        return flows, positive_flows, negative_flows
+
+    def get_changed_flows(self):
+        """Returns a tuple (changed, removed, flows, positive_flows,
+        negative_flows), where 'changed' is a list of the alternatives whose
+        flows moved by more than 'tolerance' since the previous call (any
+        change of the profiles flows marks all of them as changed), and
+        'removed' lists the alternatives removed in the meantime.
+        """
+        flows, positive_flows, negative_flows = self.get_flows()
+        current = dict((k, (positive_flows[k], negative_flows[k]))
+                       for k in flows)
+        previous = self._published
+        tol = self.tolerance
+
+        def _moved(k):
+            if k not in previous:
+                return True
+            return (abs(current[k][0] - previous[k][0]) > tol or
+                    abs(current[k][1] - previous[k][1]) > tol)
+
+        if any(_moved(b) for b in self.profiles_performances):
+            changed = sorted(self.performances)
+        else:
+            changed = sorted(a for a in self.performances if _moved(a))
+        removed = sorted(k for k in previous if k not in current)
+        self._published = current
+        return changed, removed, flows, positive_flows, negative_flows
+
+    def update_assignments(self, assignments, sort_function, categories,
+                           profiles_categories, extra_args=(),
+                           use_both_flows=False, only_changed=True):
+        """Re-assigns the alternatives with changed flows using one of the
+        sort functions and updates 'assignments' (a dict) in place.
+        With 'use_both_flows' the positive and negative flows are passed
+        (FlowSort I, Promsort), otherwise the net flows (FlowSort II,
+        PROMETHEE Tri). 'extra_args' (e.g. '(cut_point, )') are passed at
+        the end. Promsort compares the alternatives with the
+        others assigned to the same class, so it should be called with
+        'only_changed' set to False. Returns the list of re-assigned
+        alternatives.
+        """
+        changed, removed, flows, positive_flows, negative_flows = (
+            self.get_changed_flows())
+        for alt in removed:
+            assignments.pop(alt, None)
+        alternatives = changed if only_changed else sorted(self.performances)
+        if not alternatives:
+            return []
+        if use_both_flows:
+            output = sort_function(alternatives, categories,
+                                   profiles_categories, positive_flows,
+                                   negative_flows, positive_flows,
+                                   negative_flows, *extra_args)
+        else:
+            output = sort_function(alternatives, categories,
+                                   profiles_categories, flows, flows,
+                                   *extra_args)
+        if type(output) is tuple:  # Promsort returns two assignments
+            output = output[0]
+        assignments.update(output)
+        return alternatives
+
+
+###############################################################################
+# PROMETHEE I partial order.                                                  #
+###############################################################################
+
+class _MaxTree(object):
+    """Segment tree over positions 0..size-1 answering range maximum
+    queries; the values can only grow.
+    """
+
+    def __init__(self, size, default=-1):
+        self.size = max(size, 1)
+        self.default = default
+        self.tree = [default] * (2 * self.size)
+
+    def update(self, position, value):
+        position += self.size
+        while position and self.tree[position] < value:
+            self.tree[position] = value
+            position //= 2
+
+    def query(self, low, high):
+        """Maximum over the positions from 'low' to 'high' (inclusive)."""
+        tree = self.tree
+        result = self.default
+        low += self.size
+        high += self.size + 1
+        while low < high:
+            if low & 1:
+                if tree[low] > result:
+                    result = tree[low]
+                low += 1
+            if high & 1:
+                high -= 1
+                if tree[high] > result:
+                    result = tree[high]
+            low >>= 1
+            high >>= 1
+        return result
+
+
+class _FenwickTree(object):
+    """Binary indexed tree with prefix sums."""
+
+    def __init__(self, size):
+        self.tree = [0] * (size + 1)
+
+    def add(self, position, value):
+        position += 1
+        while position < len(self.tree):
+            self.tree[position] += value
+            position += position & -position
+
+    def prefix_sum(self, position):
+        """Sum over the positions from 0 to 'position' (inclusive)."""
+        result = 0
+        position += 1
+        while position > 0:
+            result += self.tree[position]
+            position -= position & -position
+        return result
+
+
+def get_promethee_i_order(alternatives, positive_flows, negative_flows):
+    """Computes the PROMETHEE I partial order, i.e. x P y when x is at least
+    as good as y on both flows (phi+ not lower, phi- not higher) and better
+    on at least one of them, x I y when both flows are equal, and x R y
+    otherwise (see isPreffered, isIndifferenced and isIncomparable in
+    Promsort).
+
+    Instead of comparing all the pairs, the distinct (phi+, phi-) points are
+    swept in the order of decreasing phi+ (and increasing phi-), so the
+    points dominating the current one are the already visited ones with
+    phi- not higher than its own - these are found with a segment tree and
+    a binary indexed tree over the ranks of phi-.
+
+    Returns a tuple (layers, hasse, dominance), where:
+    - 'layers' is a list of the non-dominated layers (lists of IDs), the
+      best one first,
+    - 'hasse' is a sorted list of (x, y) pairs with the transitive
+      reduction of P (plus both directions of every I), which can be
+      serialized using outranking_to_xmcda,
+    - 'dominance' maps every alternative to a tuple (number of the
+      alternatives it is preferred to, number of the alternatives preferred
+      to it).
+    """
+    groups = {}
+    for alt in alternatives:
+        point = (positive_flows[alt], negative_flows[alt])
+        groups.setdefault(point, []).append(alt)
+    points = sorted(groups, key=lambda point: (-point[0], point[1]))
+    negatives = sorted(set(point[1] for point in points))
+    rank = dict((value, r) for r, value in enumerate(negatives))
+    ranks = [rank[point[1]] for point in points]
+    sizes = [len(groups[point]) for point in points]
+    # layers and immediate dominators (covers); 'latest' keeps the index of
+    # the last visited point for every rank of phi-
+    depth = _MaxTree(len(negatives))
+    latest = _MaxTree(len(negatives))
+    point_layers = []
+    covers = []
+    for i, r in enumerate(ranks):
+        layer = depth.query(0, r) + 1
+        point_layers.append(layer)
+        depth.update(r, layer)
+        point_covers = []
+        low = 0
+        while low <= r:
+            q = latest.query(low, r)
+            if q < 0:
+                break
+            point_covers.append(q)
+            low = ranks[q] + 1
+        covers.append(point_covers)
+        latest.update(r, i)
+    # dominance counts: the alternatives preferred to the current point are
+    # the ones visited before it with phi- not higher than its own, and the
+    # ones it's preferred to - the ones visited after it with phi- not lower
+    dominated_by = []
+    counts = _FenwickTree(len(negatives))
+    for i, r in enumerate(ranks):
+        dominated_by.append(counts.prefix_sum(r))
+        counts.add(r, sizes[i])
+    dominates = [0] * len(points)
+    counts = _FenwickTree(len(negatives))
+    total = 0
+    for i in range(len(points) - 1, -1, -1):
+        r = ranks[i]
+        dominates[i] = total - counts.prefix_sum(r - 1)
+        counts.add(r, sizes[i])
+        total += sizes[i]
+    layers = [[] for _ in range(max(point_layers) + 1 if points else 0)]
+    hasse = []
+    dominance = {}
+    for i, point in enumerate(points):
+        members = groups[point]
+        layers[point_layers[i]].extend(members)
+        for x in members:
+            dominance[x] = (dominates[i], dominated_by[i])
+            hasse.extend((x, y) for y in members if y != x)
+        for q in covers[i]:
+            hasse.extend((y, x) for y in groups[points[q]] for x in members)
+    for layer in layers:
+        layer.sort()
+    hasse.sort()
+    return layers, hasse, dominance
+
+
+###############################################################################
+# PROMETHEE II ranking.                                                       #
+###############################################################################
+
+def get_ranking(flows, first_rank=1, last_rank=None):
+    """Ranks the alternatives by their net flows (the highest first), ties
+    being resolved by the alternatives' IDs, so the ranking is stable.
+
+    'flows' is either a dict or an iterable of (alternative, flow) tuples,
+    e.g. from iter_flat_flows, in which case it is consumed only once. When
+    'last_rank' is given, only the 'last_rank' best alternatives are kept
+    in a heap (partial selection) instead of sorting all of them. Returns a
+    list of (rank, alternative, flow) tuples for the ranks from
+    'first_rank' to 'last_rank' (inclusive).
+    """
+    if first_rank < 1 or (last_rank is not None and last_rank < first_rank):
+        raise InputDataError("Wrong rank range specified ({} - {})."
+                             .format(first_rank, last_rank))
+    if isinstance(flows, dict):
+        flows = flows.items()
+
+    def _key(item):
+        return -item[1], item[0]
+
+    if last_rank is None:
+        selected = sorted(flows, key=_key)
+    else:
+        selected = heapq.nsmallest(last_rank, flows, key=_key)
+    return [(rank, alt, flow) for rank, (alt, flow)
+            in enumerate(selected[first_rank - 1:], first_rank)]
+
+
+def iter_flat_flows(filename):
+    """Yields (alternative, flow) tuples from a flat file with one
+    alternative per line, i.e. its ID and flow separated by whitespace, a
+    comma or a semicolon. Blank lines and lines starting with '#' are
+    skipped. The file is read lazily, so it can be arbitrarily large.
+    """
+    try:
+        f = open(filename)
+    except IOError as e:
+        raise IOError("{}: '{}'".format(e.strerror, e.filename))
+    with f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = re.split(r'[\s,;]+', line)
+            try:
+                alt, flow = fields[0], float(fields[1])
+            except (IndexError, ValueError):
+                raise InputDataError("Wrong line {} in file '{}'."
+                                     .format(number, filename))
+            yield alt, flow
+
+
+def ranking_to_xmcda(ranking):
+    """Converts the output of get_ranking to alternativesValues with the
+    ranks as values.
+    """
+    xmcda = etree.Element('alternativesValues', mcdaConcept='Ranking')
+    for rank, alt, _ in ranking:
+        alt_value = etree.SubElement(xmcda, 'alternativeValue')
+        alt_id = etree.SubElement(alt_value, 'alternativeID')
+        alt_id.text = alt
+        value = etree.SubElement(alt_value, 'value')
+        integer = etree.SubElement(value, 'integer')
+        integer.text = str(rank)
+    return xmcda
+
+
+def write_flat_ranking(ranking, filename):
+    """Writes the output of get_ranking as tab-separated lines: rank,
+    alternative and flow.
+    """
+    try:
+        with open(filename, 'w') as f:
+            for rank, alt, flow in ranking:
+                f.write('{}\t{}\t{}\n'.format(rank, alt, repr(flow)))
+    except IOError as e:
+        raise IOError("{}: '{}'".format(e.strerror, e.filename))
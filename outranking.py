@@ -0,0 +1,901 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#The MIT License (MIT)
+#
+#Copyright (c) 2014 Tomasz Mieszkowski
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#############################################################################
+
+"""Crisp outranking relations (OutrankingBitset) and the batch computations
+of the concordance, discordance and credibility, with the cuts, distillation,
+cycles and kernel of the relations. common.py imports it only when an
+outranking relation is read or written.
+"""
+
+import time
+from bisect import bisect_right
+
+# networkx is imported only by the functions using it, as in common.py
+from common import InputDataError, Vividict, get_linear, omega
+
+
+###############################################################################
+# Outranking relation as a bitset.                                            #
+###############################################################################
+
+def _iter_bits(value):
+    """Yields the positions of the bits set in 'value', in ascending order."""
+    bits = bin(value)[:1:-1]  # reversed, i.e. the lowest bit goes first
+    j = bits.find('1')
+    while j != -1:
+        yield j
+        j = bits.find('1', j + 1)
+
+
+class OutrankingBitset(object):
+    """Crisp outranking relation stored as one int per row used as a packed
+    bit vector (bit j of row i is set when ids[i] outranks ids[j]), plus an
+    index of IDs. Unlike Vividict, reading from it never creates anything,
+    so 'outranking[x][y]' may be used safely (e.g. in get_relation_type).
+    Otherwise it reads like the nested dicts of _get_outranking_crisp: its
+    keys are the alternatives which outrank anything, and the keys of
+    'outranking[x]' are the ones outranked by x (with True values).
+    """
+
+    def __init__(self, ids=()):
+        self.ids = []
+        self.index = {}
+        self.rows = []
+        for x in ids:
+            self._get_index(x)
+
+    def _get_index(self, x):
+        i = self.index.get(x)
+        if i is None:
+            i = self.index[x] = len(self.ids)
+            self.ids.append(x)
+            self.rows.append(0)
+        return i
+
+    def add(self, x, y):
+        j = self._get_index(y)
+        self.rows[self._get_index(x)] |= 1 << j
+
+    def discard(self, x, y):
+        i, j = self.index.get(x), self.index.get(y)
+        if i is not None and j is not None:
+            self.rows[i] &= ~(1 << j)
+
+    def copy(self):
+        other = OutrankingBitset()
+        other.ids = list(self.ids)
+        other.index = dict(self.index)
+        other.rows = list(self.rows)
+        return other
+
+    def outranks(self, x, y):
+        i, j = self.index.get(x), self.index.get(y)
+        if i is None or j is None:
+            return False
+        return bool(self.rows[i] >> j & 1)
+
+    def __getitem__(self, x):
+        return _OutrankingRow(self, x)
+
+    def __iter__(self):
+        return (x for x, row in zip(self.ids, self.rows) if row)
+
+    def __contains__(self, x):
+        i = self.index.get(x)
+        return i is not None and self.rows[i] != 0
+
+    def __len__(self):
+        return sum(1 for row in self.rows if row)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(x, _OutrankingRow(self, x)) for x in self]
+
+    def get_pairs_count(self):
+        return sum(bin(row).count('1') for row in self.rows)
+
+    def successors(self, x):
+        i = self.index.get(x)
+        if i is None:
+            return []
+        return [self.ids[j] for j in _iter_bits(self.rows[i])]
+
+    def get_columns(self):
+        """Returns the transposed rows (bit i of column j is set when ids[i]
+        outranks ids[j]).
+        """
+        columns = [0] * len(self.ids)
+        for i, row in enumerate(self.rows):
+            bit = 1 << i
+            for j in _iter_bits(row):
+                columns[j] |= bit
+        return columns
+
+    def iter_pairs(self, sort=True):
+        """Yields the (x, y) pairs of the relation, iterating over the set
+        bits only. With 'sort', the pairs are ordered by their IDs.
+        """
+        ids = self.ids
+        if not sort:
+            for i, row in enumerate(self.rows):
+                for j in _iter_bits(row):
+                    yield ids[i], ids[j]
+            return
+        order = sorted(range(len(ids)), key=lambda i: ids[i])
+        in_order = order == list(range(len(ids)))
+        for i in order:
+            successors = [ids[j] for j in _iter_bits(self.rows[i])]
+            if not in_order:
+                successors.sort()
+            for y in successors:
+                yield ids[i], y
+
+
+class _OutrankingRow(object):
+    """Read-only view of the alternatives outranked by x, behaving like a
+    dict with True values (except that a missing key reads as False).
+    """
+
+    def __init__(self, outranking, x):
+        self.outranking = outranking
+        self.x = x
+
+    def __getitem__(self, y):
+        return self.outranking.outranks(self.x, y)
+
+    def __contains__(self, y):
+        return self.outranking.outranks(self.x, y)
+
+    def __iter__(self):
+        return iter(self.outranking.successors(self.x))
+
+    def __len__(self):
+        return len(self.outranking.successors(self.x))
+
+    def get(self, y, default=None):
+        return True if self.outranking.outranks(self.x, y) else default
+
+    def keys(self):
+        return self.outranking.successors(self.x)
+
+    def values(self):
+        return [True] * len(self)
+
+    def items(self):
+        return [(y, True) for y in self.outranking.successors(self.x)]
+
+
+# codes used in the matrices returned by get_relation_types; 0 stands for
+# the inverse preference (i.e. when get_relation_type returns None)
+RELATION_CODES = {
+    None: 0,
+    'preference': 1,
+    'indifference': 2,
+    'incomparability': 3,
+}
+
+
+def get_relation_types(outranking):
+    """Vectorized counterpart of get_relation_type for OutrankingBitset.
+    Returns a list of bytearrays, where codes[i][j] is the code (see:
+    RELATION_CODES) of the relation between outranking.ids[i] and
+    outranking.ids[j].
+    """
+    n = len(outranking.ids)
+    codes_table = {
+        ('1', '1'): RELATION_CODES['indifference'],
+        ('1', '0'): RELATION_CODES['preference'],
+        ('0', '0'): RELATION_CODES['incomparability'],
+        ('0', '1'): RELATION_CODES[None],
+    }
+    lookup = codes_table.__getitem__
+    codes = []
+    for row, column in zip(outranking.rows, outranking.get_columns()):
+        # binary strings, reversed and padded, so the j-th char is the bit j
+        row_bits = bin(row)[:1:-1].ljust(n, '0')
+        column_bits = bin(column)[:1:-1].ljust(n, '0')
+        codes.append(bytearray(map(lookup, zip(row_bits, column_bits))))
+    return codes
+
+
+###############################################################################
+# Concordance, discordance and credibility (batch computations).             #
+###############################################################################
+
+def get_partial_concordance(pref_directions, thresholds, criterion, x, y):
+    """Calculates the partial concordance index c_j(x, y), i.e. to which
+    extent criterion j supports the assertion 'x outranks y'.
+    """
+    diff = omega(pref_directions, criterion, x, y)
+    crit_thresholds = thresholds.get(criterion, {})
+    q = get_linear(pref_directions, criterion, x, y,
+                   crit_thresholds.get('indifference', 0.0))
+    p = get_linear(pref_directions, criterion, x, y,
+                   crit_thresholds.get('preference', q))
+    if diff >= -q:
+        return 1.0
+    elif diff < -p:
+        return 0.0
+    else:
+        return (p + diff) / float(p - q)
+
+
+def get_partial_discordance(pref_directions, thresholds, criterion, x, y,
+                            use_pre_veto=False):
+    """Calculates the partial discordance index d_j(x, y). With
+    'use_pre_veto', the 'pre_veto' threshold (when defined) replaces the
+    'preference' one as the point where the discordance starts to grow.
+    Criteria without the 'veto' threshold are never discordant.
+    """
+    crit_thresholds = thresholds.get(criterion, {})
+    if 'veto' not in crit_thresholds:
+        return 0.0
+    diff = omega(pref_directions, criterion, x, y)
+    v = get_linear(pref_directions, criterion, x, y, crit_thresholds['veto'])
+    if use_pre_veto and 'pre_veto' in crit_thresholds:
+        p = crit_thresholds['pre_veto']
+    else:
+        p = crit_thresholds.get('preference',
+                                crit_thresholds.get('indifference', 0.0))
+    p = get_linear(pref_directions, criterion, x, y, p)
+    if diff > -p:
+        return 0.0
+    elif diff <= -v:
+        return 1.0
+    else:
+        return (-diff - p) / float(v - p)
+
+
+def _is_crossed(pref_directions, thresholds, criterion, x, y, threshold):
+    """Checks if x is better than y on the given criterion by more than the
+    given threshold (e.g. 'reinforced_preference' or 'counter_veto').
+    """
+    crit_thresholds = thresholds.get(criterion, {})
+    if threshold not in crit_thresholds:
+        return False
+    value = get_linear(pref_directions, criterion, x, y,
+                       crit_thresholds[threshold])
+    return omega(pref_directions, criterion, x, y) > value
+
+
+def iter_outranking_blocks(rows, columns, performances, criteria, weights,
+                           pref_directions, thresholds,
+                           reinforcement_factors=None, use_pre_veto=False,
+                           use_partials=False, only_max_discordance=False,
+                           with_counter_veto=False, chunk_size=256):
+    """Computes concordance, discordance and credibility of 'rows' vs
+    'columns' (alternatives or profiles, all of them present in
+    'performances') in passes of 'chunk_size' rows, so the memory used at
+    once stays bounded.
+
+    Yields (start, concordance, discordance, credibility) tuples of dense
+    blocks, where e.g. concordance[r][c] is the value for
+    (rows[start + r], columns[c]). Discordance values are lists (in the
+    order of 'criteria') when 'use_partials' is set, otherwise they're the
+    maximum of the partial ones.
+
+    Concordance uses 'reinforcement_factors' for the criteria where the
+    'reinforced_preference' threshold is crossed. Credibility is calculated
+    in the ELECTRE III way - or as C * (1 - max(d_j)) with
+    'only_max_discordance'. With 'with_counter_veto', the discordance
+    factors are weakened by the share of criteria where the 'counter_veto'
+    threshold is crossed in favour of the row.
+    """
+    reinforcement_factors = reinforcement_factors or {}
+    n_criteria = float(len(criteria))
+    for start in range(0, len(rows), chunk_size):
+        concordance, discordance, credibility = [], [], []
+        for x in rows[start:start + chunk_size]:
+            perf_x = performances[x]
+            c_row, d_row, s_row = [], [], []
+            for y in columns:
+                perf_y = performances[y]
+                numerator = denominator = 0.0
+                partial_discordances = []
+                counter_vetoes = 0
+                for c in criteria:
+                    gx, gy = perf_x[c], perf_y[c]
+                    w = weights[c]
+                    if (c in reinforcement_factors and
+                            _is_crossed(pref_directions, thresholds, c, gx,
+                                        gy, 'reinforced_preference')):
+                        w *= reinforcement_factors[c]
+                        numerator += w
+                    else:
+                        numerator += w * get_partial_concordance(
+                            pref_directions, thresholds, c, gx, gy)
+                    denominator += w
+                    partial_discordances.append(get_partial_discordance(
+                        pref_directions, thresholds, c, gx, gy,
+                        use_pre_veto))
+                    if with_counter_veto and _is_crossed(
+                            pref_directions, thresholds, c, gx, gy,
+                            'counter_veto'):
+                        counter_vetoes += 1
+                conc = numerator / denominator
+                if only_max_discordance:
+                    cred = conc * (1.0 - max(partial_discordances))
+                else:
+                    cred = conc
+                    exponent = 1.0 - counter_vetoes / n_criteria
+                    for d in partial_discordances:
+                        if d > conc:
+                            cred *= ((1.0 - d) / (1.0 - conc)) ** exponent
+                c_row.append(conc)
+                if use_partials:
+                    d_row.append(partial_discordances)
+                else:
+                    d_row.append(max(partial_discordances))
+                s_row.append(cred)
+            concordance.append(c_row)
+            discordance.append(d_row)
+            credibility.append(s_row)
+        yield start, concordance, discordance, credibility
+
+
+def get_outranking_matrices(alternatives, performances, criteria, weights,
+                            pref_directions, thresholds, profiles=None,
+                            **kwargs):
+    """Runs iter_outranking_blocks for alternatives vs alternatives or, when
+    'profiles' are given, for alternatives vs profiles and profiles vs
+    alternatives. Returns a dict with the keys 'concordance', 'discordance'
+    and 'credibility'; each value is a list of dense matrices (one for every
+    direction of comparisons). Keyword arguments are passed to
+    iter_outranking_blocks.
+    """
+    if profiles:
+        directions = [(alternatives, profiles), (profiles, alternatives)]
+    else:
+        directions = [(alternatives, alternatives)]
+    matrices = {'concordance': [], 'discordance': [], 'credibility': []}
+    for rows, columns in directions:
+        c_matrix, d_matrix, s_matrix = [], [], []
+        for _, c, d, s in iter_outranking_blocks(
+                rows, columns, performances, criteria, weights,
+                pref_directions, thresholds, **kwargs):
+            c_matrix.extend(c)
+            d_matrix.extend(d)
+            s_matrix.extend(s)
+        matrices['concordance'].append(c_matrix)
+        matrices['discordance'].append(d_matrix)
+        matrices['credibility'].append(s_matrix)
+    return matrices
+
+
+def iter_partial_concordance_blocks(rows, columns, performances, criteria,
+                                    pref_directions, thresholds,
+                                    chunk_size=256):
+    """Yields (start, block) tuples, where block[r][c][k] is the partial
+    concordance c_k(rows[start + r], columns[c]) for criteria[k].
+    """
+    for start in range(0, len(rows), chunk_size):
+        block = []
+        for x in rows[start:start + chunk_size]:
+            perf_x = performances[x]
+            block.append([[get_partial_concordance(pref_directions,
+                                                   thresholds, c, perf_x[c],
+                                                   performances[y][c])
+                           for c in criteria] for y in columns])
+        yield start, block
+
+
+def get_partial_concordances(rows, columns, performances, criteria,
+                             pref_directions, thresholds):
+    """Dense counterpart of iter_partial_concordance_blocks."""
+    partials = []
+    for _, block in iter_partial_concordance_blocks(
+            rows, columns, performances, criteria, pref_directions,
+            thresholds):
+        partials.extend(block)
+    return partials
+
+
+def iter_concordance_with_interactions(partials, criteria, weights,
+                                       interactions, reverse_partials=None,
+                                       z_function='multiplication',
+                                       with_denominator=True,
+                                       chunk_size=256):
+    """Calculates the concordance index with criteria interactions (i.e.
+    mutual strengthening, mutual weakening and antagonistic effects, as
+    returned by _get_criteria_interactions) for all the pairs at once, in
+    blocks of 'chunk_size' rows. Yields (start, block) tuples.
+
+    'partials[r][c][k]' holds the partial concordance of the pair (r, c) on
+    criteria[k], 'reverse_partials[c][r][k]' the one for the pair (c, r) -
+    it is needed for the antagonistic effects only and defaults to
+    'partials' (i.e. alternatives vs alternatives). 'z_function' is either
+    'multiplication' or 'minimum'. Without 'with_denominator' the index is
+    normalized by the sum of weights instead of K(a, b).
+    """
+    if z_function == 'multiplication':
+        z = lambda x, y: x * y
+    elif z_function == 'minimum':
+        z = min
+    else:
+        raise InputDataError("Wrong value of 'z_function' ('{}'), it should "
+                             "be 'multiplication' or 'minimum'."
+                             .format(z_function))
+    if reverse_partials is None:
+        reverse_partials = partials
+    index = dict((c, k) for k, c in enumerate(criteria))
+    w = [weights[c] for c in criteria]
+    sum_w = float(sum(w))
+    # (i, j, coefficient) tuples - weakening coefficients are negative
+    mutual = [(index[c1], index[c2], value)
+              for kind in ('strengthening', 'weakening')
+              for c1, c2, value in interactions.get(kind, [])]
+    antagonistic = [(index[c1], index[c2], value)
+                    for c1, c2, value in interactions.get('antagonistic', [])]
+    for start in range(0, len(partials), chunk_size):
+        block = []
+        for r in range(start, min(start + chunk_size, len(partials))):
+            row = []
+            for c, cs in enumerate(partials[r]):
+                numerator = sum(wk * ck for wk, ck in zip(w, cs))
+                denominator = sum_w
+                for i, j, value in mutual:
+                    effect = value * z(cs[i], cs[j])
+                    numerator += effect
+                    denominator += effect
+                if antagonistic:
+                    reverse = reverse_partials[c][r]
+                    for i, h, value in antagonistic:
+                        effect = value * z(cs[i], reverse[h])
+                        numerator -= effect
+                        denominator -= effect
+                if with_denominator:
+                    row.append(numerator / denominator)
+                else:
+                    row.append(numerator / sum_w)
+            block.append(row)
+        yield start, block
+
+
+def get_concordance_with_interactions(partials, criteria, weights,
+                                      interactions, **kwargs):
+    """Dense counterpart of iter_concordance_with_interactions."""
+    concordance = []
+    for _, block in iter_concordance_with_interactions(
+            partials, criteria, weights, interactions, **kwargs):
+        concordance.extend(block)
+    return concordance
+
+
+def matrix_to_comparisons(rows, columns, matrix, comparisons=None,
+                          criteria=None):
+    """Converts a dense matrix (e.g. from get_outranking_matrices) into
+    nested dicts accepted by comparisons_to_xmcda. Lists of partial values
+    are converted into dicts keyed by 'criteria'.
+    """
+    if comparisons is None:
+        comparisons = Vividict()
+    for x, values in zip(rows, matrix):
+        for y, value in zip(columns, values):
+            if type(value) is list:
+                value = dict(zip(criteria, value))
+            comparisons[x][y] = value
+    return comparisons
+
+
+###############################################################################
+# Crisp outranking relations (cuts, distillation, cycles).                   #
+###############################################################################
+
+def get_outranking_cuts(credibility, cut_thresholds, rows=None, columns=None):
+    """Produces crisp outranking relations (x outranks y when the credibility
+    of (x, y) is at least the cut threshold) for many cut thresholds at
+    once: the credibility values are sorted only once, and every relation
+    is derived from the previous (stricter) one by adding the pairs between
+    the two thresholds, so the relations are nested.
+
+    'credibility' is either a dense matrix (a list of rows, then 'rows' and
+    'columns' are the IDs; 'columns' default to 'rows') or nested dicts, as
+    returned by _get_alternatives_comparisons. Returns a list of
+    (cut_threshold, OutrankingBitset) tuples in the order of
+    'cut_thresholds'.
+    """
+    for cut_threshold in cut_thresholds:
+        if not (0 <= float(cut_threshold) <= 1):
+            raise InputDataError("'cut_threshold' should be in range [0, 1] "
+                                 "(got '{}').".format(cut_threshold))
+    if isinstance(credibility, dict):
+        rows = sorted(credibility)
+        columns = sorted(set(y for x in rows for y in credibility[x]))
+        pairs = [(value, x, y) for x in rows
+                 for y, value in credibility[x].items()]
+    else:
+        columns = rows if columns is None else columns
+        pairs = [(value, x, y) for x, values in zip(rows, credibility)
+                 for y, value in zip(columns, values)]
+    pairs.sort(key=lambda pair: pair[0], reverse=True)
+    row_set = set(rows)
+    relation = OutrankingBitset(list(rows) + [y for y in columns
+                                              if y not in row_set])
+    index = relation.index
+    cuts = {}
+    position = 0
+    for cut_threshold in sorted(set(float(t) for t in cut_thresholds),
+                                reverse=True):
+        while position < len(pairs) and pairs[position][0] >= cut_threshold:
+            _, x, y = pairs[position]
+            relation.rows[index[x]] |= 1 << index[y]
+            position += 1
+        cuts[cut_threshold] = relation.copy()
+    return [(t, cuts[float(t)]) for t in cut_thresholds]
+
+
+def _get_credibility_matrix(credibility, ids):
+    if isinstance(credibility, dict):
+        return [[credibility[x][y] if y in credibility.get(x, {}) else 0.0
+                 for y in ids] for x in ids]
+    return credibility
+
+
+def get_distillation(credibility, ids, ascending=False, alpha=0.3,
+                     beta=-0.15):
+    """ELECTRE III descending (or ascending) distillation over a dense
+    credibility matrix (or nested dicts) of 'ids' vs 'ids'. The
+    discrimination threshold is s(lambda) = alpha + beta * lambda.
+
+    Subsets of alternatives and the rows/columns of the crisp relations are
+    kept as int bitsets, so the qualifications come from bit counts of
+    masked rows and columns. Between consecutive distillation steps the
+    cutting levels usually stay the same, so the qualifications are then
+    only corrected for the removed alternatives instead of being counted
+    again. Returns a list of classes (lists of IDs), the best one first.
+    """
+    n = len(ids)
+    matrix = _get_credibility_matrix(credibility, ids)
+
+    def _s(value):
+        return alpha + beta * value
+
+    # rows/columns sorted by credibility (descending), without the diagonal;
+    # the 'strict' ones keep only the pairs where the credibility exceeds the
+    # inverse one by more than the discrimination threshold
+    rows, keys, strict_rows = [], [], []
+    strict_columns = [[] for _ in range(n)]
+    for a in range(n):
+        row = sorted(((matrix[a][b], b) for b in range(n) if b != a),
+                     reverse=True)
+        rows.append(row)
+        keys.append([-value for value, _ in row])
+        strict = [(value, b) for value, b in row
+                  if value > matrix[b][a] + _s(value)]
+        strict_rows.append(strict)
+        for value, b in strict:
+            strict_columns[b].append((value, a))
+    for column in strict_columns:
+        column.sort(reverse=True)
+
+    def _bits_above(pairs, level, subset):
+        bits = 0
+        for value, b in pairs:
+            if value <= level:
+                break
+            bits |= 1 << b
+        return bits & subset
+
+    def _max_credibility(subset, upper=None):
+        best = None
+        for a in _iter_bits(subset):
+            row = rows[a]
+            p = 0 if upper is None else bisect_right(keys[a], -upper)
+            for value, b in row[p:]:
+                if best is not None and value <= best:
+                    break
+                if subset >> b & 1:
+                    best = value
+                    break
+        return best
+
+    def _select(qualifications):
+        if ascending:
+            target = min(qualifications.values())
+        else:
+            target = max(qualifications.values())
+        selected = 0
+        for a, q in qualifications.items():
+            if q == target:
+                selected |= 1 << a
+        return selected
+
+    def _count(subset, level):
+        strength, weakness = {}, {}
+        for a in _iter_bits(subset):
+            strength[a] = bin(_bits_above(strict_rows[a], level,
+                                          subset)).count('1')
+            weakness[a] = bin(_bits_above(strict_columns[a], level,
+                                          subset)).count('1')
+        return strength, weakness
+
+    def _distill(subset, level):
+        # continues the distillation inside 'subset' (of size > 1)
+        while True:
+            next_level = _max_credibility(subset, level - _s(level)) or 0.0
+            strength, weakness = _count(subset, next_level)
+            selected = _select(dict((a, strength[a] - weakness[a])
+                                    for a in strength))
+            if bin(selected).count('1') == 1 or next_level == 0.0:
+                return selected
+            subset, level = selected, next_level
+
+    # the first step of every distillation works on all the remaining
+    # alternatives; since 'remaining' only shrinks, the positions of the
+    # first valid entries in every row only move forward
+    first, below = [0] * n, [0] * n
+    bound = None
+    cached_level, strength, weakness = None, None, None
+    remaining = (1 << n) - 1
+    classes = []
+    while remaining:
+        level = None
+        for a in _iter_bits(remaining):
+            row, p = rows[a], first[a]
+            while p < len(row) and not remaining >> row[p][1] & 1:
+                p += 1
+            first[a] = p
+            if p < len(row) and (level is None or row[p][0] > level):
+                level = row[p][0]
+        if level is None:  # a single alternative left
+            selected = remaining
+        else:
+            if bound is not None and level - _s(level) > bound:
+                below = [0] * n
+            bound = level - _s(level)
+            next_level = None
+            for a in _iter_bits(remaining):
+                row, p = rows[a], below[a]
+                while p < len(row) and (row[p][0] >= bound or
+                                        not remaining >> row[p][1] & 1):
+                    p += 1
+                below[a] = p
+                if p < len(row) and (next_level is None or
+                                     row[p][0] > next_level):
+                    next_level = row[p][0]
+            next_level = next_level or 0.0
+            if next_level != cached_level:
+                cached_level = next_level
+                strength, weakness = _count(remaining, next_level)
+            selected = _select(dict((a, strength[a] - weakness[a])
+                                    for a in strength))
+            if bin(selected).count('1') > 1 and next_level != 0.0:
+                selected = _distill(selected, next_level)
+        classes.append([ids[a] for a in _iter_bits(selected)])
+        remaining &= ~selected
+        if cached_level is not None:
+            for x in _iter_bits(selected):
+                del strength[x], weakness[x]
+                for a in _iter_bits(_bits_above(strict_columns[x],
+                                                cached_level, remaining)):
+                    strength[a] -= 1
+                for b in _iter_bits(_bits_above(strict_rows[x],
+                                                cached_level, remaining)):
+                    weakness[b] -= 1
+    if ascending:
+        classes.reverse()
+    return classes
+
+
+def get_intersection_distillation(credibility, ids, alpha=0.3, beta=-0.15):
+    """Runs both distillations and returns a tuple (descending, ascending,
+    intersection), where the first two are lists of classes (the best one
+    first) and 'intersection' is an OutrankingBitset, in which x outranks y
+    when x is ranked at least as well as y in both preorders. It can be
+    serialized using outranking_to_xmcda with mcda_concept set to
+    'Intersection of upwards and downwards distillation'.
+    """
+    descending = get_distillation(credibility, ids, False, alpha, beta)
+    ascending = get_distillation(credibility, ids, True, alpha, beta)
+    intersection = OutrankingBitset(ids)
+    index = intersection.index
+    ranks = {}
+    # not_better[k][r]: bits of the alternatives ranked r or worse in the
+    # k-th preorder
+    not_better = []
+    for k, preorder in enumerate((descending, ascending)):
+        masks = [0] * (len(preorder) + 1)
+        for rank in range(len(preorder) - 1, -1, -1):
+            mask = masks[rank + 1]
+            for x in preorder[rank]:
+                mask |= 1 << index[x]
+                ranks.setdefault(x, [0, 0])[k] = rank
+            masks[rank] = mask
+        not_better.append(masks)
+    for x in ids:
+        i = index[x]
+        rank_d, rank_a = ranks[x]
+        intersection.rows[i] = (not_better[0][rank_d] &
+                                not_better[1][rank_a] & ~(1 << i))
+    return descending, ascending, intersection
+
+
+def _get_outranking_graph(outranking):
+    """Converts a crisp outranking relation (OutrankingBitset or nested
+    dicts) to networkx.DiGraph, skipping the loops.
+    """
+    import networkx as nx
+    graph = nx.DiGraph()
+    if isinstance(outranking, OutrankingBitset):
+        graph.add_nodes_from(outranking.ids)
+        pairs = outranking.iter_pairs(sort=False)
+    else:
+        graph.add_nodes_from(outranking)
+        pairs = ((x, y) for x in outranking
+                 for y, value in outranking[x].items() if value)
+    graph.add_edges_from((x, y) for x, y in pairs if x != y)
+    return graph
+
+
+def _get_arc_credibility(credibility, index):
+    if isinstance(credibility, dict):
+        return lambda x, y: credibility.get(x, {}).get(y, 0.0)
+    return lambda x, y: credibility[index[x]][index[y]]
+
+
+def _get_merge_levels(arcs, count):
+    """For every arc (t, x, y), where 't' is the index of its level (out of
+    'count' levels, the first one being the strictest), finds the first
+    level at which x and y become strongly connected by the arcs from this
+    and all the stricter levels ('count' if never). Offline divide and
+    conquer over the levels: every arc takes part in one strongly connected
+    components search per halving, and the components already found are
+    contracted using union-find.
+    """
+    import networkx as nx
+    parent = {}
+
+    def _find(x):
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while x != root:
+            parent[x], x = root, parent.get(x, x)
+        return root
+
+    merged = [count] * len(arcs)
+
+    def _solve(low, high, selected):
+        if not selected:
+            return
+        if low == high:
+            for k in selected:
+                merged[k] = low
+                if low < count:
+                    _, x, y = arcs[k]
+                    x, y = _find(x), _find(y)
+                    if x != y:
+                        parent[x] = y
+            return
+        middle = (low + high) // 2
+        graph = nx.DiGraph()
+        for k in selected:
+            t, x, y = arcs[k]
+            if t <= middle:
+                graph.add_edge(_find(x), _find(y))
+        component = {}
+        for number, members in enumerate(
+                nx.strongly_connected_components(graph)):
+            for x in members:
+                component[x] = number
+        left, right = [], []
+        for k in selected:
+            _, x, y = arcs[k]
+            if component.get(_find(x), -1) == component.get(_find(y), -2):
+                left.append(k)
+            else:
+                right.append(k)
+        _solve(low, middle, left)
+        _solve(middle + 1, high, right)
+
+    _solve(0, count, list(range(len(arcs))))
+    return merged
+
+
+def eliminate_cycles(outranking, method='aggregate', credibility=None):
+    """Removes the cycles from a crisp outranking relation. The strongly
+    connected components are found in linear time (Tarjan's algorithm from
+    networkx), then:
+
+    - 'aggregate' replaces every component with a single node, named after
+      its members (e.g. 'a01, a03'),
+    - 'cut_weakest' removes the arcs with the lowest credibility from every
+      component until it splits, then continues with its cyclic parts.
+      This is done without repeated cycle searches: an arc gets cut exactly
+      when its ends are strongly connected by the arcs at least as credible
+      as itself, which is found for all the arcs at once by
+      _get_merge_levels.
+
+    For 'cut_weakest', 'credibility' is required - either nested dicts or a
+    dense matrix indexed like 'outranking.ids'. Returns a tuple
+    (OutrankingBitset, timings), where 'timings' holds the duration (in
+    seconds) of every phase.
+    """
+    if method not in ('aggregate', 'cut_weakest'):
+        raise InputDataError("Unknown cycle elimination method '{}'."
+                             .format(method))
+    if method == 'cut_weakest' and credibility is None:
+        raise InputDataError("'cut_weakest' option requires credibility as "
+                             "an additional input (apart from outranking).")
+    import networkx as nx
+    timings = {}
+    start = time.time()
+    graph = _get_outranking_graph(outranking)
+    timings['graph'] = time.time() - start
+    start = time.time()
+    components = [component
+                  for component in nx.strongly_connected_components(graph)
+                  if len(component) > 1]
+    timings['components'] = time.time() - start
+    start = time.time()
+    if method == 'aggregate':
+        names = {}
+        for component in components:
+            name = ', '.join(sorted(component))
+            for x in component:
+                names[x] = name
+        result = OutrankingBitset(names.get(x, x) for x in graph)
+        for x, y in graph.edges():
+            x, y = names.get(x, x), names.get(y, y)
+            if x != y:
+                result.add(x, y)
+        timings['aggregation'] = time.time() - start
+    else:
+        index = getattr(outranking, 'index', None)
+        get_value = _get_arc_credibility(credibility, index)
+        arcs = [(get_value(x, y), x, y) for component in components
+                for x, y in graph.subgraph(component).edges()]
+        levels = sorted(set(value for value, _, _ in arcs), reverse=True)
+        position = dict((value, t) for t, value in enumerate(levels))
+        arcs = [(position[value], x, y) for value, x, y in arcs]
+        merged = _get_merge_levels(arcs, len(levels))
+        graph.remove_edges_from((x, y) for (t, x, y), m in zip(arcs, merged)
+                                if m <= t)
+        result = OutrankingBitset(graph)
+        for x, y in graph.edges():
+            result.add(x, y)
+        timings['cutting'] = time.time() - start
+    return result, timings
+
+
+def get_kernel(outranking):
+    """Returns the kernel (sorted list of IDs) of an acyclic crisp outranking
+    relation, i.e. the set of alternatives which do not outrank each other
+    and which together outrank every other alternative. It is computed in a
+    single pass in topological order.
+    """
+    import networkx as nx
+    graph = _get_outranking_graph(outranking)
+    kernel = set()
+    try:
+        for x in nx.topological_sort(graph):
+            if not any(y in kernel for y in graph.predecessors(x)):
+                kernel.add(x)
+    except nx.NetworkXUnfeasible:
+        raise InputDataError("Outranking relation contains cycles - they "
+                             "should be eliminated first.")
+    return sorted(kernel)
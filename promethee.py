@@ -0,0 +1,163 @@
+"""In-process API of the sorting methods - the same functions the modules
+use, but with no files read or written and nothing printed:
+
+    >>> import promethee
+    >>> promethee.flowsort_ii({'a1': 0.3, 'a2': -0.4}, [-0.2, 0.2],
+    ...                       ['C1', 'C2', 'C3'])
+    {'a1': 'C3', 'a2': 'C1'}
+
+The flows of the alternatives are given either as dicts (alternative ->
+flow), and then the assignments are returned as a dict too, or as
+sequences (lists, arrays etc.), and then the assignments are returned as a
+list, in the same order. The flows of the profiles are sequences, from the
+lowest profile up, and the categories - a list, from the worst one up: with
+boundary profiles there's one more category than profiles, with central
+ones - one category per profile.
+
+The modules are imported on the first use (see
+PrometheeWorker.getMethodModule), all of them sharing this copy of common.py
+and PyXMCDA.py. It's not an installable package: the API is importable only
+with the root directory of the repository on sys.path (e.g. as the current
+directory), which isn't changed by the imports.
+"""
+
+from common import InputDataError
+from PrometheeWorker import getMethodModule
+
+
+# the keys of the profiles' flows, which can't be mistaken for the ones of
+# the alternatives
+_PROFILE = object()
+
+_assign_functions = {}
+
+
+def _get_assign_function(method):
+    if method not in _assign_functions:
+        _assign_functions[method] = getMethodModule(method).assignFlows
+    return _assign_functions[method]
+
+
+def _get_profiles_categories(profiles_count, categories, comparison_with):
+    """Returns the profiles and their categories in the form used by the
+    modules (see common._get_profiles_categories).
+    """
+    if comparison_with == 'boundary_profiles':
+        categories_count = profiles_count + 1
+    elif comparison_with == 'central_profiles':
+        categories_count = profiles_count
+    else:
+        raise InputDataError("Wrong comparison type ('{}') specified."
+                             .format(comparison_with))
+    if len(categories) != categories_count:
+        raise InputDataError("There should be {} categories for {} {}."
+                             .format(categories_count, profiles_count,
+                                     comparison_with.replace('_', ' ')))
+    profiles_categories = {}
+    for rank in range(1, profiles_count + 1):
+        if comparison_with == 'boundary_profiles':
+            classes = {'lower': categories[rank - 1],
+                       'upper': categories[rank]}
+        else:
+            classes = categories[rank - 1]
+        profiles_categories[rank] = {'id': (_PROFILE, rank),
+                                     'classes': classes}
+    return profiles_categories
+
+
+def _get_alternatives(flows):
+    if isinstance(flows, dict):
+        return list(flows)
+    return list(range(len(flows)))
+
+
+def _merge_flows(alternatives, flows, profiles_flows):
+    """Returns the flows of the alternatives and the profiles in one dict."""
+    if isinstance(flows, dict):
+        merged = dict(flows)
+    else:
+        merged = dict(zip(alternatives, flows))
+    for rank, flow in enumerate(profiles_flows, 1):
+        merged[(_PROFILE, rank)] = flow
+    return merged
+
+
+def _check_flows(positive_flows, negative_flows):
+    if isinstance(positive_flows, dict):
+        same = (isinstance(negative_flows, dict) and
+                set(positive_flows) == set(negative_flows))
+    else:
+        same = (not isinstance(negative_flows, dict) and
+                len(positive_flows) == len(negative_flows))
+    if not same:
+        raise InputDataError("The positive and negative flows should be "
+                             "given for the same alternatives.")
+
+
+def _get_result(flows, alternatives, assignments):
+    if isinstance(flows, dict):
+        return assignments
+    return [assignments[alt] for alt in alternatives]
+
+
+def flowsort_ii(flows, profiles_flows, categories,
+                comparison_with='boundary_profiles'):
+    """FlowSort with the net flows - assigns every alternative to a single
+    category.
+    """
+    profiles_categories = _get_profiles_categories(
+        len(profiles_flows), categories, comparison_with)
+    alternatives = _get_alternatives(flows)
+    assign = _get_assign_function('FlowSortPrometheeIISorting')
+    assignments = assign(comparison_with, alternatives, profiles_categories,
+                         _merge_flows(alternatives, flows, profiles_flows))
+    return _get_result(flows, alternatives, assignments)
+
+
+def flowsort_i(positive_flows, negative_flows, profiles_positive_flows,
+               profiles_negative_flows, categories,
+               comparison_with='boundary_profiles'):
+    """FlowSort with the positive and negative flows - assigns every
+    alternative to a (lower, upper) interval of categories.
+    """
+    _check_flows(positive_flows, negative_flows)
+    profiles_categories = _get_profiles_categories(
+        len(profiles_positive_flows), categories, comparison_with)
+    alternatives = _get_alternatives(positive_flows)
+    assign = _get_assign_function('FlowSortPrometheISorting')
+    assignments = assign(
+        comparison_with, alternatives, profiles_categories, None,
+        _merge_flows(alternatives, positive_flows, profiles_positive_flows),
+        _merge_flows(alternatives, negative_flows, profiles_negative_flows))
+    return _get_result(positive_flows, alternatives, assignments)
+
+
+def promethee_tri(flows, profiles_flows, categories):
+    """PROMETHEE Tri - assigns every alternative to the category of the
+    nearest (central) profile.
+    """
+    profiles_categories = _get_profiles_categories(
+        len(profiles_flows), categories, 'central_profiles')
+    alternatives = _get_alternatives(flows)
+    assign = _get_assign_function('PrometheeTriSorting')
+    assignments = assign(alternatives, profiles_categories,
+                         _merge_flows(alternatives, flows, profiles_flows))
+    return _get_result(flows, alternatives, assignments)
+
+
+def promsort(positive_flows, negative_flows, profiles_positive_flows,
+             profiles_negative_flows, categories, cut_point):
+    """PROMSORT (with boundary profiles) - assigns every alternative to a
+    single category, the ones left between two categories by the first step
+    according to 'cut_point'.
+    """
+    _check_flows(positive_flows, negative_flows)
+    profiles_categories = _get_profiles_categories(
+        len(profiles_positive_flows), categories, 'boundary_profiles')
+    alternatives = _get_alternatives(positive_flows)
+    assign = _get_assign_function('Promsort')
+    assignments = assign(
+        alternatives, profiles_categories, cut_point, None,
+        _merge_flows(alternatives, positive_flows, profiles_positive_flows),
+        _merge_flows(alternatives, negative_flows, profiles_negative_flows))
+    return _get_result(positive_flows, alternatives, assignments)
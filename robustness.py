@@ -0,0 +1,656 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#The MIT License (MIT)
+#
+#Copyright (c) 2014 Tomasz Mieszkowski
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#############################################################################
+
+"""The assignment margins, fitting the parameters to reference assignments,
+the robustness analyses (Monte Carlo) of the weights and the flows, and the
+disagreements of the scenarios. Imported by the modules only when these are asked for.
+"""
+
+import os
+import random
+from bisect import bisect_left, bisect_right
+from functools import partial
+
+# multiprocessing is imported only by the function using it
+from common import (InputDataError, assignments_as_intervals_to_xmcda,
+                    assignments_to_xmcda, get_input_data)
+from flows import get_partial_preference
+from lxml import etree
+
+
+###############################################################################
+# Assignment margins.                                                         #
+###############################################################################
+
+def get_margin(value, thresholds):
+    """Returns the distance from 'value' to the nearest of 'thresholds'
+    (sorted), i.e. how much the flow would have to change to cross any of
+    them, or None if there are no thresholds.
+    """
+    if not thresholds:
+        return None
+    position = bisect_left(thresholds, value)
+    nearest = thresholds[max(position - 1, 0):position + 1]
+    return min(abs(value - threshold) for threshold in nearest)
+
+
+class MarginsIndex(object):
+    """Assignment margins of the alternatives (see get_margin), kept sorted
+    for range queries, e.g. 'all the alternatives within epsilon of any
+    boundary'. Alternatives without a margin (None) are not indexed.
+    """
+
+    def __init__(self, margins=None):
+        self.margins = dict(margins or {})
+        pairs = sorted((margin, alt) for alt, margin in self.margins.items()
+                       if margin is not None)
+        self.values = [margin for margin, _ in pairs]
+        self.alternatives = [alt for _, alt in pairs]
+
+    def __len__(self):
+        return len(self.values)
+
+    def get_range(self, low, high):
+        """Returns the alternatives with margins in [low, high]."""
+        first = bisect_left(self.values, low)
+        last = bisect_right(self.values, high)
+        return self.alternatives[first:last]
+
+    def get_within(self, epsilon):
+        """Returns the alternatives whose margins' absolute values are not
+        greater than 'epsilon'.
+        """
+        return self.get_range(-epsilon, epsilon)
+
+
+###############################################################################
+# Fitting the parameters to reference assignments.                            #
+###############################################################################
+
+def fit_thresholds(values, references, classes):
+    """Finds the thresholds t_1 <= ... <= t_(K-1) for K ordered 'classes'
+    (the worst one first), such that assigning x to the class number
+    #{i: values[x] >= t_i} reproduces as many of the 'references' (dict:
+    alternative -> class) as possible.
+
+    The reference alternatives are sorted by their values once, so every
+    candidate threshold is just a position between two distinct values and
+    the number of alternatives of a class between two positions is a
+    difference of prefix counts. Dynamic programming over the classes then
+    takes O(K * n). Returns a tuple (thresholds, errors).
+    """
+    if not references:
+        raise InputDataError("No reference assignments given.")
+    index = dict((category, k) for k, category in enumerate(classes))
+    for alt, category in references.items():
+        if category not in index:
+            raise InputDataError("Unknown category '{}' in the reference "
+                                 "assignment of '{}'.".format(category, alt))
+    alts = sorted(references, key=lambda alt: (values[alt], alt))
+    flows = [values[alt] for alt in alts]
+    ranks = [index[references[alt]] for alt in alts]
+    n = len(alts)
+    # classes may only change where the value changes
+    positions = [p for p in range(n + 1)
+                 if p in (0, n) or flows[p - 1] < flows[p]]
+
+    def _prefix(k):
+        counts, count = [0], 0
+        for rank in ranks:
+            count += rank == k
+            counts.append(count)
+        return [counts[p] for p in positions]
+
+    # score[c]: the max. number of correct assignments with classes 0..k
+    # covering the alternatives before positions[c]
+    score = _prefix(0)
+    back = []
+    for k in range(1, len(classes)):
+        prefix = _prefix(k)
+        new_score, choices = [], []
+        best, best_c = None, None
+        for c in range(len(positions)):
+            if best is None or score[c] - prefix[c] > best:
+                best, best_c = score[c] - prefix[c], c
+            new_score.append(prefix[c] + best)
+            choices.append(best_c)
+        score = new_score
+        back.append(choices)
+    cuts = []
+    c = len(positions) - 1
+    for choices in reversed(back):
+        c = choices[c]
+        cuts.append(positions[c])
+    cuts.reverse()
+    thresholds = []
+    for p in cuts:
+        if p == 0:
+            thresholds.append(flows[0])
+        elif p == n:
+            thresholds.append(flows[-1] + 1.0)
+        else:
+            threshold = (flows[p - 1] + flows[p]) / 2.0
+            if threshold <= flows[p - 1]:  # rounding
+                threshold = flows[p]
+            thresholds.append(threshold)
+    return thresholds, n - score[-1]
+
+
+def _run_fold(args):
+    fit, predict, train, test = args
+    parameters = fit(train)[0]
+    assignments = predict(parameters, sorted(test))
+    return sum(1 for alt in test if assignments[alt] != test[alt])
+
+
+def cross_validate(fit, predict, references, folds=5, processes=None,
+                   seed=None):
+    """K-fold cross-validation of a fitting procedure. 'fit' takes the
+    training references and returns a tuple (parameters, errors), like the
+    fitting functions in the modules, 'predict' takes the parameters and a
+    list of alternatives and returns their assignments. The folds are
+    evaluated in parallel (multiprocessing.Pool with 'processes' workers;
+    None means the number of CPUs, 1 - no parallelism), so both functions
+    should be picklable (defined at the module level, possibly wrapped with
+    functools.partial). Returns a list with the number of errors in every
+    fold.
+    """
+    if not 2 <= folds <= len(references):
+        raise InputDataError("The number of folds should be in range "
+                             "[2, {}].".format(len(references)))
+    alts = sorted(references)
+    random.Random(seed).shuffle(alts)
+    tasks = []
+    for k in range(folds):
+        test = set(alts[k::folds])
+        tasks.append((
+            fit,
+            predict,
+            dict((alt, references[alt]) for alt in alts if alt not in test),
+            dict((alt, references[alt]) for alt in test),
+        ))
+    return _parallel_map(_run_fold, tasks, processes)
+
+
+# the max. number of worker processes of _parallel_map (None - no limit)
+_max_processes = None
+
+
+def limit_processes(limit):
+    """Limits the number of worker processes used by the parallel
+    computations (cross-validation, robustness analysis) of this process.
+    The processes which are workers themselves (e.g. of PrometheeWorker.py
+    or of the service) set it to 1, so that they don't start pools of their
+    own. None removes the limit.
+    """
+    global _max_processes
+    _max_processes = limit
+
+
+def _parallel_map(function, tasks, processes=None):
+    """map() over a multiprocessing.Pool with 'processes' workers (None means
+    the number of CPUs, 1 - no parallelism at all), but with no more workers
+    than tasks, nor than allowed by limit_processes. With a single worker
+    the tasks are run in this process, so e.g. the robustness analysis with
+    no more samples than in a single batch never starts a pool.
+    """
+    tasks = list(tasks)
+    limits = [limit for limit in (processes, _max_processes, len(tasks))
+              if limit is not None]
+    if min(limits) <= 1:
+        return [function(task) for task in tasks]
+    import multiprocessing
+    if processes is None:
+        limits.append(multiprocessing.cpu_count())
+    pool = multiprocessing.Pool(min(limits))
+    try:
+        return pool.map(function, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+
+###############################################################################
+# Weights robustness (Monte Carlo).                                           #
+###############################################################################
+
+def get_criteria_flows(alternatives, performances, criteria, pref_directions,
+                       thresholds, profiles=None):
+    """Calculates the unicriterion positive and negative flows of
+    'alternatives' (and, optionally, of 'profiles') against all the
+    alternatives. The flows for any normalized weights are just weighted sums
+    of these, so the O(n^2 * m) part is done only once, no matter how many
+    weight vectors are tried. Returns a dict: criterion -> (positive_flows,
+    negative_flows), both keyed by alternatives and profiles IDs.
+    """
+    ids = list(alternatives) + list(profiles or [])
+    criteria_flows = {}
+    for c in criteria:
+        preference = partial(get_partial_preference, pref_directions,
+                             thresholds, c)
+        positive_flows, negative_flows = {}, {}
+        for x in ids:
+            perf_x = performances[x][c]
+            positive = negative = 0.0
+            count = 0
+            for y in alternatives:
+                if y == x:
+                    continue
+                perf_y = performances[y][c]
+                positive += preference(perf_x, perf_y)
+                negative += preference(perf_y, perf_x)
+                count += 1
+            positive_flows[x] = positive / count if count else 0.0
+            negative_flows[x] = negative / count if count else 0.0
+        criteria_flows[c] = (positive_flows, negative_flows)
+    return criteria_flows
+
+
+def sample_weights(criteria, rng, intervals=None, max_draws=10000):
+    """Draws a weight vector (a list ordered like 'criteria', summing up to
+    1) uniformly from the simplex, i.e. as normalized exponential variates.
+    'rng' is a random.Random instance.
+
+    With 'intervals' (dict: criterion -> (lower, upper), the bounds of the
+    normalized weights) the vector is drawn uniformly from the part of the
+    simplex within them: what's left of 1 after the lower bounds is split
+    among the criteria with non-degenerate intervals like above, and drawn
+    again whenever any of these weights exceeds its upper bound - at most
+    'max_draws' times, as the intervals can leave a tiny part of the
+    simplex.
+    """
+    if intervals is None:
+        weights = [rng.expovariate(1.0) for c in criteria]
+        total = float(sum(weights))
+        return [w / total for w in weights]
+    lower = [intervals[c][0] for c in criteria]
+    upper = [intervals[c][1] for c in criteria]
+    rest = max(1.0 - sum(lower), 0.0)
+    free = [k for k in range(len(criteria)) if upper[k] > lower[k]]
+    for _ in range(max_draws):
+        weights = list(lower)
+        draws = [rng.expovariate(1.0) for k in free]
+        total = float(sum(draws))
+        for k, draw in zip(free, draws):
+            weights[k] += rest * draw / total
+        if all(weights[k] <= upper[k] for k in free):
+            return weights
+    raise InputDataError("The weight intervals leave too small a part of "
+                         "the weights to draw from.")
+
+
+def _multiply(batch, columns):
+    """Multiplies 'batch' (weight vectors as rows) by 'columns' (the
+    unicriterion flows, one row per criterion) - a row at a time, so the
+    inner loop runs over the IDs for every criterion.
+    """
+    rows = []
+    for weights in batch:
+        row = [0.0] * len(columns[0])
+        for w, column in zip(weights, columns):
+            if w:
+                row = [r + w * v for r, v in zip(row, column)]
+        rows.append(row)
+    return rows
+
+
+def _count_assignments(counts, assignments):
+    for alt, category in assignments.items():
+        alt_counts = counts.setdefault(alt, {})
+        alt_counts[category] = alt_counts.get(category, 0) + 1
+
+
+def _run_weights_batch(args):
+    sort, ids, columns, criteria, intervals, size, seed = args
+    rng = random.Random(seed)
+    batch = [sample_weights(criteria, rng, intervals) for _ in range(size)]
+    positive_columns, negative_columns = columns
+    counts = {}
+    for positive, negative in zip(_multiply(batch, positive_columns),
+                                  _multiply(batch, negative_columns)):
+        positive_flows = dict(zip(ids, positive))
+        negative_flows = dict(zip(ids, negative))
+        flows = dict((x, p - n) for x, p, n in zip(ids, positive, negative))
+        _count_assignments(counts, sort(flows, positive_flows,
+                                        negative_flows))
+    return counts
+
+
+def _get_batches(samples, batch_size, seed):
+    """Splits 'samples' into batches of 'batch_size' and derives a seed for
+    each of them. Returns a list of (size, seed) tuples. The seeds come
+    from random() rather than randint(), which differs between python 2 and
+    3, so a given seed gives the same results with both of them.
+    """
+    rng = random.Random(seed)
+    return [(min(batch_size, samples - start), int(rng.random() * 2 ** 31))
+            for start in range(0, samples, batch_size)]
+
+
+def _get_frequencies(results, samples):
+    counts = {}
+    for batch_counts in results:
+        for alt, alt_counts in batch_counts.items():
+            total = counts.setdefault(alt, {})
+            for category, count in alt_counts.items():
+                total[category] = total.get(category, 0) + count
+    return dict((alt, dict((category, count / float(samples))
+                           for category, count in alt_counts.items()))
+                for alt, alt_counts in counts.items())
+
+
+def _normalize_intervals(intervals, criteria):
+    """Checks the weight intervals, which bound the normalized weights, so
+    the lower bounds can't sum up to more than 1, nor the upper ones to
+    less. Plain weights (all the intervals degenerate) are normalized
+    first.
+    """
+    for c in criteria:
+        lower, upper = intervals[c]
+        if not 0 <= lower <= upper:
+            raise InputDataError("Wrong weight interval for criterion "
+                                 "'{}'.".format(c))
+    total = float(sum(intervals[c][1] for c in criteria))
+    if total == 0:
+        raise InputDataError("At least one weight should be positive.")
+    if all(intervals[c][0] == intervals[c][1] for c in criteria):
+        return dict((c, (intervals[c][0] / total, intervals[c][1] / total))
+                    for c in criteria)
+    # with some slack for the rounding errors
+    if not (sum(intervals[c][0] for c in criteria) <= 1 + 1e-9 and
+            total >= 1 - 1e-9):
+        raise InputDataError("The weight intervals should bound the "
+                             "normalized weights (summing up to 1).")
+    return dict((c, intervals[c]) for c in criteria)
+
+
+def get_weights_acceptabilities(criteria_flows, criteria, sort, samples,
+                                intervals=None, batch_size=1000,
+                                processes=None, seed=None):
+    """Estimates the class acceptability indices, i.e. how often every
+    alternative gets every class, when the weights are uncertain. 'samples'
+    weight vectors are drawn (see: sample_weights) and the flows for each of
+    them are aggregated from 'criteria_flows' (see: get_criteria_flows).
+
+    'sort' takes the net, positive and negative flows (dicts keyed by
+    alternatives and profiles IDs) and returns the assignments - e.g. the
+    'assignFlows' function of the sorting modules wrapped with
+    functools.partial. The samples are split into batches of 'batch_size',
+    each with its own seed derived from 'seed', which are processed in
+    parallel (see: cross_validate for the meaning of 'processes' and for
+    why 'sort' should be picklable), so the results don't depend on the
+    number of processes. Returns a dict: alternative -> {class: frequency}.
+    """
+    if samples < 1 or batch_size < 1:
+        raise InputDataError("The number of samples and the batch size "
+                             "should be positive integers.")
+    if intervals is not None:
+        intervals = _normalize_intervals(intervals, criteria)
+    ids = sorted(criteria_flows[criteria[0]][0])
+    columns = tuple([[criteria_flows[c][k][x] for x in ids] for c in criteria]
+                    for k in (0, 1))
+    tasks = [(sort, ids, columns, criteria, intervals, size, batch_seed)
+             for size, batch_seed in _get_batches(samples, batch_size, seed)]
+    results = _parallel_map(_run_weights_batch, tasks, processes)
+    return _get_frequencies(results, samples)
+
+
+def sort_with_uncertain_weights(input_dir, comparison_with, alternatives,
+                                profiles, sort, samples, processes=None,
+                                seed=None):
+    """Runs get_weights_acceptabilities for a sorting module: the flows are
+    calculated from the performances of 'alternatives' and 'profiles' read
+    from 'input_dir', and the weights are drawn within the intervals given
+    in weights.xml or, without it, from the whole simplex.
+    """
+    filenames = [
+        ('criteria.xml', False),
+        ('method_parameters.xml', False),
+        ('performance_table.xml', False),
+        ('profiles_performance_table.xml', False),
+        ('weights.xml', True),
+    ]
+    params = ['criteria', 'pref_directions', 'thresholds', 'performances',
+              'profiles_performance_table']
+    with_intervals = os.path.isfile(os.path.join(input_dir, 'weights.xml'))
+    if with_intervals:
+        params.append('weights_intervals')
+    d = get_input_data(input_dir, filenames, params,
+                       comparison_with=comparison_with)
+
+    performances = dict(d.performances)
+    performances.update(d.profiles_performance_table)
+    for x in list(alternatives) + list(profiles):
+        if x not in performances:
+            raise InputDataError("Missing performances of '{}'.".format(x))
+    criteria_flows = get_criteria_flows(alternatives, performances,
+                                        d.criteria, d.pref_directions,
+                                        d.thresholds, profiles)
+    intervals = d.weights_intervals if with_intervals else None
+    return get_weights_acceptabilities(criteria_flows, d.criteria, sort,
+                                       samples, intervals,
+                                       processes=processes, seed=seed)
+
+
+###############################################################################
+# Flows robustness (Monte Carlo).                                             #
+###############################################################################
+
+def _perturb(flows, bands, rng):
+    perturbed = dict(flows)
+    for x, band in bands.items():
+        perturbed[x] += rng.uniform(-band, band)
+    return perturbed
+
+
+def _run_noise_batch(args):
+    sort, flows, positive_flows, negative_flows, bands, size, seed = args
+    rng = random.Random(seed)
+    counts = {}
+    for _ in range(size):
+        if positive_flows is None:
+            net, positive, negative = _perturb(flows, bands, rng), None, None
+        else:
+            positive = _perturb(positive_flows, bands, rng)
+            negative = _perturb(negative_flows, bands, rng)
+            net = dict((x, positive[x] - negative[x]) for x in positive)
+        _count_assignments(counts, sort(net, positive, negative))
+    return counts
+
+
+def _run_cuts_batch(args):
+    flows, bands, cuts, size, seed = args
+    thresholds, classes, inclusive = cuts
+    locate = bisect_right if inclusive else bisect_left
+    rng = random.Random(seed)
+    counts = {}
+    for x in sorted(bands):
+        flow, band = flows[x], bands[x]
+        positions = [0] * len(classes)
+        if band:
+            for _ in range(size):
+                sample = flow + rng.uniform(-band, band)
+                positions[locate(thresholds, sample)] += 1
+        else:
+            positions[locate(thresholds, flow)] = size
+        counts[x] = dict((classes[i], count)
+                         for i, count in enumerate(positions) if count)
+    return counts
+
+
+def get_noise_acceptabilities(alternatives, sort, samples, noise, flows=None,
+                              positive_flows=None, negative_flows=None,
+                              batch_size=1000, processes=None, seed=None,
+                              cuts=None):
+    """Estimates how likely every alternative gets every class when its
+    flows are only known within +/- 'noise' (a number or a dict keyed by
+    'alternatives', e.g. made of the errors from flows.get_approximate_flows).
+    Every sample moves the flows of 'alternatives' uniformly within their
+    bands, independently of each other - the net ones when only 'flows' are
+    given, the positive and negative ones (and the net ones derived from
+    them) otherwise. The profiles' flows are left intact.
+
+    'sort' is called like in get_weights_acceptabilities and the samples are
+    processed in the same way, so at most 'batch_size' of them are held by a
+    worker at a time. Every sample is sorted separately, as the class of an
+    alternative may depend on the flows of the other ones (e.g. in
+    Promsort), unless 'cuts' are given.
+
+    'cuts' is a (thresholds, classes, inclusive) tuple for the methods where
+    the class depends only on the net flow of the alternative and the
+    (fixed) flows of the profiles: the flows below thresholds[0] get
+    classes[0], the ones between thresholds[i - 1] and thresholds[i] get
+    classes[i] - with a flow equal to a threshold above it if 'inclusive'.
+    Then 'sort' isn't called at all: the samples of every alternative are
+    drawn and located among the thresholds with bisect, one alternative at
+    a time, without building the flows dicts. Returns a dict: alternative ->
+    {class: probability}.
+    """
+    if samples < 1 or batch_size < 1:
+        raise InputDataError("The number of samples and the batch size "
+                             "should be positive integers.")
+    if flows is None and (positive_flows is None or negative_flows is None):
+        raise InputDataError("Either net flows or both positive and "
+                             "negative flows should be given.")
+    if isinstance(noise, dict):
+        bands = dict((alt, float(noise[alt])) for alt in alternatives)
+    else:
+        bands = dict((alt, float(noise)) for alt in alternatives)
+    if any(band < 0 for band in bands.values()):
+        raise InputDataError("The flows noise should not be negative.")
+    if positive_flows is not None:
+        flows = None
+    batches = _get_batches(samples, batch_size, seed)
+    if cuts is not None and flows is not None:
+        tasks = [(flows, bands, cuts, size, batch_seed)
+                 for size, batch_seed in batches]
+        results = _parallel_map(_run_cuts_batch, tasks, processes)
+    else:
+        tasks = [(sort, flows, positive_flows, negative_flows, bands, size,
+                  batch_seed) for size, batch_seed in batches]
+        results = _parallel_map(_run_noise_batch, tasks, processes)
+    return _get_frequencies(results, samples)
+
+
+###############################################################################
+# Scenarios.                                                                  #
+###############################################################################
+
+def get_disagreements(scenarios):
+    """'scenarios' is a list of (name, assignments) tuples, all of them for
+    the same alternatives. Returns a dict: alternative -> the share of the
+    scenarios which don't agree with the most common assignment of the
+    alternative (0.0 means that all of them agree).
+    """
+    disagreements = {}
+    for alt in scenarios[0][1]:
+        counts = {}
+        for _, assignments in scenarios:
+            counts[assignments[alt]] = counts.get(assignments[alt], 0) + 1
+        disagreements[alt] = 1.0 - max(counts.values()) / float(len(scenarios))
+    return disagreements
+
+
+###############################################################################
+# Converting the output into the XMCDA format.                                #
+###############################################################################
+
+def margins_to_xmcda(margins):
+    """Converts the margins (MarginsIndex or dict) to alternativesValues."""
+    if isinstance(margins, MarginsIndex):
+        margins = margins.margins
+    xmcda = etree.Element('alternativesValues', mcdaConcept='Margins')
+    for alt, margin in sorted(margins.items()):
+        if margin is None:
+            continue
+        alt_value = etree.SubElement(xmcda, 'alternativeValue')
+        alt_id = etree.SubElement(alt_value, 'alternativeID')
+        alt_id.text = alt
+        value = etree.SubElement(alt_value, 'value')
+        real = etree.SubElement(value, 'real')
+        real.text = str(margin)
+    return xmcda
+
+
+def acceptabilities_to_xmcda(acceptabilities,
+                             mcda_concept='Acceptabilities'):
+    """Converts the class acceptability indices (dict: alternative ->
+    {class: frequency}, where a class is either a category ID or a tuple
+    (lower, upper) of them) to alternativesAffectations, with one
+    alternativeAffectation and the frequency as its value per every class
+    that occurred.
+    """
+    xmcda = etree.Element('alternativesAffectations',
+                          mcdaConcept=mcda_concept)
+    for alt, frequencies in sorted(acceptabilities.items()):
+        for category, frequency in sorted(frequencies.items()):
+            alt_assignment = etree.SubElement(xmcda, 'alternativeAffectation')
+            alt_id = etree.SubElement(alt_assignment, 'alternativeID')
+            alt_id.text = alt
+            if isinstance(category, tuple):
+                categories_interval = etree.SubElement(alt_assignment,
+                                                       'categoriesInterval')
+                for bound, category_id in zip(('lowerBound', 'upperBound'),
+                                              category):
+                    bound_node = etree.SubElement(categories_interval, bound)
+                    category_node = etree.SubElement(bound_node, 'categoryID')
+                    category_node.text = category_id
+            else:
+                category_id = etree.SubElement(alt_assignment, 'categoryID')
+                category_id.text = category
+            value = etree.SubElement(alt_assignment, 'value')
+            real = etree.SubElement(value, 'real')
+            real.text = str(frequency)
+    return xmcda
+
+
+def scenarios_to_xmcda(scenarios, as_intervals=False):
+    """Converts a list of (name, assignments) tuples to a list of
+    alternativesAffectations (one per scenario, i.e. a column of the
+    alternatives x scenarios matrix), which can be written to a single file
+    with write_xmcda.
+    """
+    xmcda = []
+    for name, assignments in scenarios:
+        if as_intervals:
+            xmcda_assign = assignments_as_intervals_to_xmcda(assignments)
+        else:
+            xmcda_assign = assignments_to_xmcda(assignments)
+        xmcda_assign.set('mcdaConcept', 'scenario: {}'.format(name))
+        xmcda.append(xmcda_assign)
+    return xmcda
+
+
+def disagreements_to_xmcda(disagreements):
+    """Converts the output of get_disagreements to alternativesValues."""
+    xmcda = etree.Element('alternativesValues', mcdaConcept='Disagreements')
+    for alt, disagreement in sorted(disagreements.items()):
+        alt_value = etree.SubElement(xmcda, 'alternativeValue')
+        alt_id = etree.SubElement(alt_value, 'alternativeID')
+        alt_id.text = alt
+        value = etree.SubElement(alt_value, 'value')
+        real = etree.SubElement(value, 'real')
+        real.text = str(disagreement)
+    return xmcda
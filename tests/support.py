@@ -0,0 +1,15 @@
+"""Shared setup of the tests: makes the repository root importable and
+turns off the validation of the XMCDA files against their schemas (which are
+downloaded from the web) - the files are still parsed as usual.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import PyXMCDA
+
+PyXMCDA.validateXMCDA = lambda xmltree: True
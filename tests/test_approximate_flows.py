@@ -0,0 +1,80 @@
+import random
+import unittest
+
+import support  # noqa: F401
+import flows
+
+
+class ApproximateFlowsTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(1)
+        self.criteria = ['g1', 'g2', 'g3']
+        self.alternatives = ['a%d' % i for i in range(40)]
+        self.profiles = ['p1', 'p2']
+        self.performances = dict(
+            (a, dict((g, rng.random() * 10) for g in self.criteria))
+            for a in self.alternatives)
+        self.performances['p1'] = dict((g, 3.0) for g in self.criteria)
+        self.performances['p2'] = dict((g, 7.0) for g in self.criteria)
+        self.weights = {'g1': 1, 'g2': 2, 'g3': 1}
+        self.pref_directions = {'g1': 'max', 'g2': 'min', 'g3': 'max'}
+        self.thresholds = {
+            'g1': {'indifference': 0.5, 'preference': 2.0},
+            'g2': {'indifference': {'slope': 0.1, 'intercept': 0},
+                   'preference': 3.0},
+            'g3': {},
+        }
+
+    def _get_flows(self, sample_size, strata=1, seed=None):
+        return flows.get_approximate_flows(
+            self.alternatives, self.performances, self.criteria, self.weights,
+            self.pref_directions, self.thresholds, sample_size,
+            profiles=self.profiles, strata=strata, seed=seed)
+
+    def _get_exact_flow(self, x):
+        pi = flows._get_preference_function(
+            self.criteria, self.weights, self.pref_directions, self.thresholds)
+        others = [y for y in self.alternatives if y != x]
+        return sum(pi(self.performances[x], self.performances[y]) -
+                   pi(self.performances[y], self.performances[x])
+                   for y in others) / float(len(others))
+
+    def test_full_sample_gives_exact_flows(self):
+        for strata in (1, 4):
+            net_flows, _, _, errors = self._get_flows(
+                len(self.alternatives), strata=strata)
+            for x in self.alternatives + self.profiles:
+                self.assertAlmostEqual(net_flows[x], self._get_exact_flow(x))
+            for x in self.alternatives:
+                self.assertEqual(errors[x]['net'], 0.0)
+
+    def test_profiles_are_fixed_boundaries(self):
+        net_flows, _, _, errors = self._get_flows(10, seed=3)
+        for p in self.profiles:
+            self.assertNotIn(p, errors)
+        lower, upper = flows.get_flows_bounds(net_flows, errors)
+        for p in self.profiles:
+            self.assertEqual(lower[p], net_flows[p])
+            self.assertEqual(upper[p], net_flows[p])
+        self.assertTrue(any(lower[a] < net_flows[a] < upper[a]
+                            for a in self.alternatives))
+
+    def test_profiles_flows_are_exact(self):
+        for strata in (1, 4):
+            net_flows, positive_flows, _, _ = self._get_flows(
+                5, strata=strata, seed=2)
+            for p in self.profiles:
+                self.assertAlmostEqual(net_flows[p], self._get_exact_flow(p))
+            self.assertTrue(any(abs(net_flows[a] - self._get_exact_flow(a)) >
+                                1e-6 for a in self.alternatives))
+
+    def test_straddles(self):
+        self.assertEqual(
+            flows.get_straddles({'a': 'C1', 'b': 'C2'},
+                                {'a': 'C1', 'b': 'C3'}),
+            {'a': False, 'b': True})
+
+
+if __name__ == '__main__':
+    unittest.main()
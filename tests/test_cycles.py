@@ -0,0 +1,84 @@
+import random
+import unittest
+
+import networkx as nx
+
+import support  # noqa: F401
+import common
+import outranking
+
+
+def _cut_weakest(graph, credibility):
+    """Removes the least credible arcs of a cycle until there are none left,
+    searching for the cycles again after every cut.
+    """
+    graph = graph.copy()
+    while True:
+        components = [component
+                      for component in nx.strongly_connected_components(graph)
+                      if len(component) > 1]
+        if not components:
+            return graph
+        arcs = [(credibility[x][y], x, y)
+                for x, y in graph.subgraph(components[0]).edges()]
+        weakest = min(value for value, _, _ in arcs)
+        graph.remove_edges_from([(x, y) for value, x, y in arcs
+                                 if value == weakest])
+
+
+def _get_random_outranking(rng, ids):
+    relation = outranking.OutrankingBitset(ids)
+    for x in ids:
+        for y in ids:
+            if x != y and rng.random() < 0.3:
+                relation.add(x, y)
+    return relation
+
+
+class CyclesTest(unittest.TestCase):
+
+    def test_cut_weakest_matches_repeated_cycle_searches(self):
+        rng = random.Random(3)
+        for _ in range(100):
+            ids = ['a%02d' % i for i in range(rng.randint(1, 10))]
+            credibility = dict(
+                (x, dict((y, rng.choice([0.1, 0.2, 0.5, 0.7, 0.9]))
+                         for y in ids)) for x in ids)
+            relation = _get_random_outranking(rng, ids)
+            result = outranking.eliminate_cycles(relation, 'cut_weakest',
+                                                 credibility)[0]
+            expected = _cut_weakest(
+                outranking._get_outranking_graph(relation), credibility)
+            self.assertEqual(set(result.iter_pairs()), set(expected.edges()))
+
+    def test_aggregate(self):
+        relation = outranking.OutrankingBitset(['a', 'b', 'c', 'd'])
+        for x, y in [('a', 'b'), ('b', 'a'), ('b', 'c'), ('c', 'd')]:
+            relation.add(x, y)
+        result = outranking.eliminate_cycles(relation)[0]
+        self.assertEqual(sorted(result.iter_pairs()),
+                         [('a, b', 'c'), ('c', 'd')])
+
+    def test_kernel(self):
+        rng = random.Random(11)
+        for _ in range(100):
+            ids = ['a%02d' % i for i in range(rng.randint(1, 10))]
+            relation = outranking.eliminate_cycles(
+                _get_random_outranking(rng, ids))[0]
+            graph = outranking._get_outranking_graph(relation)
+            kernel = outranking.get_kernel(relation)
+            for x in kernel:
+                self.assertFalse(any(graph.has_edge(x, y) for y in kernel))
+            for x in set(graph) - set(kernel):
+                self.assertTrue(any(graph.has_edge(y, x) for y in kernel))
+
+    def test_kernel_of_cyclic_relation(self):
+        relation = outranking.OutrankingBitset(['a', 'b'])
+        relation.add('a', 'b')
+        relation.add('b', 'a')
+        self.assertRaises(common.InputDataError, outranking.get_kernel,
+                          relation)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import random
+import unittest
+
+import support  # noqa: F401
+import outranking
+
+
+def _distill(matrix, ids, ascending, alpha=0.3, beta=-0.15):
+    """ELECTRE III distillation straight from its definition: the
+    qualifications are counted from scratch in every step.
+    """
+    def _s(value):
+        return alpha + beta * value
+
+    remaining = set(range(len(ids)))
+    classes = []
+    while remaining:
+        subset = set(remaining)
+        values = [matrix[a][b] for a in subset for b in subset if a != b]
+        level = max(values) if values else None
+        while level is not None:
+            below = [matrix[a][b] for a in subset for b in subset
+                     if a != b and matrix[a][b] < level - _s(level)]
+            next_level = max(below) if below else 0.0
+
+            def _outranks(a, b):
+                return (matrix[a][b] > next_level and
+                        matrix[a][b] > matrix[b][a] + _s(matrix[a][b]))
+
+            qualifications = dict(
+                (a, sum(1 for b in subset if b != a and _outranks(a, b)) -
+                 sum(1 for b in subset if b != a and _outranks(b, a)))
+                for a in subset)
+            target = (min if ascending else max)(qualifications.values())
+            subset = set(a for a in subset if qualifications[a] == target)
+            if len(subset) == 1 or next_level == 0.0:
+                break
+            level = next_level
+        classes.append(sorted(ids[a] for a in subset))
+        remaining -= subset
+    if ascending:
+        classes.reverse()
+    return classes
+
+
+def _get_random_matrix(rng, n, values):
+    return [[1.0 if i == j else rng.choice(values) for j in range(n)]
+            for i in range(n)]
+
+
+class DistillationTest(unittest.TestCase):
+
+    def test_distillations_match_the_definition(self):
+        rng = random.Random(7)
+        values = [0.0, 0.2, 0.35, 0.5, 0.6, 0.75, 0.8, 0.9, 1.0]
+        for _ in range(100):
+            n = rng.randint(1, 10)
+            ids = ['a%02d' % i for i in range(n)]
+            matrix = _get_random_matrix(rng, n, values)
+            for ascending in (False, True):
+                classes = outranking.get_distillation(matrix, ids, ascending)
+                self.assertEqual([sorted(c) for c in classes],
+                                 _distill(matrix, ids, ascending))
+
+    def test_nested_dicts(self):
+        rng = random.Random(3)
+        ids = ['a%02d' % i for i in range(6)]
+        matrix = _get_random_matrix(rng, 6, [0.1, 0.4, 0.7, 0.95])
+        credibility = dict((x, dict(zip(ids, row)))
+                           for x, row in zip(ids, matrix))
+        self.assertEqual(outranking.get_distillation(credibility, ids),
+                         outranking.get_distillation(matrix, ids))
+
+    def test_intersection(self):
+        rng = random.Random(5)
+        for _ in range(30):
+            n = rng.randint(1, 8)
+            ids = ['a%02d' % i for i in range(n)]
+            matrix = _get_random_matrix(rng, n, [0.0, 0.3, 0.6, 0.9, 1.0])
+            descending, ascending, intersection = \
+                outranking.get_intersection_distillation(matrix, ids)
+            rank_d = dict((x, r) for r, c in enumerate(descending) for x in c)
+            rank_a = dict((x, r) for r, c in enumerate(ascending) for x in c)
+            for x in ids:
+                for y in ids:
+                    self.assertEqual(intersection.outranks(x, y),
+                                     x != y and rank_d[x] <= rank_d[y] and
+                                     rank_a[x] <= rank_a[y])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import random
+import unittest
+
+import support  # noqa: F401
+import common
+import flows
+
+CRITERIA = ['g1', 'g2']
+WEIGHTS = {'g1': 2, 'g2': 1}
+PREF_DIRECTIONS = {'g1': 'max', 'g2': 'min'}
+THRESHOLDS = {'g1': {'indifference': 0.5, 'preference': 2.0}, 'g2': {}}
+
+
+def _get_store(profiles):
+    return flows.FlowStore(CRITERIA, WEIGHTS, PREF_DIRECTIONS, THRESHOLDS,
+                           profiles_performances=profiles)
+
+
+def _get_exact_flows(performances, profiles):
+    """The convention of FlowStore, computed from scratch."""
+    pi = flows._get_preference_function(CRITERIA, WEIGHTS, PREF_DIRECTIONS,
+                                        THRESHOLDS)
+    positive, negative = {}, {}
+    for x, performance in list(performances.items()) + list(profiles.items()):
+        others = [y for y in performances if y != x]
+        positive[x] = sum(pi(performance, performances[y])
+                          for y in others) / float(len(others))
+        negative[x] = sum(pi(performances[y], performance)
+                          for y in others) / float(len(others))
+    return positive, negative
+
+
+class FlowStoreTest(unittest.TestCase):
+
+    def test_incremental_flows_equal_recomputed_ones(self):
+        rng = random.Random(7)
+        profiles = {'p1': {'g1': 3.0, 'g2': 6.0}, 'p2': {'g1': 6.0, 'g2': 3.0}}
+        store = _get_store(profiles)
+        performances = {}
+        for step in range(60):
+            if performances and rng.random() < 0.3:
+                alt = rng.choice(sorted(performances))
+                store.remove(alt)
+                del performances[alt]
+            else:
+                alt = 'a%d' % step
+                performances[alt] = {'g1': rng.uniform(0, 10),
+                                     'g2': rng.uniform(0, 10)}
+                store.add(alt, performances[alt])
+        self.assertTrue(len(performances) > 2)
+        flows, positive_flows, negative_flows = store.get_flows()
+        rebuilt = _get_store(profiles)
+        for alt in sorted(performances):
+            rebuilt.add(alt, performances[alt])
+        expected = rebuilt.get_flows()
+        positive, negative = _get_exact_flows(performances, profiles)
+        for x in positive:
+            self.assertAlmostEqual(positive_flows[x], positive[x])
+            self.assertAlmostEqual(negative_flows[x], negative[x])
+            self.assertAlmostEqual(flows[x], positive[x] - negative[x])
+            for got, exp in zip((flows, positive_flows, negative_flows),
+                                expected):
+                self.assertAlmostEqual(got[x], exp[x])
+
+    def test_changed_flows(self):
+        store = _get_store({})
+        store.add('a1', {'g1': 1.0, 'g2': 1.0})
+        store.add('a2', {'g1': 5.0, 'g2': 1.0})
+        changed, removed = store.get_changed_flows()[:2]
+        self.assertEqual((changed, removed), (['a1', 'a2'], []))
+        self.assertEqual(store.get_changed_flows()[:2], ([], []))
+        store.remove('a2')
+        changed, removed = store.get_changed_flows()[:2]
+        self.assertEqual((changed, removed), (['a1'], ['a2']))
+        self.assertRaises(common.InputDataError, store.remove, 'a2')
+
+
+if __name__ == '__main__':
+    unittest.main()
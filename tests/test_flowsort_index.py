@@ -0,0 +1,82 @@
+import random
+import unittest
+
+import support  # noqa: F401
+from common import InputDataError
+from PrometheeWorker import getMethodModule
+
+flowsort_ii = getMethodModule('FlowSortPrometheeIISorting')
+
+
+def _get_profiles_categories(count, comparison_with):
+    profiles_categories = {}
+    for i in range(1, count + 1):
+        if comparison_with == 'boundary_profiles':
+            classes = {'lower': 'C%d' % i, 'upper': 'C%d' % (i + 1)}
+        else:
+            classes = 'C%d' % i
+        profiles_categories[i] = {'id': 'b%d' % i, 'classes': classes}
+    return profiles_categories
+
+
+class FlowSortIndexTest(unittest.TestCase):
+    """Compares the assignments kept by FlowSortIndex with assignFlows run
+    from scratch after every move. The flows are multiples of 1/16 and the
+    profiles' flows - of 1/8, so the flows often hit the profiles and the
+    midpoints between them exactly.
+    """
+
+    def _check_moves(self, comparison_with, rng):
+        count = rng.randint(1, 4)
+        profiles_categories = _get_profiles_categories(count, comparison_with)
+        profiles = ['b%d' % i for i in range(1, count + 1)]
+        alternatives = ['a%d' % i for i in range(rng.randint(1, 30))]
+        flows = dict((a, rng.randint(-16, 16) / 16.0) for a in alternatives)
+        for p, flow in zip(profiles, sorted(rng.randint(-8, 8) / 8.0
+                                            for _ in profiles)):
+            flows[p] = flow
+        index = flowsort_ii.FlowSortIndex(alternatives, profiles_categories,
+                                          flows, flows, comparison_with)
+        expected = flowsort_ii.assignFlows(comparison_with, alternatives,
+                                           profiles_categories, flows)
+        self.assertEqual(index.assignments, expected)
+        for _ in range(20):
+            # the profiles may cross their neighbours
+            profile = rng.choice(profiles)
+            flows[profile] = rng.randint(-10, 10) / 8.0
+            reassigned = index.moveProfile(profile, flows[profile])
+            previous = expected
+            expected = flowsort_ii.assignFlows(
+                comparison_with, alternatives, profiles_categories, flows)
+            self.assertEqual(index.assignments, expected)
+            self.assertEqual(reassigned, dict(
+                (a, expected[a]) for a in alternatives
+                if expected[a] != previous[a]))
+
+    def test_boundary_profiles(self):
+        rng = random.Random(1)
+        for _ in range(100):
+            self._check_moves('boundary_profiles', rng)
+
+    def test_central_profiles(self):
+        rng = random.Random(2)
+        for _ in range(100):
+            self._check_moves('central_profiles', rng)
+
+    def test_ties_at_the_boundary(self):
+        profiles_categories = _get_profiles_categories(2, 'boundary_profiles')
+        flows = {'a1': 0.0, 'a2': 0.5, 'a3': 0.25, 'b1': -0.5, 'b2': 0.75}
+        index = flowsort_ii.FlowSortIndex(['a1', 'a2', 'a3'],
+                                          profiles_categories, flows, flows)
+        # 'flow >= profile' - the alternatives at the profile move up
+        self.assertEqual(index.moveProfile('b2', 0.5), {'a2': 'C3'})
+        self.assertEqual(index.moveProfile('b1', 0.0), {})
+        self.assertEqual(index.moveProfile('b1', 0.25), {'a1': 'C1'})
+        # b1 above b2: C3 needs both of them
+        self.assertEqual(index.moveProfile('b1', 0.75), {'a2': 'C1',
+                                                         'a3': 'C1'})
+        self.assertRaises(InputDataError, index.moveProfile, 'b3', 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
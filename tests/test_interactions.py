@@ -0,0 +1,100 @@
+import unittest
+
+import support  # noqa: F401
+import common
+import outranking
+
+CRITERIA = ['g1', 'g2', 'g3']
+PERFORMANCES = {
+    'a': {'g1': 10, 'g2': 5, 'g3': 3},
+    'b': {'g1': 4, 'g2': 6, 'g3': 9},
+    'c': {'g1': 6, 'g2': 4.5, 'g3': 8.5},
+    'p': {'g1': 6, 'g2': 6, 'g3': 6},
+}
+WEIGHTS = {'g1': 0.5, 'g2': 0.3, 'g3': 0.2}
+PREF_DIRECTIONS = {'g1': 'max', 'g2': 'max', 'g3': 'max'}
+THRESHOLDS = {
+    'g1': {'indifference': 1.0, 'preference': 3.0},
+    'g2': {'indifference': 0.5, 'preference': 2.0},
+    'g3': {'indifference': 1.0, 'preference': 2.0},
+}
+INTERACTIONS = {
+    'strengthening': [('g1', 'g2', 0.1)],
+    'weakening': [('g2', 'g3', -0.05)],
+    'antagonistic': [('g1', 'g3', 0.08)],
+}
+
+
+def _c(x, y, criterion):
+    return outranking.get_partial_concordance(
+        PREF_DIRECTIONS, THRESHOLDS, criterion, PERFORMANCES[x][criterion],
+        PERFORMANCES[y][criterion])
+
+
+def _get_concordance(x, y, z=lambda u, v: u * v, with_denominator=True):
+    """The concordance index with interactions of a single pair, from the
+    definition.
+    """
+    effects = 0.0
+    for kind in ('strengthening', 'weakening'):
+        for i, j, value in INTERACTIONS[kind]:
+            effects += value * z(_c(x, y, i), _c(x, y, j))
+    for i, h, value in INTERACTIONS['antagonistic']:
+        effects -= value * z(_c(x, y, i), _c(y, x, h))
+    numerator = sum(WEIGHTS[g] * _c(x, y, g) for g in CRITERIA) + effects
+    if with_denominator:
+        return numerator / (sum(WEIGHTS.values()) + effects)
+    return numerator / sum(WEIGHTS.values())
+
+
+class InteractionsTest(unittest.TestCase):
+
+    def test_alternatives_vs_alternatives(self):
+        ids = ['a', 'b', 'c', 'p']
+        partials = outranking.get_partial_concordances(
+            ids, ids, PERFORMANCES, CRITERIA, PREF_DIRECTIONS, THRESHOLDS)
+        for chunk_size in (1, 3, 256):
+            concordance = outranking.get_concordance_with_interactions(
+                partials, CRITERIA, WEIGHTS, INTERACTIONS,
+                chunk_size=chunk_size)
+            for r, x in enumerate(ids):
+                for col, y in enumerate(ids):
+                    self.assertAlmostEqual(concordance[r][col],
+                                           _get_concordance(x, y))
+
+    def test_minimum_without_denominator(self):
+        ids = ['a', 'b', 'c']
+        partials = outranking.get_partial_concordances(
+            ids, ids, PERFORMANCES, CRITERIA, PREF_DIRECTIONS, THRESHOLDS)
+        concordance = outranking.get_concordance_with_interactions(
+            partials, CRITERIA, WEIGHTS, INTERACTIONS, z_function='minimum',
+            with_denominator=False)
+        for r, x in enumerate(ids):
+            for col, y in enumerate(ids):
+                self.assertAlmostEqual(
+                    concordance[r][col],
+                    _get_concordance(x, y, min, with_denominator=False))
+
+    def test_profiles(self):
+        alternatives, profiles = ['a', 'b', 'c'], ['p']
+        partials = outranking.get_partial_concordances(
+            alternatives, profiles, PERFORMANCES, CRITERIA, PREF_DIRECTIONS,
+            THRESHOLDS)
+        reverse = outranking.get_partial_concordances(
+            profiles, alternatives, PERFORMANCES, CRITERIA, PREF_DIRECTIONS,
+            THRESHOLDS)
+        concordance = outranking.get_concordance_with_interactions(
+            partials, CRITERIA, WEIGHTS, INTERACTIONS,
+            reverse_partials=reverse)
+        for r, x in enumerate(alternatives):
+            self.assertAlmostEqual(concordance[r][0], _get_concordance(x, 'p'))
+
+    def test_wrong_z_function(self):
+        self.assertRaises(common.InputDataError,
+                          outranking.get_concordance_with_interactions,
+                          [[[1.0, 1.0, 1.0]]], CRITERIA, WEIGHTS,
+                          INTERACTIONS, z_function='maximum')
+
+
+if __name__ == '__main__':
+    unittest.main()
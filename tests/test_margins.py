@@ -0,0 +1,74 @@
+import random
+import unittest
+
+import support  # noqa: F401
+from PrometheeWorker import getMethodModule
+
+flowsort_i = getMethodModule('FlowSortPrometheISorting')
+promsort = getMethodModule('Promsort')
+tri = getMethodModule('PrometheeTriSorting')
+
+
+def _get_central_profiles(count):
+    return dict((i, {'id': 'b%d' % i, 'classes': 'C%d' % i})
+                for i in range(1, count + 1))
+
+
+def _get_boundary_profiles(count):
+    return dict((i, {'id': 'b%d' % i, 'classes': {'lower': 'C%d' % i,
+                                                  'upper': 'C%d' % (i + 1)}})
+                for i in range(1, count + 1))
+
+
+class MarginsTest(unittest.TestCase):
+
+    def test_promethee_tri(self):
+        categories_flows = {'b1': -0.6, 'b2': 0.0, 'b3': 0.5, 'b4': 0.8}
+        flows = {'a1': 0.1, 'a2': 0.7, 'a3': -0.35, 'a4': 0.25}
+        assignments, margins = tri.sortPrometheeTri(
+            sorted(flows), None, _get_central_profiles(4), flows,
+            categories_flows, True)
+        expected = {'a1': 0.15, 'a2': 0.05, 'a3': 0.05, 'a4': 0.0}
+        for alternative, margin in expected.items():
+            self.assertAlmostEqual(margins.margins[alternative], margin)
+        self.assertEqual(margins.get_within(0.01), ['a4'])
+
+    def test_promsort_margins_are_distances(self):
+        rng = random.Random(3)
+        profiles_categories = _get_boundary_profiles(2)
+        categories_positive = {'b1': 0.3, 'b2': 0.6}
+        categories_negative = {'b1': 0.6, 'b2': 0.3}
+        positive = dict(('a%d' % k, rng.random()) for k in range(30))
+        negative = dict(('a%d' % k, rng.random()) for k in range(30))
+        alternatives = sorted(positive)
+        cut_point = 0.1
+        distances = promsort.getPromsortDistances(
+            alternatives, None, profiles_categories, positive, negative,
+            categories_positive, categories_negative)[2]
+        self.assertTrue(distances)
+        margins = promsort.sortPromsort(
+            alternatives, None, profiles_categories, positive, negative,
+            categories_positive, categories_negative, cut_point, True)[2]
+        for alternative, dk in distances:
+            self.assertAlmostEqual(margins.margins[alternative],
+                                   abs(dk - cut_point))
+        self.assertTrue(all(margin >= 0
+                            for margin in margins.margins.values()))
+
+    def test_flowsort_i_central_profiles(self):
+        positive = {'a1': 0.2, 'a2': 0.55}
+        negative = {'a1': 0.7, 'a2': 0.35}
+        assignments, margins = flowsort_i.sortWithCentralProfiles(
+            sorted(positive), None, _get_central_profiles(1), positive,
+            negative, {'b1': 0.5}, {'b1': 0.5}, True)
+        self.assertEqual(margins.margins, {'a1': None, 'a2': None})
+        self.assertEqual(len(margins), 0)
+        assignments, margins = flowsort_i.sortWithCentralProfiles(
+            sorted(positive), None, _get_central_profiles(2), positive,
+            negative, {'b1': 0.2, 'b2': 0.8}, {'b1': 0.8, 'b2': 0.2}, True)
+        self.assertAlmostEqual(margins.margins['a1'], 0.2)
+        self.assertAlmostEqual(margins.margins['a2'], 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
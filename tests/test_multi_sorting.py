@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import support
+import PrometheeMultiSorting
+from agreements import write_agreements
+
+FIXTURES_DIR = os.path.join(support.ROOT, 'tests', 'PrometheeMultiSorting')
+
+# the central profiles methods, with the robustness analysis run in 2
+# processes (see method_parameters.xml)
+METHODS = [
+    'FlowSortPrometheeIISorting',
+    'FlowSortPrometheISorting',
+    'PrometheeTriSorting',
+]
+
+
+class MultiSortingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def _check_agreements(self, parallel):
+        input_dir = os.path.join(FIXTURES_DIR, 'in1')
+        results = PrometheeMultiSorting.runMethods(
+            METHODS, input_dir, self.output_dir, parallel)
+        for result in results:
+            self.assertEqual(result['status'], 'ok',
+                             "{} failed ({})".format(result['method'],
+                                                     parallel))
+            self.assertTrue(os.path.isfile(os.path.join(
+                self.output_dir, result['method'],
+                'assignments_distribution.xml')))
+        agreements = PrometheeMultiSorting.getMethodsAgreements(
+            results, input_dir, self.output_dir)
+        file_name = os.path.join(self.output_dir, 'agreement.tsv')
+        write_agreements(agreements, file_name)
+        with open(file_name) as f:
+            actual = f.read()
+        with open(os.path.join(FIXTURES_DIR, 'out1', 'agreement.tsv')) as f:
+            self.assertEqual(actual, f.read())
+
+    def test_none(self):
+        self._check_agreements('none')
+
+    def test_threads(self):
+        self._check_agreements('threads')
+
+    def test_processes(self):
+        self._check_agreements('processes')
+
+
+if __name__ == '__main__':
+    unittest.main()
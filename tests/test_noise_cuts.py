@@ -0,0 +1,126 @@
+import random
+import unittest
+
+import support  # noqa: F401
+import robustness
+from PrometheeWorker import getMethodModule
+
+flowsort = getMethodModule('FlowSortPrometheeIISorting')
+tri = getMethodModule('PrometheeTriSorting')
+
+
+def _get_profiles_categories(count, boundary=False):
+    if boundary:
+        return dict((i, {'id': 'b%d' % i,
+                         'classes': {'lower': 'C%d' % i,
+                                     'upper': 'C%d' % (i + 1)}})
+                    for i in range(1, count + 1))
+    return dict((i, {'id': 'b%d' % i, 'classes': 'C%d' % i})
+                for i in range(1, count + 1))
+
+
+def _locate(cuts, flow):
+    thresholds, classes, inclusive = cuts
+    below = [t for t in thresholds if t < flow or (inclusive and t == flow)]
+    return classes[len(below)]
+
+
+class NoiseCutsTest(unittest.TestCase):
+
+    def _get_cases(self, rng, boundary=False):
+        for _ in range(50):
+            count = rng.randint(1, 5)
+            profiles_categories = _get_profiles_categories(count, boundary)
+            # a coarse grid, so the flows hit the profiles and the midpoints
+            profiles = sorted(rng.randint(-8, 8) / 8.0 for _ in range(count))
+            categories_flows = dict(('b%d' % i, flow)
+                                    for i, flow in enumerate(profiles, 1))
+            flows = [rng.randint(-20, 20) / 16.0 for _ in range(40)]
+            yield profiles_categories, categories_flows, flows
+
+    def test_flowsort_cuts(self):
+        rng = random.Random(1)
+        for comparison_with, assign in (
+                ('boundary_profiles', flowsort.assignWithBoundaryProfiles),
+                ('central_profiles', flowsort.assignWithCentralProfiles)):
+            boundary = comparison_with == 'boundary_profiles'
+            for profiles_categories, categories_flows, flows in \
+                    self._get_cases(rng, boundary):
+                cuts = flowsort.getCuts(comparison_with, profiles_categories,
+                                        categories_flows)
+                for flow in flows + list(categories_flows.values()):
+                    self.assertEqual(
+                        _locate(cuts, flow),
+                        assign(flow, profiles_categories, categories_flows))
+
+    def test_tri_cuts(self):
+        rng = random.Random(2)
+        for profiles_categories, categories_flows, flows in \
+                self._get_cases(rng):
+            cuts = tri.getCuts(profiles_categories, categories_flows)
+            if cuts is None:
+                # equal profiles
+                continue
+            for flow in flows + list(categories_flows.values()):
+                self.assertEqual(
+                    _locate(cuts, flow),
+                    tri.assignPrometheeTri(flow, profiles_categories,
+                                           categories_flows))
+
+    def test_unsorted_profiles(self):
+        profiles_categories = _get_profiles_categories(3)
+        for categories_flows in ({'b1': 0.0, 'b2': 1.0, 'b3': -1.0},
+                                 {'b1': 0.0, 'b2': 0.5, 'b3': 0.5}):
+            self.assertEqual(tri.getCuts(profiles_categories,
+                                         categories_flows), None)
+        # the midpoints, which are all that matters, are increasing here
+        self.assertEqual(flowsort.getCuts('central_profiles',
+                                          profiles_categories,
+                                          {'b1': 0.0, 'b2': 0.5,
+                                           'b3': 0.5}),
+                         ([0.25, 0.5], ['C1', 'C2', 'C3'], False))
+        self.assertEqual(flowsort.getCuts('central_profiles',
+                                          profiles_categories,
+                                          {'b1': 0.0, 'b2': 1.0,
+                                           'b3': -1.0}), None)
+        self.assertEqual(flowsort.getCuts(
+            'boundary_profiles', _get_profiles_categories(2, True),
+            {'b1': 0.5, 'b2': -0.5}), None)
+
+    def test_cuts_match_sorting_every_sample(self):
+        profiles_categories = _get_profiles_categories(3)
+        categories_flows = {'b1': -0.5, 'b2': 0.0, 'b3': 0.5}
+        flows = {'a1': -0.3, 'a2': 0.2, 'a3': 0.7, 'a4': 0.25}
+        alternatives = sorted(flows)
+        flows.update(categories_flows)
+        sort = lambda net, positive, negative: tri.assignFlows(
+            alternatives, profiles_categories, net)
+        cuts = tri.getCuts(profiles_categories, categories_flows)
+        results = [robustness.get_noise_acceptabilities(
+            alternatives, s, 4000, 0.2, flows=flows, seed=3, processes=1,
+            cuts=c) for s, c in ((sort, None), (None, cuts))]
+        for alt in alternatives:
+            for category in ('C1', 'C2', 'C3'):
+                self.assertAlmostEqual(results[0][alt].get(category, 0.0),
+                                       results[1][alt].get(category, 0.0),
+                                       delta=0.04)
+        # without the noise, every sample gets the same class
+        for s, c in ((sort, None), (None, cuts)):
+            self.assertEqual(robustness.get_noise_acceptabilities(
+                alternatives, s, 10, 0.0, flows=flows, processes=1, cuts=c),
+                {'a1': {'C1': 1.0}, 'a2': {'C2': 1.0}, 'a3': {'C3': 1.0},
+                 'a4': {'C3': 1.0}})
+
+    def test_batches_dont_change_the_results(self):
+        profiles_categories = _get_profiles_categories(3)
+        categories_flows = {'b1': -0.5, 'b2': 0.0, 'b3': 0.5}
+        flows = {'a1': -0.3, 'a2': 0.2, 'a3': 0.7}
+        cuts = tri.getCuts(profiles_categories, categories_flows)
+        results = [robustness.get_noise_acceptabilities(
+            sorted(flows), None, 50, 0.3, flows=flows, batch_size=7, seed=5,
+            processes=processes, cuts=cuts) for processes in (1, 2)]
+        self.assertEqual(results[0], results[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import random
+import unittest
+
+from lxml import etree
+
+import support  # noqa: F401
+import common
+import outranking
+
+
+def _get_outranking_tree(pairs):
+    xml = [common.HEADER, '<alternativesComparisons><pairs>']
+    for x, y in pairs:
+        xml.append('<pair><initial><alternativeID>{}</alternativeID>'
+                   '</initial><terminal><alternativeID>{}</alternativeID>'
+                   '</terminal></pair>'.format(x, y))
+    xml.append('</pairs></alternativesComparisons>')
+    xml.append(common.FOOTER)
+    return etree.fromstring(''.join(xml).encode('utf-8'))
+
+
+class OutrankingBitsetTest(unittest.TestCase):
+    """Compares the bitsets with the nested dicts (Vividict) returned by
+    _get_outranking_crisp for the same outranking files.
+    """
+
+    def _get_relations(self):
+        rng = random.Random(4)
+        for _ in range(30):
+            ids = ['a%d' % i for i in range(rng.randint(1, 8))]
+            pairs = [(x, y) for x in ids for y in ids if rng.random() < 0.3]
+            tree = _get_outranking_tree(pairs)
+            yield (ids, common._get_outranking_crisp(tree),
+                   common._get_outranking_bitset(tree, ids))
+
+    def test_reads_like_the_nested_dicts(self):
+        for ids, expected, bitset in self._get_relations():
+            self.assertEqual(sorted(bitset), sorted(expected))
+            self.assertEqual(sorted(bitset.keys()), sorted(expected.keys()))
+            self.assertEqual(len(bitset), len(expected))
+            self.assertEqual(
+                dict((x, dict(row)) for x, row in bitset.items()),
+                dict((x, dict(row)) for x, row in expected.items()))
+            for x in ids:
+                self.assertEqual(x in bitset, x in expected)
+                if x not in expected:
+                    self.assertEqual(list(bitset[x]), [])
+                    continue
+                row = bitset[x]
+                self.assertEqual(sorted(row), sorted(expected[x]))
+                self.assertEqual(sorted(row.items()),
+                                 sorted(expected[x].items()))
+                self.assertEqual(list(row.values()),
+                                 list(expected[x].values()))
+                self.assertEqual(len(row), len(expected[x]))
+                for y in ids:
+                    self.assertEqual(y in row, y in expected[x])
+                    self.assertEqual(bool(row[y]), bool(expected[x].get(y)))
+                    self.assertEqual(row.get(y), expected[x].get(y))
+            self.assertEqual(bitset.get_pairs_count(),
+                             sum(len(row) for row in expected.values()))
+
+    def test_iteration_terminates(self):
+        bitset = outranking.OutrankingBitset(['a', 'b'])
+        bitset.add('a', 'b')
+        self.assertEqual([y for y in bitset['a']], ['b'])
+        self.assertEqual(dict(bitset['a']), {'b': True})
+        self.assertEqual(list(bitset['b']), [])
+        self.assertEqual(list(bitset['unknown']), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
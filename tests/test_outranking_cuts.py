@@ -0,0 +1,78 @@
+import random
+import unittest
+
+import support  # noqa: F401
+import common
+import outranking
+
+VALUES = [0.0, 0.25, 0.5, 0.6, 0.75, 1.0]
+
+
+def _get_pairs(relation):
+    return set(relation.iter_pairs())
+
+
+class OutrankingCutsTest(unittest.TestCase):
+
+    def _check_cuts(self, credibility, rows, columns, cut_thresholds, cuts):
+        self.assertEqual([t for t, _ in cuts], cut_thresholds)
+        for t, relation in cuts:
+            expected = set((x, y) for x, values in zip(rows, credibility)
+                           for y, value in zip(columns, values)
+                           if value >= float(t))
+            self.assertEqual(_get_pairs(relation), expected)
+        # nested: every relation contains the stricter ones
+        ordered = sorted(cuts, key=lambda cut: float(cut[0]))
+        for (_, looser), (_, stricter) in zip(ordered, ordered[1:]):
+            self.assertTrue(_get_pairs(stricter) <= _get_pairs(looser))
+
+    def test_square_matrices(self):
+        rng = random.Random(2)
+        for _ in range(50):
+            ids = ['a%d' % i for i in range(rng.randint(1, 7))]
+            credibility = [[rng.choice(VALUES) for _ in ids] for _ in ids]
+            # unsorted, repeated and hitting the values exactly
+            cut_thresholds = [rng.choice(VALUES + [0.3, 0.9])
+                              for _ in range(rng.randint(1, 5))]
+            cuts = outranking.get_outranking_cuts(credibility,
+                                                  cut_thresholds, ids)
+            self._check_cuts(credibility, ids, ids, cut_thresholds, cuts)
+            self.assertEqual(cuts[0][1].ids, ids)
+
+    def test_rows_and_columns(self):
+        rng = random.Random(3)
+        rows = ['a1', 'a2', 'a3', 'a4']
+        columns = ['p1', 'a2', 'p2']
+        credibility = [[rng.choice(VALUES) for _ in columns] for _ in rows]
+        cut_thresholds = ['0.75', 0.5, 0.25]
+        cuts = outranking.get_outranking_cuts(credibility, cut_thresholds,
+                                              rows, columns)
+        self._check_cuts(credibility, rows, columns, cut_thresholds, cuts)
+        # the rows first, then the columns which aren't rows
+        self.assertEqual(cuts[0][1].ids, rows + ['p1', 'p2'])
+        for _, relation in cuts:
+            for y in columns:
+                if y not in rows:
+                    self.assertEqual(relation.successors(y), [])
+
+    def test_nested_dicts(self):
+        rng = random.Random(5)
+        ids = ['a1', 'a2', 'a3']
+        credibility = [[rng.choice(VALUES) for _ in ids] for _ in ids]
+        nested = dict((x, dict(zip(ids, values)))
+                      for x, values in zip(ids, credibility))
+        cut_thresholds = [0.5, 0.6, 1.0, 0.0]
+        from_matrix = outranking.get_outranking_cuts(credibility,
+                                                     cut_thresholds, ids)
+        from_dicts = outranking.get_outranking_cuts(nested, cut_thresholds)
+        for (_, expected), (_, relation) in zip(from_matrix, from_dicts):
+            self.assertEqual(_get_pairs(relation), _get_pairs(expected))
+
+    def test_wrong_threshold(self):
+        self.assertRaises(common.InputDataError,
+                          outranking.get_outranking_cuts, [[1.0]], [1.5],
+                          ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+
+import support  # noqa: F401
+import outranking
+
+CRITERIA = ['g1', 'g2', 'g3']
+PERFORMANCES = {
+    'a': {'g1': 10, 'g2': 5, 'g3': 3},
+    'b': {'g1': 4, 'g2': 6, 'g3': 9},
+    'c': {'g1': 7, 'g2': 2, 'g3': 8},
+    'p': {'g1': 6, 'g2': 6, 'g3': 6},
+    # better than b on g1 by more than the counter veto, discordant on g3
+    'e': {'g1': 12, 'g2': 3, 'g3': 5},
+}
+WEIGHTS = {'g1': 0.5, 'g2': 0.3, 'g3': 0.2}
+PREF_DIRECTIONS = {'g1': 'max', 'g2': 'max', 'g3': 'max'}
+THRESHOLDS = {
+    'g1': {'indifference': 1.0, 'preference': 3.0, 'veto': 8.0,
+           'reinforced_preference': 5.0, 'counter_veto': 5.0},
+    'g2': {'indifference': 0.5, 'preference': 2.0},
+    'g3': {'indifference': 1.0, 'preference': 2.0, 'pre_veto': 3.0,
+           'veto': 5.0},
+}
+
+
+def _get_credibility(x, y, with_counter_veto=False):
+    """ELECTRE III credibility of a single pair, from the definitions."""
+    gx, gy = PERFORMANCES[x], PERFORMANCES[y]
+    concordance = sum(
+        WEIGHTS[c] * outranking.get_partial_concordance(
+            PREF_DIRECTIONS, THRESHOLDS, c, gx[c], gy[c])
+        for c in CRITERIA) / sum(WEIGHTS.values())
+    exponent = 1.0
+    if with_counter_veto:
+        crossed = [c for c in CRITERIA
+                   if 'counter_veto' in THRESHOLDS[c] and
+                   gx[c] - gy[c] > THRESHOLDS[c]['counter_veto']]
+        exponent -= len(crossed) / float(len(CRITERIA))
+    credibility = concordance
+    for c in CRITERIA:
+        d = outranking.get_partial_discordance(PREF_DIRECTIONS, THRESHOLDS,
+                                               c, gx[c], gy[c])
+        if d > concordance:
+            credibility *= ((1.0 - d) / (1.0 - concordance)) ** exponent
+    return concordance, credibility
+
+
+class OutrankingMatricesTest(unittest.TestCase):
+
+    def test_partial_indices(self):
+        args = (PREF_DIRECTIONS, THRESHOLDS)
+        self.assertEqual(
+            outranking.get_partial_concordance(*args + ('g1', 4, 5)), 1.0)
+        self.assertAlmostEqual(
+            outranking.get_partial_concordance(*args + ('g1', 4, 6)), 0.5)
+        self.assertEqual(
+            outranking.get_partial_concordance(*args + ('g1', 4, 8)), 0.0)
+        self.assertEqual(
+            outranking.get_partial_discordance(*args + ('g2', 0, 9)), 0.0)
+        self.assertAlmostEqual(
+            outranking.get_partial_discordance(*args + ('g1', 4, 10)), 0.6)
+        self.assertAlmostEqual(
+            outranking.get_partial_discordance(*args + ('g3', 3, 7, True)),
+            0.5)
+
+    def test_matrices_match_the_pairwise_definitions(self):
+        ids = ['a', 'b', 'c']
+        for chunk_size in (1, 2, 256):
+            m = outranking.get_outranking_matrices(
+                ids, PERFORMANCES, CRITERIA, WEIGHTS, PREF_DIRECTIONS,
+                THRESHOLDS, chunk_size=chunk_size)
+            for r, x in enumerate(ids):
+                for col, y in enumerate(ids):
+                    concordance, credibility = _get_credibility(x, y)
+                    self.assertAlmostEqual(m['concordance'][0][r][col],
+                                           concordance)
+                    self.assertAlmostEqual(m['credibility'][0][r][col],
+                                           credibility)
+
+    def test_reinforcement_and_counter_veto(self):
+        m = outranking.get_outranking_matrices(
+            ['a', 'b'], PERFORMANCES, CRITERIA, WEIGHTS, PREF_DIRECTIONS,
+            THRESHOLDS, reinforcement_factors={'g1': 1.5},
+            with_counter_veto=True)
+        # a vs b: the reinforced preference is crossed on g1
+        self.assertAlmostEqual(m['concordance'][0][0][1],
+                               (0.75 + 0.3 * (1 / 1.5)) / 1.25)
+        # b vs a: d_1 = 0.6 > C = 0.5, no counter veto in favour of b
+        self.assertAlmostEqual(m['concordance'][0][1][0], 0.5)
+        self.assertAlmostEqual(m['credibility'][0][1][0], 0.5 * 0.4 / 0.5)
+
+    def test_counter_veto_matches_the_pairwise_definition(self):
+        ids = ['a', 'b', 'c', 'e']
+        for chunk_size in (1, 3):
+            m = outranking.get_outranking_matrices(
+                ids, PERFORMANCES, CRITERIA, WEIGHTS, PREF_DIRECTIONS,
+                THRESHOLDS, with_counter_veto=True, chunk_size=chunk_size)
+            for r, x in enumerate(ids):
+                for col, y in enumerate(ids):
+                    _, credibility = _get_credibility(x, y, True)
+                    self.assertAlmostEqual(m['credibility'][0][r][col],
+                                           credibility)
+        # e vs b: C = 0.5, d_3 = 2/3 and the counter veto is crossed on g1
+        # (12 - 4 > 5), so the discordance factor gets the exponent 2/3
+        row = ids.index('e')
+        credibility = m['credibility'][0][row][ids.index('b')]
+        self.assertAlmostEqual(credibility,
+                               0.5 * ((1 / 3.0) / 0.5) ** (2 / 3.0))
+        self.assertAlmostEqual(_get_credibility('e', 'b')[1], 1 / 3.0)
+        self.assertTrue(credibility > 1 / 3.0 + 0.01)
+
+    def test_profiles_and_partials(self):
+        m = outranking.get_outranking_matrices(
+            ['a', 'b'], PERFORMANCES, CRITERIA, WEIGHTS, PREF_DIRECTIONS,
+            THRESHOLDS, profiles=['p'], use_partials=True)
+        self.assertEqual(len(m['discordance']), 2)
+        for r, x in enumerate(['a', 'b']):
+            expected = [outranking.get_partial_discordance(
+                PREF_DIRECTIONS, THRESHOLDS, c, PERFORMANCES[x][c],
+                PERFORMANCES['p'][c]) for c in CRITERIA]
+            self.assertEqual(m['discordance'][0][r][0], expected)
+        comparisons = outranking.matrix_to_comparisons(
+            ['p'], ['a', 'b'], m['discordance'][1], criteria=CRITERIA)
+        self.assertEqual(sorted(comparisons['p']['a']), CRITERIA)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import unittest
+
+import support  # noqa: F401
+import robustness
+
+
+def _get_pid(task):
+    return os.getpid()
+
+
+class ParallelMapTest(unittest.TestCase):
+
+    def tearDown(self):
+        robustness.limit_processes(None)
+
+    def test_single_task_runs_in_this_process(self):
+        # a lambda can't be sent to a pool
+        self.assertEqual(robustness._parallel_map(lambda task: task * 2, [3]),
+                         [6])
+        self.assertEqual(robustness._parallel_map(_get_pid, [0]),
+                         [os.getpid()])
+
+    def test_limit(self):
+        robustness.limit_processes(1)
+        self.assertEqual(robustness._parallel_map(_get_pid, range(4), 4),
+                         [os.getpid()] * 4)
+
+    def test_pool(self):
+        pids = robustness._parallel_map(_get_pid, range(4), 2)
+        self.assertEqual(len(pids), 4)
+        self.assertNotIn(os.getpid(), pids)
+
+    def test_noise_samples_in_one_batch(self):
+        sort = lambda flows, positive, negative: dict(
+            (x, 'up' if flows[x] >= 0 else 'down') for x in ('a', 'b'))
+        acceptabilities = robustness.get_noise_acceptabilities(
+            ['a', 'b'], sort, 30, 0.5, flows={'a': 1.0, 'b': 0.1}, seed=1)
+        self.assertEqual(acceptabilities['a'], {'up': 1.0})
+        self.assertAlmostEqual(sum(acceptabilities['b'].values()), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
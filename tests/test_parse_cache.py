@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import support  # noqa: F401
+import caches
+
+
+class ParseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.listings = 0
+        self.listdir = os.listdir
+
+        def listdir(path):
+            if path == self.directory:
+                self.listings += 1
+            return self.listdir(path)
+        os.listdir = listdir
+
+    def tearDown(self):
+        os.listdir = self.listdir
+        shutil.rmtree(self.directory)
+
+    def _get_size(self):
+        return sum(os.path.getsize(os.path.join(self.directory, name))
+                   for name in self.listdir(self.directory))
+
+    def test_size_is_tracked_in_memory(self):
+        cache = caches.ParseCache(self.directory, max_size=2000)
+        for k in range(100):
+            cache.put('key%d' % k, 'x' * 100)
+            self.assertTrue(self._get_size() <= 2000)
+            self.assertEqual(cache.total_size, self._get_size())
+        # the first put, then once per ~10% of the limit
+        self.assertTrue(self.listings < 100 / 2, self.listings)
+        self.assertEqual(cache.get('key99'), (True, 'x' * 100))
+        self.assertEqual(cache.get('key0'), (False, None))
+
+    def test_replaced_entry(self):
+        cache = caches.ParseCache(self.directory, max_size=10000)
+        cache.put('key', 'x' * 100)
+        cache.put('key', 'y' * 10)
+        self.assertEqual(cache.total_size, self._get_size())
+        self.assertEqual(cache.get('key'), (True, 'y' * 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
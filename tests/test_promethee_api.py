@@ -0,0 +1,56 @@
+import random
+import sys
+import unittest
+
+import support  # noqa: F401
+import promethee
+from common import InputDataError
+from PrometheeWorker import getMethodModule
+
+
+def _nearest_profile(flow, profiles_flows, categories):
+    distances = [abs(flow - profile_flow) for profile_flow in profiles_flows]
+    return categories[distances.index(min(distances))]
+
+
+class PrometheeTriApiTest(unittest.TestCase):
+
+    def test_brute_force(self):
+        rng = random.Random(11)
+        for _ in range(200):
+            count = rng.randint(1, 6)
+            profiles_flows = sorted(rng.uniform(-1, 1) for _ in range(count))
+            categories = ['C%d' % k for k in range(1, count + 1)]
+            flows = [rng.uniform(-1.2, 1.2) for _ in range(10)]
+            expected = [_nearest_profile(flow, profiles_flows, categories)
+                        for flow in flows]
+            self.assertEqual(promethee.promethee_tri(flows, profiles_flows,
+                                                     categories), expected)
+            flows = dict(('a%d' % k, flow) for k, flow in enumerate(flows))
+            self.assertEqual(
+                promethee.promethee_tri(flows, profiles_flows, categories),
+                dict(('a%d' % k, category)
+                     for k, category in enumerate(expected)))
+
+    def test_wrong_categories(self):
+        self.assertRaises(InputDataError, promethee.promethee_tri,
+                          [0.1], [-0.5, 0.5], ['C1', 'C2', 'C3'])
+
+    def test_sys_path_unchanged(self):
+        # imported again, even if some other test has imported it already
+        module = sys.modules.pop('PrometheeTriSorting', None)
+        saved_path = list(sys.path)
+        path = [d for d in sys.path if not d.endswith('PrometheeTriSorting')]
+        sys.path[:] = path
+        try:
+            self.assertEqual(
+                getMethodModule('PrometheeTriSorting').__name__,
+                'PrometheeTriSorting')
+            self.assertEqual(sys.path, path)
+        finally:
+            sys.path[:] = saved_path
+            if module is not None:
+                sys.modules['PrometheeTriSorting'] = module
+
+if __name__ == '__main__':
+    unittest.main()
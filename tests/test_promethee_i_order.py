@@ -0,0 +1,63 @@
+import random
+import unittest
+
+import support  # noqa: F401
+import flows
+
+
+def _is_preferred(x, y, positive_flows, negative_flows):
+    return (positive_flows[x] >= positive_flows[y] and
+            negative_flows[x] <= negative_flows[y] and
+            (positive_flows[x], negative_flows[x]) !=
+            (positive_flows[y], negative_flows[y]))
+
+
+class PrometheeIOrderTest(unittest.TestCase):
+
+    def test_order_matches_pairwise_comparisons(self):
+        rng = random.Random(7)
+        values = [0.1, 0.2, 0.3, 0.4, 0.5]
+        for _ in range(200):
+            ids = ['a%02d' % i for i in range(rng.randint(0, 20))]
+            positive = dict((x, rng.choice(values)) for x in ids)
+            negative = dict((x, rng.choice(values)) for x in ids)
+            layers, hasse, dominance = flows.get_promethee_i_order(
+                ids, positive, negative)
+
+            def p(x, y):
+                return _is_preferred(x, y, positive, negative)
+
+            depth = {}
+            for x in sorted(ids, key=lambda x: (-positive[x], negative[x])):
+                depth[x] = max([depth[y] + 1 for y in depth if p(y, x)] +
+                               [0])
+            expected_layers = {}
+            for x in ids:
+                expected_layers.setdefault(depth[x], []).append(x)
+            self.assertEqual(layers, [sorted(expected_layers[k])
+                                      for k in sorted(expected_layers)])
+            pairs = set(hasse)
+            for x in ids:
+                self.assertEqual(dominance[x],
+                                 (sum(p(x, y) for y in ids),
+                                  sum(p(y, x) for y in ids)))
+                for y in ids:
+                    if x == y:
+                        continue
+                    indifferent = ((positive[x], negative[x]) ==
+                                   (positive[y], negative[y]))
+                    cover = p(x, y) and not any(p(x, z) and p(z, y)
+                                                for z in ids)
+                    self.assertEqual((x, y) in pairs, indifferent or cover)
+
+    def test_incomparable(self):
+        layers, hasse, dominance = flows.get_promethee_i_order(
+            ['a', 'b', 'c'], {'a': 0.5, 'b': 0.3, 'c': 0.6},
+            {'a': 0.1, 'b': 0.2, 'c': 0.3})
+        self.assertEqual(layers, [['a', 'c'], ['b']])
+        self.assertEqual(hasse, [('a', 'b')])
+        self.assertEqual(dominance['c'], (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
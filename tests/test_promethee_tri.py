@@ -0,0 +1,125 @@
+import random
+import unittest
+
+import support  # noqa: F401
+from common import InputDataError
+from PrometheeWorker import getMethodModule
+
+tri = getMethodModule('PrometheeTriSorting')
+
+
+def _get_profiles_categories(count):
+    return dict((i, {'id': 'b%d' % i, 'classes': 'C%d' % i})
+                for i in range(1, count + 1))
+
+
+def _assign_as_before(flow, profiles_categories, categories_flows):
+    """The assignment rule of sortPrometheeTri before user-040: the best
+    distance was never updated, so the flow went to the last profile not
+    farther than the first one.
+    """
+    assignment = profiles_categories[1]['classes']
+    best_diff = abs(categories_flows[profiles_categories[1]['id']] - flow)
+    for i in range(2, len(profiles_categories) + 1):
+        temp_diff = abs(categories_flows[profiles_categories[i]['id']] - flow)
+        if temp_diff <= best_diff:
+            assignment = profiles_categories[i]['classes']
+    return assignment
+
+
+class PrometheeTriTest(unittest.TestCase):
+
+    def test_changed_assignments(self):
+        profiles_categories = _get_profiles_categories(4)
+        categories_flows = {'b1': -0.6, 'b2': 0.0, 'b3': 0.5, 'b4': 0.8}
+        flows = {'a1': 0.1, 'a2': 0.7, 'a3': -0.35, 'a4': 0.25, 'a5': -0.5}
+        before = dict((a, _assign_as_before(flow, profiles_categories,
+                                            categories_flows))
+                      for a, flow in flows.items())
+        after = tri.sortPrometheeTri(sorted(flows), None, profiles_categories,
+                                     flows, categories_flows)
+        # a1 is nearest to b2 (0.1), but b3 (0.4) isn't farther than b1
+        # (0.7); a4 is equally near to b2 and b3 (0.25), but b4 (0.55) isn't
+        # farther than b1 (0.85)
+        self.assertEqual(before, {'a1': 'C3', 'a2': 'C4', 'a3': 'C1',
+                                  'a4': 'C4', 'a5': 'C1'})
+        self.assertEqual(after, {'a1': 'C2', 'a2': 'C4', 'a3': 'C1',
+                                 'a4': 'C3', 'a5': 'C1'})
+
+    def test_ties_go_to_the_higher_profile(self):
+        profiles_categories = _get_profiles_categories(2)
+        for scale in (1e-12, 1.0, 1e9):
+            categories_flows = {'b1': 0.6 * scale, 'b2': 0.8 * scale}
+            # 0.7 is equally distant from both, up to the rounding errors
+            self.assertEqual(tri.assignPrometheeTri(
+                0.7 * scale, profiles_categories, categories_flows), 'C2')
+            # the tolerance is relative, so it doesn't swallow the
+            # differences of the tiny flows
+            self.assertEqual(tri.assignPrometheeTri(
+                0.69 * scale, profiles_categories, categories_flows), 'C1')
+
+    def test_nearest_profile(self):
+        profiles_categories = _get_profiles_categories(4)
+        categories_flows = {'b1': -0.6, 'b2': 0.0, 'b3': 0.5, 'b4': 0.8}
+        for flow, category in [(0.1, 'C2'), (-0.35, 'C1'), (0.25, 'C3'),
+                               (0.7, 'C4'), (2.0, 'C4'), (-2.0, 'C1')]:
+            self.assertEqual(tri.assignPrometheeTri(
+                flow, profiles_categories, categories_flows), category)
+
+    def test_fit_reproduces_nearest_profile_assignments(self):
+        rng = random.Random(5)
+        for _ in range(100):
+            count = rng.randint(1, 5)
+            profiles_categories = _get_profiles_categories(count)
+            profiles = sorted(rng.uniform(-1, 1) for _ in range(count))
+            categories_flows = dict(('b%d' % i, flow)
+                                    for i, flow in enumerate(profiles, 1))
+            flows = dict(('a%d' % k, rng.uniform(-1, 1)) for k in range(30))
+            references = tri.predictPrometheeTri(
+                flows, profiles_categories, categories_flows, flows)
+            fitted, errors = tri.fitPrometheeTriProfiles(
+                flows, profiles_categories, references)
+            self.assertEqual(errors, 0)
+            self.assertEqual(tri.predictPrometheeTri(
+                flows, profiles_categories, fitted, flows), references)
+
+    def test_fit_with_an_empty_class(self):
+        profiles_categories = _get_profiles_categories(4)
+        flows = {'a1': -0.8, 'a2': -0.7, 'a3': -0.6, 'a4': -0.2, 'a5': -0.2,
+                 'a6': 0.2, 'a7': 1.0}
+        references = {'a1': 'C1', 'a2': 'C1', 'a3': 'C1', 'a4': 'C2',
+                      'a5': 'C2', 'a6': 'C4', 'a7': 'C4'}
+        # the mean of C4 (0.6) is at the bound of the flows b4 can take,
+        # so the profiles are fitted with b4 below it
+        fitted, errors = tri.fitPrometheeTriProfiles(
+            flows, profiles_categories, references)
+        self.assertEqual(errors, 0)
+        self.assertTrue(fitted['b2'] < fitted['b3'] < fitted['b4'] < 0.6)
+        self.assertEqual(tri.predictPrometheeTri(
+            flows, profiles_categories, fitted, flows), references)
+
+    def test_fit_counts_errors(self):
+        profiles_categories = _get_profiles_categories(2)
+        flows = {'a1': 0.0, 'a2': 1.0, 'a3': 2.0}
+        references = {'a1': 'C1', 'a2': 'C2', 'a3': 'C1'}
+        fitted, errors = tri.fitPrometheeTriProfiles(
+            flows, profiles_categories, references)
+        assignments = tri.predictPrometheeTri(flows, profiles_categories,
+                                              fitted, flows)
+        self.assertEqual(errors, 1)
+        self.assertEqual(errors, sum(1 for a in flows
+                                     if assignments[a] != references[a]))
+
+    def test_fit_single_profile(self):
+        profiles_categories = _get_profiles_categories(1)
+        fitted, errors = tri.fitPrometheeTriProfiles(
+            {'a1': 0.2, 'a2': 0.4}, profiles_categories,
+            {'a1': 'C1', 'a2': 'C1'})
+        self.assertEqual(errors, 0)
+        self.assertAlmostEqual(fitted['b1'], 0.3)
+        self.assertRaises(InputDataError, tri.fitPrometheeTriProfiles,
+                          {'a1': 0.2}, profiles_categories, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
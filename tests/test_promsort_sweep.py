@@ -0,0 +1,96 @@
+import random
+import unittest
+
+import support  # noqa: F401
+from PrometheeWorker import getMethodModule
+
+promsort = getMethodModule('Promsort')
+
+EPSILON = 1e-9
+
+
+def _get_boundary_profiles(count):
+    return dict((i, {'id': 'b%d' % i, 'classes': {'lower': 'C%d' % i,
+                                                  'upper': 'C%d' % (i + 1)}})
+                for i in range(1, count + 1))
+
+
+class PromsortSweepTest(unittest.TestCase):
+
+    def _get_input(self, rng):
+        # the inputs with distinct, but almost equal distances (rounding
+        # errors) are skipped: the points between them can't be checked
+        while True:
+            args = self._get_random_input(rng)
+            distances = sorted(set(dk for _, dk in
+                                   promsort.getPromsortDistances(*args)[2]))
+            if all(high - low > 4 * EPSILON
+                   for low, high in zip(distances, distances[1:])):
+                return args
+
+    def _get_random_input(self, rng):
+        count = rng.randint(1, 3)
+        steps = sorted(rng.random() for _ in range(count))
+        categories_positive = dict(('b%d' % i, steps[i - 1])
+                                   for i in range(1, count + 1))
+        categories_negative = dict(('b%d' % i, 1.0 - steps[i - 1])
+                                   for i in range(1, count + 1))
+        # a coarse grid, so that some alternatives share the same dk
+        positive = dict(('a%d' % k, rng.randint(0, 10) / 10.0)
+                        for k in range(rng.randint(1, 25)))
+        negative = dict((alt, rng.randint(0, 10) / 10.0) for alt in positive)
+        return (sorted(positive), None, _get_boundary_profiles(count),
+                positive, negative, categories_positive, categories_negative)
+
+    def _sort(self, args, cut_point):
+        return promsort.sortPromsort(*args + (cut_point, ))[0]
+
+    def _get_cut_points(self, args):
+        distances = sorted(set(dk for _, dk in
+                               promsort.getPromsortDistances(*args)[2]))
+        # the distances themselves (where the result changes), the points
+        # just around them and between them, and beyond all of them
+        cut_points = [-10.0, 10.0]
+        for dk in distances:
+            cut_points.extend([dk, dk - EPSILON, dk + EPSILON])
+        for low, high in zip(distances, distances[1:]):
+            cut_points.append((low + high) / 2.0)
+        return cut_points
+
+    def test_sweep_matches_sort(self):
+        rng = random.Random(9)
+        for _ in range(50):
+            args = self._get_input(rng)
+            cut_points = self._get_cut_points(args)
+            results = promsort.sweepPromsort(*args + (cut_points, ))
+            self.assertEqual([cut_point for cut_point, _ in results],
+                             cut_points)
+            for cut_point, assignments in results:
+                self.assertEqual(assignments, self._sort(args, cut_point))
+
+    def test_cut_point_function(self):
+        rng = random.Random(10)
+        for _ in range(50):
+            args = self._get_input(rng)
+            assignments, steps = promsort.getPromsortCutPointFunction(*args)
+            dks = [dk for dk, _ in steps]
+            self.assertEqual(dks, sorted(set(dks)))
+            for cut_point in self._get_cut_points(args):
+                expected = dict(assignments)
+                for dk, changes in steps:
+                    if cut_point > dk:
+                        expected.update(changes)
+                self.assertEqual(self._sort(args, cut_point), expected)
+            # the result changes right above every dk, by the step's changes
+            for dk, changes in steps:
+                before = self._sort(args, dk)
+                after = self._sort(args, dk + EPSILON)
+                self.assertEqual(
+                    dict((alt, after[alt]) for alt in after
+                         if after[alt] != before[alt]),
+                    dict((alt, category) for alt, category in changes.items()
+                         if category != before[alt]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+import support  # noqa: F401
+from PrometheeWorker import getMethodModule
+
+ranking_module = getMethodModule('PrometheeIIRanking')
+
+
+class _Output(object):
+
+    def __init__(self):
+        self.text = ''
+
+    def write(self, text):
+        self.text += text
+
+    def flush(self):
+        pass
+
+
+class FlatFlowsRankingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        rng = random.Random(6)
+        # flows with many ties, resolved by the IDs
+        self.flows = [('a%03d' % i, rng.choice([-0.5, -0.1, 0.0, 0.2, 0.7]))
+                      for i in range(200)]
+        rng.shuffle(self.flows)
+        self.flows_file = os.path.join(self.directory, 'flows.txt')
+        with open(self.flows_file, 'w') as f:
+            f.write('# alternative flow\n\n')
+            for alt, flow in self.flows:
+                f.write('{} {}\n'.format(alt, repr(flow)))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _run(self, *args):
+        argv, stdout = sys.argv, sys.stdout
+        sys.argv = ['PrometheeIIRanking.py', '--flows', self.flows_file,
+                    '-o', self.directory] + list(args)
+        sys.stdout = output = _Output()
+        try:
+            exit_code = ranking_module.main()
+        finally:
+            sys.argv, sys.stdout = argv, stdout
+        self.assertFalse(exit_code)
+        # the ranking goes to the file only
+        self.assertEqual(output.text, '')
+        with open(os.path.join(self.directory, 'ranking.txt')) as f:
+            return [line.split('\t') for line in f.read().splitlines()]
+
+    def _get_expected(self, first_rank, last_rank):
+        ordered = sorted(self.flows, key=lambda item: (-item[1], item[0]))
+        return [[str(rank), alt, repr(flow)] for rank, (alt, flow)
+                in enumerate(ordered, 1)][first_rank - 1:last_rank]
+
+    def test_top_k_matches_the_full_sort(self):
+        for first_rank, last_rank in [(1, 1), (1, 10), (5, 37), (190, 200),
+                                      (1, 500)]:
+            self.assertEqual(self._run('--first', str(first_rank), '--last',
+                                       str(last_rank)),
+                             self._get_expected(first_rank, last_rank))
+
+    def test_all_ranks(self):
+        self.assertEqual(self._run(), self._get_expected(1, None))
+        self.assertEqual(self._run('--first', '150'),
+                         self._get_expected(150, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
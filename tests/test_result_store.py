@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import support  # noqa: F401
+import caches
+import common
+
+
+class RunMemoizedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+        self.input_dir = tempfile.mkdtemp()
+        self.output_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.input_dir, 'alternatives.xml'), 'w') as f:
+            f.write('<alternatives/>')
+        os.environ[common.RESULT_CACHE_ENV] = self.store_dir
+        self.calls = 0
+
+    def tearDown(self):
+        del os.environ[common.RESULT_CACHE_ENV]
+        for d in (self.store_dir, self.input_dir, self.output_dir):
+            shutil.rmtree(d)
+
+    def _run(self, exit_code, output_dir):
+        self.calls += 1
+        for name in ('result.xml', 'messages.xml'):
+            with open(os.path.join(output_dir, name), 'w') as f:
+                f.write(name)
+        return exit_code
+
+    def _run_memoized(self, exit_code):
+        return common.run_memoized(lambda d: self._run(exit_code, d),
+                                   common.__file__, self.input_dir,
+                                   self.output_dir)
+
+    def _read(self, name):
+        with open(os.path.join(self.output_dir, name)) as f:
+            return f.read()
+
+    def test_success_is_stored(self):
+        self.assertEqual(self._run_memoized(0), 0)
+        self.assertEqual(self._read('result.xml'), 'result.xml')
+        for name in os.listdir(self.output_dir):
+            os.remove(os.path.join(self.output_dir, name))
+        self.assertEqual(self._run_memoized(0), 0)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(sorted(os.listdir(self.output_dir)),
+                         ['messages.xml', 'result.xml'])
+        stats = caches.ResultStore(self.store_dir).get_stats()
+        self.assertEqual(stats['common'], {'hits': 1, 'misses': 1})
+
+    def test_unchanged_files_are_stored(self):
+        # the output dir holds identical files already
+        self._run(0, self.output_dir)
+        self._run_memoized(None)
+        shutil.rmtree(self.output_dir)
+        os.mkdir(self.output_dir)
+        self._run_memoized(None)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self._read('result.xml'), 'result.xml')
+
+    def test_failure_isnt_stored(self):
+        self.assertEqual(self._run_memoized(1), 1)
+        self.assertEqual(self._read('messages.xml'), 'messages.xml')
+        self.assertEqual(self._run_memoized(1), 1)
+        self.assertEqual(self.calls, 2)
+
+    def test_concurrent_counts(self):
+        store = caches.ResultStore(self.store_dir)
+
+        def count():
+            for k in range(20):
+                store.count('method', k % 2 == 0)
+        threads = [threading.Thread(target=count) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(store.get_stats()['method'],
+                         {'hits': 40, 'misses': 40})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import random
+import sys
+import unittest
+
+import support
+import PyXMCDA as px
+
+FIXTURE_DIR = os.path.join(support.ROOT, 'FlowSortPrometheeIISorting',
+                           'tests', 'in3')
+
+
+# getVetos uses dict.has_key on the dicts it builds itself
+PY2_ONLY = unittest.skipIf(sys.version_info[0] > 2,
+                           "getVetos runs on python 2 only")
+
+
+class _Thresholds(dict):
+    # the original functions use has_key, which python 3 dicts lack
+
+    def has_key(self, key):
+        return key in self
+
+
+def _wrap(thresholds):
+    return dict((crit, _Thresholds(values))
+                for crit, values in thresholds.items())
+
+
+def _get_random_input(rng, count):
+    criteria = ['g1', 'g2', 'g3', 'g4', 'g5', 'g6']
+    alternatives = ['a%d' % i for i in range(count)]
+    # small integers, so that many differences hit the thresholds exactly
+    performances = dict((a, dict((c, float(rng.randint(0, 8)))
+                                 for c in criteria))
+                        for a in alternatives)
+    thresholds = {
+        'g1': {},
+        'g2': {'indifference': 1.0},
+        'g3': {'preference': 2.0},
+        'g4': {'indifference': 1.0, 'preference': 3.0, 'veto': 5.0},
+        'g5': {'indifference': 0.0, 'preference': 2.0, 'veto': 4.0,
+               'weakVeto': 2.0},
+        'g6': {'veto': 3.0, 'weakVeto': 1.0},
+    }
+    return alternatives, criteria, performances, thresholds
+
+
+class RubisOutrankingTest(unittest.TestCase):
+
+    def _get_inputs(self):
+        rng = random.Random(8)
+        inputs = [_get_random_input(rng, count) for count in (1, 2, 7, 30)]
+        tree = px.parseValidate(os.path.join(FIXTURE_DIR, 'criteria.xml'))
+        criteria = px.getCriteriaID(tree)
+        thresholds = px.getConstantThresholds(tree, criteria)
+        alternatives = px.getAlternativesID(px.parseValidate(
+            os.path.join(FIXTURE_DIR, 'alternatives.xml')))
+        performances = px.getPerformanceTable(px.parseValidate(
+            os.path.join(FIXTURE_DIR, 'performance_table.xml')),
+            alternatives, criteria)
+        inputs.append((alternatives, criteria, performances, thresholds))
+        # the same with vetoes, at the differences found in the fixture
+        vetoed = {}
+        for crit in criteria:
+            vetoed[crit] = dict(thresholds[crit])
+            vetoed[crit]['weakVeto'] = 2 * thresholds[crit].get('preference', 1.0)
+            vetoed[crit]['veto'] = 3 * thresholds[crit].get('preference', 1.0)
+        inputs.append((alternatives, criteria, performances, vetoed))
+        return inputs
+
+    def test_cuts_and_arrays(self):
+        for alternatives, criteria, performances, thresholds in \
+                self._get_inputs():
+            expected = px.getRubisElementaryOutranking(
+                alternatives, criteria, performances, _wrap(thresholds))
+            orders, cuts = px.getRubisElementaryOutrankingCuts(
+                alternatives, criteria, performances, thresholds)
+            for crit in criteria:
+                for i, alt1 in enumerate(alternatives):
+                    cut1, cut05 = cuts[crit][i]
+                    for pos, j in enumerate(orders[crit]):
+                        value = (1.0 if pos < cut1 else
+                                 0.5 if pos < cut05 else 0.0)
+                        self.assertEqual(
+                            value, expected[alt1][alternatives[j]][crit])
+            for block_size in (1, 3, 256):
+                array = px.getRubisElementaryOutrankingArray(
+                    alternatives, criteria, performances, thresholds,
+                    block_size)
+                self.assertEqual(len(array), len(alternatives))
+                for i, alt1 in enumerate(alternatives):
+                    for k, crit in enumerate(criteria):
+                        self.assertEqual(
+                            list(array[i][k]),
+                            [expected[alt1][alt2][crit]
+                             for alt2 in alternatives])
+
+    def test_blocks(self):
+        alternatives, criteria, performances, thresholds = \
+            _get_random_input(random.Random(3), 10)
+        blocks = list(px.iterRubisElementaryOutrankingBlocks(
+            alternatives, criteria, performances, thresholds, 4))
+        self.assertEqual([start for start, rows in blocks], [0, 4, 8])
+        self.assertEqual([len(rows) for start, rows in blocks], [4, 4, 2])
+
+    @PY2_ONLY
+    def test_vetos(self):
+        for alternatives, criteria, performances, thresholds in \
+                self._get_inputs():
+            expected = px.getVetos(alternatives, criteria, performances,
+                                   _wrap(thresholds))
+            self.assertEqual(px.getVetosFast(alternatives, criteria,
+                                             performances, thresholds),
+                             expected)
+            coordinates = px.getVetosCoordinates(
+                alternatives, criteria, performances, thresholds)
+            self.assertEqual(len(coordinates), len(set(
+                (i, j, k) for i, j, k, _ in coordinates)))
+            self.assertEqual(len(coordinates), sum(
+                len(crits) for row in expected.values()
+                for crits in row.values()))
+
+    def test_ties_at_thresholds(self):
+        alternatives = ['a', 'b', 'c', 'd']
+        performances = {'a': {'g': 0.0}, 'b': {'g': 1.0}, 'c': {'g': 3.0},
+                        'd': {'g': 5.0}}
+        thresholds = {'g': {'indifference': 1.0, 'preference': 3.0,
+                            'veto': 5.0, 'weakVeto': 3.0}}
+        array = px.getRubisElementaryOutrankingArray(
+            alternatives, ['g'], performances, thresholds)
+        # a + 1 >= b, but a + 3 > c doesn't hold
+        self.assertEqual(list(array[0][0]), [1.0, 1.0, 0.0, 0.0])
+        self.assertEqual(list(array[1][0]), [1.0, 1.0, 0.5, 0.0])
+        # a + 5 < d doesn't hold, a + 3 < d and b + 3 < d do
+        expected = {'a': {'d': {'g': 0.5}}, 'b': {'d': {'g': 0.5}}}
+        self.assertEqual(px.getVetosFast(alternatives, ['g'], performances,
+                                         thresholds), expected)
+        if sys.version_info[0] == 2:
+            self.assertEqual(px.getVetos(alternatives, ['g'], performances,
+                                         _wrap(thresholds)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Checks that every scenario (see get_scenarios_dirs) gives the same
+assignments as a separate run with its profiles, and that the
+disagreements summarize them correctly.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from lxml import etree
+
+import support
+import agreements
+from PrometheeWorker import METHODS, getMethodModule
+
+# (method, fixture, flows files)
+FIXTURES = [
+    ('FlowSortPrometheeIISorting', 'in1', ['flows.xml']),
+    ('FlowSortPrometheeIISorting', 'in2', ['flows.xml']),
+    ('FlowSortPrometheISorting', 'in1',
+     ['positive_flows.xml', 'negative_flows.xml']),
+    ('FlowSortPrometheISorting', 'in2',
+     ['positive_flows.xml', 'negative_flows.xml']),
+    ('PrometheeTriSorting', 'in1', ['flows.xml']),
+    ('Promsort', 'in1', ['positive_flows.xml', 'negative_flows.xml']),
+]
+
+# the profiles' flows of every scenario are moved by these, i.e. the
+# profiles get better (positive) or worse (negative)
+SHIFTS = {'better': 0.15, 'same': 0.0, 'worse': -0.2}
+
+
+def _read_scenarios(file_name):
+    scenarios = {}
+    for node in etree.parse(file_name).iter('alternativesAffectations'):
+        assignments = {}
+        for affectation in node.iter('alternativeAffectation'):
+            alt = affectation.findtext('alternativeID')
+            interval = affectation.find('categoriesInterval')
+            if interval is None:
+                assignments[alt] = affectation.findtext('categoryID')
+            else:
+                assignments[alt] = (
+                    interval.findtext('lowerBound/categoryID'),
+                    interval.findtext('upperBound/categoryID'))
+        name = node.get('mcdaConcept')[len('scenario: '):]
+        scenarios[name] = assignments
+    return scenarios
+
+
+def _read_values(file_name):
+    return dict((node.findtext('alternativeID'),
+                 float(node.findtext('value/real')))
+                for node in etree.parse(file_name).iter('alternativeValue'))
+
+
+def _shift_profiles(source, target, profiles, shift):
+    tree = etree.parse(source)
+    for node in tree.iter('alternativeValue'):
+        if node.findtext('alternativeID') in profiles:
+            real = node.find('value/real')
+            real.text = str(float(real.text) + shift)
+    tree.write(target)
+
+
+class ScenariosTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _run(self, method, input_dir):
+        output_dir = tempfile.mkdtemp(dir=self.tmp)
+        getMethodModule(method).run(input_dir, output_dir)
+        self.assertFalse(os.path.exists(os.path.join(output_dir,
+                                                     'messages.xml')))
+        return output_dir
+
+    def _check(self, method, fixture, flows_files):
+        fixture_dir = os.path.join(support.ROOT, METHODS[method], 'tests',
+                                   fixture)
+        input_dir = os.path.join(self.tmp, 'input')
+        shutil.copytree(fixture_dir, input_dir)
+        profiles = set(etree.parse(
+            os.path.join(fixture_dir, 'classes_profiles.xml')).xpath(
+                '//categoryProfile/alternativeID/text()'))
+
+        expected = {}
+        for name, shift in SHIFTS.items():
+            # a scenario holds only the profiles' definitions and flows...
+            scenario_dir = os.path.join(input_dir, 'scenarios', name)
+            os.makedirs(scenario_dir)
+            for file_name in ('classes.xml', 'classes_profiles.xml'):
+                shutil.copy(os.path.join(fixture_dir, file_name),
+                            scenario_dir)
+            # ...and a separate run gets everything else from the fixture
+            separate_dir = os.path.join(self.tmp, 'separate_' + name)
+            shutil.copytree(fixture_dir, separate_dir)
+            for file_name in flows_files:
+                sign = -1 if file_name == 'negative_flows.xml' else 1
+                _shift_profiles(os.path.join(fixture_dir, file_name),
+                                os.path.join(scenario_dir, file_name),
+                                profiles, sign * shift)
+                shutil.copy(os.path.join(scenario_dir, file_name),
+                            separate_dir)
+            expected[name] = agreements.read_assignments(os.path.join(
+                self._run(method, separate_dir), 'assignments.xml'))
+
+        output_dir = self._run(method, input_dir)
+        scenarios = _read_scenarios(os.path.join(output_dir,
+                                                 'scenarios_assignments.xml'))
+        self.assertEqual(scenarios, expected)
+        self.assertEqual(scenarios['same'], agreements.read_assignments(
+            os.path.join(output_dir, 'assignments.xml')))
+
+        disagreements = _read_values(os.path.join(
+            output_dir, 'scenarios_disagreements.xml'))
+        self.assertEqual(sorted(disagreements), sorted(expected['same']))
+        for alt, disagreement in disagreements.items():
+            assignments = [expected[name][alt] for name in SHIFTS]
+            most_common = max(assignments.count(a) for a in assignments)
+            self.assertAlmostEqual(
+                disagreement, 1.0 - most_common / float(len(SHIFTS)))
+        # the shifts do change some assignments
+        self.assertTrue(any(disagreements.values()),
+                        "{} {}".format(method, fixture))
+
+    def test_scenarios(self):
+        for method, fixture, flows_files in FIXTURES:
+            self._check(method, fixture, flows_files)
+            shutil.rmtree(self.tmp)
+            self.tmp = tempfile.mkdtemp()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+
+import support  # noqa: F401
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def slowJob(job):
+    time.sleep(job.get('sleep', 0))
+    return {'id': job.get('id'), 'method': job.get('method'), 'status': 'ok'}
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "the service requires python 3")
+class ServiceTest(unittest.TestCase):
+    """Runs the service on an ephemeral localhost port, with a single worker
+    and room for a single queued job.
+    """
+
+    def setUp(self):
+        import asyncio
+        import PrometheeService
+        self.module = PrometheeService
+        self.runServiceJob = PrometheeService.runServiceJob
+        self.loop = asyncio.new_event_loop()
+        self.service = PrometheeService.SortingService(1, 1)
+        self.loop.run_until_complete(self.service.start())
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self.service.handle, '127.0.0.1', 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.run_until_complete(self.service.stop())
+        self.loop.close()
+        self.module.runServiceJob = self.runServiceJob
+
+    def _request(self, method, path, job=None):
+        import urllib.error
+        import urllib.request
+        data = json.dumps(job).encode('utf-8') if job is not None else None
+        request = urllib.request.Request(
+            'http://127.0.0.1:{}{}'.format(self.port, path), data, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, json.loads(response.read().decode())
+        except urllib.error.HTTPError as err:
+            return err.code, json.loads(err.read().decode())
+
+    def _wait(self, job_id, statuses):
+        for _ in range(600):
+            status, response = self._request('GET', '/jobs/' + job_id)
+            self.assertEqual(status, 200)
+            if response['status'] in statuses:
+                return response
+            time.sleep(0.05)
+        self.fail("Job {} is still {}.".format(job_id, response['status']))
+
+    def test_files_job(self):
+        input_dir = os.path.join(ROOT, 'PrometheeIIRanking', 'tests', 'in1')
+        files = {}
+        for name in os.listdir(input_dir):
+            with open(os.path.join(input_dir, name)) as f:
+                files[name] = f.read()
+        status, response = self._request(
+            'POST', '/jobs', {'method': 'PrometheeIIRanking', 'files': files})
+        self.assertEqual(status, 202)
+        response = self._wait(response['id'], ('done', 'error'))
+        self.assertEqual(response['status'], 'done', response)
+        self.assertIn('ranking.xml', response['result']['files'])
+
+    def test_cancel_and_backpressure(self):
+        # the jobs are run by a function from this module (the worker
+        # process is forked with it)
+        self.module.runServiceJob = slowJob
+        job = {'method': 'PrometheeIIRanking', 'input_dir': '.',
+               'output_dir': '.'}
+        status, first = self._request('POST', '/jobs', dict(job, sleep=2))
+        self.assertEqual(status, 202)
+        self._wait(first['id'], ('running',))
+        status, second = self._request('POST', '/jobs', job)
+        self.assertEqual(status, 202)
+        status, response = self._request('POST', '/jobs', job)
+        self.assertEqual(status, 503)
+        self.assertIn('error', response)
+
+        status, response = self._request('DELETE', '/jobs/' + first['id'])
+        self.assertEqual((status, response['status']), (200, 'cancelled'))
+        status, response = self._request('DELETE', '/jobs/' + first['id'])
+        self.assertEqual(status, 409)
+        # the cancelled job still keeps the only worker busy
+        status, stats = self._request('GET', '/stats')
+        self.assertEqual((stats['running'], stats['queued']), (1, 1))
+        self.assertEqual(self._request('GET', '/jobs/' + second['id'])[1]
+                         ['status'], 'queued')
+
+        response = self._wait(second['id'], ('done', 'error'))
+        self.assertEqual(response['result']['status'], 'ok')
+        response = self._request('GET', '/jobs/' + first['id'])[1]
+        self.assertEqual(response, {'id': first['id'], 'status': 'cancelled'})
+        self.assertEqual(self._request('GET', '/stats')[1]['running'], 0)
+        self.assertEqual(self._request('GET', '/jobs/0')[0], 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import support  # noqa: F401
+
+# the modules which only some of the options need, so they shouldn't be
+# imported together with common.py (see PrometheeStartupBenchmark.py)
+LAZY_MODULES = ['agreements', 'caches', 'fcntl', 'flows', 'hashlib', 'json',
+                'multiprocessing', 'networkx', 'outranking', 'random',
+                'robustness', 'shutil', 'tempfile', 'threading']
+
+CODE = '''
+import sys
+import common
+print(' '.join(name for name in %r if name in sys.modules))
+'''
+
+
+class StartupTest(unittest.TestCase):
+
+    def test_common_imports_only_what_it_needs(self):
+        output = subprocess.check_output(
+            [sys.executable, '-c', CODE % LAZY_MODULES], cwd=support.ROOT)
+        self.assertEqual(output.decode('utf-8').split(), [])
+
+    def test_modules_import_only_what_they_need(self):
+        for directory, module in [
+                ('FlowSortPrometheeIISorting', 'FlowSortPrometheeIISorting'),
+                ('FlowSortPrometheeISorting', 'FlowSortPrometheISorting'),
+                ('PrometheeTriSorting', 'PrometheeTriSorting'),
+                ('Promsort', 'Promsort')]:
+            code = CODE.replace('import common', 'import ' + module)
+            output = subprocess.check_output(
+                [sys.executable, '-c', code % LAZY_MODULES],
+                cwd=os.path.join(support.ROOT, directory))
+            self.assertEqual(output.decode('utf-8').split(), [], module)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import random
+import unittest
+
+import support  # noqa: F401
+import common
+import flows
+import robustness
+
+CRITERIA = ['g1', 'g2', 'g3']
+PREF_DIRECTIONS = {'g1': 'max', 'g2': 'min', 'g3': 'max'}
+THRESHOLDS = {'g1': {'indifference': 1.0, 'preference': 3.0},
+              'g2': {'indifference': 0.5, 'preference': 2.0}, 'g3': {}}
+
+
+def _sort(flows, positive_flows, negative_flows):
+    return dict((x, 'good' if flows[x] >= flows['p'] else 'bad')
+                for x in flows if x != 'p')
+
+
+class WeightsAcceptabilitiesTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(1)
+        self.alternatives = ['a%d' % k for k in range(8)]
+        self.performances = dict(
+            (x, dict((c, rng.uniform(0, 10)) for c in CRITERIA))
+            for x in self.alternatives + ['p'])
+        self.criteria_flows = robustness.get_criteria_flows(
+            self.alternatives, self.performances, CRITERIA, PREF_DIRECTIONS,
+            THRESHOLDS, ['p'])
+
+    def test_criteria_flows_aggregate_to_flows(self):
+        weights = {'g1': 0.5, 'g2': 0.2, 'g3': 0.3}
+        pi = flows._get_preference_function(CRITERIA, weights,
+                                            PREF_DIRECTIONS, THRESHOLDS)
+        for x in self.alternatives + ['p']:
+            others = [y for y in self.alternatives if y != x]
+            positive = sum(pi(self.performances[x], self.performances[y])
+                           for y in others) / float(len(others))
+            self.assertAlmostEqual(
+                positive, sum(weights[c] * self.criteria_flows[c][0][x]
+                              for c in CRITERIA))
+
+    def test_fixed_weights(self):
+        intervals = {'g1': (0.5, 0.5), 'g2': (0.2, 0.2), 'g3': (0.3, 0.3)}
+        acceptabilities = robustness.get_weights_acceptabilities(
+            self.criteria_flows, CRITERIA, _sort, 10, intervals, seed=3,
+            processes=1)
+        flows = dict(
+            (x, sum(w[0] * (self.criteria_flows[c][0][x] -
+                            self.criteria_flows[c][1][x])
+                    for c, w in intervals.items()))
+            for x in self.alternatives + ['p'])
+        expected = _sort(flows, None, None)
+        for x in self.alternatives:
+            self.assertEqual(acceptabilities[x], {expected[x]: 1.0})
+
+    def test_plain_weights_are_normalized(self):
+        intervals = {'g1': (5.0, 5.0), 'g2': (2.0, 2.0), 'g3': (3.0, 3.0)}
+        normalized = {'g1': (0.5, 0.5), 'g2': (0.2, 0.2), 'g3': (0.3, 0.3)}
+        results = [robustness.get_weights_acceptabilities(
+            self.criteria_flows, CRITERIA, _sort, 10, i, seed=3, processes=1)
+            for i in (intervals, normalized)]
+        self.assertEqual(results[0], results[1])
+
+    def test_sampled_weights_stay_within_intervals(self):
+        rng = random.Random(2)
+        intervals = {'g1': (0.2, 0.5), 'g2': (0.1, 0.4), 'g3': (0.3, 0.3)}
+        samples = [robustness.sample_weights(CRITERIA, rng, intervals)
+                   for _ in range(2000)]
+        for weights in samples:
+            self.assertAlmostEqual(sum(weights), 1.0)
+            for c, w in zip(CRITERIA, weights):
+                lower, upper = intervals[c]
+                self.assertTrue(lower - 1e-12 <= w <= upper + 1e-12)
+        # g1 + g2 == 0.7, so g1 is uniform in [0.3, 0.5]
+        g1 = [weights[0] for weights in samples]
+        self.assertTrue(min(g1) >= 0.3 - 1e-12)
+        self.assertAlmostEqual(sum(g1) / len(g1), 0.4, places=2)
+
+    def test_wide_intervals_give_the_whole_simplex(self):
+        rng = random.Random(4)
+        intervals = dict((c, (0.0, 1.0)) for c in CRITERIA)
+        samples = [robustness.sample_weights(CRITERIA, rng, intervals)
+                   for _ in range(4000)]
+        for k in range(len(CRITERIA)):
+            mean = sum(weights[k] for weights in samples) / len(samples)
+            self.assertAlmostEqual(mean, 1 / 3.0, places=2)
+            # the marginals of the uniform simplex: P(w > 1/2) == 1/4
+            share = sum(1 for weights in samples
+                        if weights[k] > 0.5) / float(len(samples))
+            self.assertAlmostEqual(share, 0.25, delta=0.03)
+
+    def test_wrong_intervals(self):
+        for intervals in ({'g1': (0.5, 0.6), 'g2': (0.3, 0.4),
+                           'g3': (0.3, 0.4)},
+                          {'g1': (0.1, 0.2), 'g2': (0.1, 0.2),
+                           'g3': (0.1, 0.2)},
+                          {'g1': (0.5, 0.4), 'g2': (0.1, 0.2),
+                           'g3': (0.1, 0.6)}):
+            self.assertRaises(common.InputDataError,
+                              robustness.get_weights_acceptabilities,
+                              self.criteria_flows, CRITERIA, _sort, 10,
+                              intervals, processes=1)
+
+    def test_batches_dont_change_the_results(self):
+        results = [robustness.get_weights_acceptabilities(
+            self.criteria_flows, CRITERIA, _sort, 50, batch_size=7, seed=5,
+            processes=processes) for processes in (1, 2)]
+        self.assertEqual(results[0], results[1])
+        for frequencies in results[0].values():
+            self.assertAlmostEqual(sum(frequencies.values()), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()